@@ -0,0 +1,868 @@
+"""\
+Batch geometry module. Contains NumPy counterparts of the basic geometry
+operations, used to evaluate coverage over whole sets of task points at once
+rather than one L{Point} object at a time.
+
+Points are represented as an M{(N, 3)} array of positions, optionally
+accompanied by an M{(N, 2)} array of direction angles (rho, eta). Rows of the
+angle array which are NaN denote non-directional points.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+from hashlib import sha1
+from itertools import product
+from math import pi
+
+import numpy as np
+
+from .geometry import Point, DirectionalPoint, Triangle, Quaternion, \
+    Rotation, Pose, segment_triangle_intersection
+
+
+def pose_matrix(pose):
+    """\
+    Return the rotation matrix and translation vector of a pose as arrays.
+
+    @param pose: The pose.
+    @type pose: L{Pose}
+    @return: Rotation matrix and translation vector.
+    @rtype: C{tuple} of C{numpy.ndarray}
+    """
+    return np.array(pose.R.to_rotation_matrix(), dtype=float), \
+        np.array([pose.T.x, pose.T.y, pose.T.z], dtype=float)
+
+
+def map_positions(pose, positions):
+    """\
+    Map an array of positions through a pose (see L{Pose.map_many}).
+
+    @param pose: The pose.
+    @type pose: L{Pose}
+    @param positions: The positions to map.
+    @type positions: C{numpy.ndarray}
+    @return: The mapped positions.
+    @rtype: C{numpy.ndarray}
+    """
+    positions = np.asarray(positions, dtype=float)
+    mapped = np.empty(positions.shape)
+    pose.map_many(positions.reshape((-1, 3)), mapped.reshape((-1, 3)))
+    return mapped
+
+
+def rotate_vectors(pose, vectors):
+    """\
+    Rotate an array of vectors through the rotation component of a pose.
+
+    @param pose: The pose.
+    @type pose: L{Pose}
+    @param vectors: The vectors to rotate.
+    @type vectors: C{numpy.ndarray}
+    @return: The rotated vectors.
+    @rtype: C{numpy.ndarray}
+    """
+    return np.dot(vectors, pose_matrix(pose)[0].T)
+
+
+def direction_vectors(angles):
+    """\
+    Convert an array of direction angles to unit direction vectors, as in
+    L{DirectionalPoint.direction_unit}. Non-directional (NaN) rows remain NaN.
+
+    @param angles: The direction angles (rho, eta).
+    @type angles: C{numpy.ndarray}
+    @return: The unit direction vectors.
+    @rtype: C{numpy.ndarray}
+    """
+    angles = np.asarray(angles, dtype=float)
+    rho, eta = angles[:, 0], angles[:, 1]
+    return np.column_stack((np.sin(rho) * np.cos(eta),
+                            np.sin(rho) * np.sin(eta), np.cos(rho)))
+
+
+def direction_angles(vectors):
+    """\
+    Convert an array of unit direction vectors to direction angles, as in
+    L{Pose.map} for directional points. Non-directional (NaN) rows remain NaN.
+
+    @param vectors: The unit direction vectors.
+    @type vectors: C{numpy.ndarray}
+    @return: The direction angles (rho, eta).
+    @rtype: C{numpy.ndarray}
+    """
+    vectors = np.asarray(vectors, dtype=float).reshape((-1, 3))
+    with np.errstate(invalid='ignore'):
+        rho = np.arccos(np.clip(vectors[:, 2], -1.0, 1.0))
+    return np.column_stack((rho, np.arctan2(vectors[:, 1], vectors[:, 0])))
+
+
+def kocular_strength(strengths, ocular):
+    """\
+    Return the I{k}-ocular coverage strength of each of a set of points, given
+    the coverage strength of each point for each camera. The strength of a
+    point over the best view (the maximum over all I{k}-camera views of the
+    minimum strength within the view) is the I{k}-th largest of its camera
+    strengths, so it is selected directly rather than by enumerating views.
+
+    @param strengths: The strength of each point (column) for each camera
+                      (row).
+    @type strengths: C{numpy.ndarray}
+    @param ocular: The value of I{k}.
+    @type ocular: C{int}
+    @return: The I{k}-ocular coverage strength of each point.
+    @rtype: C{numpy.ndarray}
+    """
+    strengths = np.asarray(strengths, dtype=float)
+    if not 0 < ocular <= strengths.shape[0]:
+        return np.zeros(strengths.shape[1:])
+    return np.partition(strengths, -ocular, axis=0)[-ocular]
+
+
+def pack_points(points):
+    """\
+    Pack a sequence of (directional) points into position and direction angle
+    arrays.
+
+    @param points: The points to pack.
+    @type points: C{list} of L{Point}
+    @return: Position and direction angle arrays.
+    @rtype: C{tuple} of C{numpy.ndarray}
+    """
+    nan = float('nan')
+    positions = np.array([(p.x, p.y, p.z) for p in points],
+        dtype=float).reshape((-1, 3))
+    angles = np.array([(p.rho, p.eta) if isinstance(p, DirectionalPoint) \
+        else (nan, nan) for p in points], dtype=float).reshape((-1, 2))
+    return positions, angles
+
+
+def normalize_angles(angles):
+    """\
+    Normalize an array of direction angles in the same manner as the
+    L{DirectionalPoint} constructor (rho in [0, S{pi}], eta in [0, 2S{pi})).
+
+    @param angles: The direction angles (rho, eta).
+    @type angles: C{numpy.ndarray}
+    @return: The normalized direction angles.
+    @rtype: C{numpy.ndarray}
+    """
+    angles = np.mod(np.asarray(angles, dtype=float), 2 * pi)
+    with np.errstate(invalid='ignore'):
+        flip = angles[:, 0] > pi
+    angles[flip, 0] = 2 * pi - angles[flip, 0]
+    angles[flip, 1] = np.mod(angles[flip, 1] + pi, 2 * pi)
+    return angles
+
+
+class PointArray(object):
+    """\
+    Array-backed task point store.
+
+    A L{PointArray} holds a set of (directional) points and their relevance
+    values as contiguous columns (C{x}, C{y}, C{z}, C{rho}, C{eta}, and
+    C{values}), with NaN direction angles for non-directional points. It
+    provides the fuzzy union and intersection of L{PointCache} via the C{|} and
+    C{&} operators, computed with array operations.
+
+    Point identity follows L{Point} equality: two points are the same if they
+    are of the same kind and differ by less than L{tolerance} in every
+    dimension. Lookups use a quantized integer grid with a cell size of twice
+    the tolerance, so that any matching point lies either in the same cell or
+    in the adjacent cell on the nearer side, in each dimension. Cells are
+    hashed into integer keys, and candidate matches are verified against the
+    tolerance.
+    """
+    tolerance = 1e-4
+
+    def __init__(self, positions=None, angles=None, values=None):
+        """\
+        Constructor.
+
+        @param positions: The positions of the points (optional).
+        @type positions: C{numpy.ndarray}
+        @param angles: The direction angles (rho, eta) of the points, with NaN
+                       rows for non-directional points (optional).
+        @type angles: C{numpy.ndarray}
+        @param values: The relevance values of the points (default 1.0).
+        @type values: C{numpy.ndarray}
+        """
+        if positions is None:
+            positions = np.empty((0, 3))
+        positions = np.asarray(positions, dtype=float).reshape((-1, 3))
+        n = positions.shape[0]
+        if angles is None:
+            angles = np.empty((n, 2))
+            angles.fill(float('nan'))
+        else:
+            angles = normalize_angles(np.reshape(angles, (n, 2)))
+        if values is None:
+            values = np.ones(n)
+        self.x, self.y, self.z = [np.ascontiguousarray(positions[:, i]) \
+            for i in range(3)]
+        self.rho, self.eta = [np.ascontiguousarray(angles[:, i]) \
+            for i in range(2)]
+        self.values = np.array(values, dtype=float).reshape(n)
+
+    @classmethod
+    def from_points(cls, points, values=None):
+        """\
+        Create a point array from a sequence of points.
+
+        @param points: The points.
+        @type points: C{list} of L{Point}
+        @param values: The relevance values of the points (default 1.0).
+        @type values: C{list} of C{float}
+        @return: The point array.
+        @rtype: L{PointArray}
+        """
+        points = list(points)
+        positions, angles = pack_points(points)
+        return cls(positions, angles, values)
+
+    @classmethod
+    def from_cache(cls, cache):
+        """\
+        Create a point array from a point cache (or any point-keyed mapping).
+
+        @param cache: The point cache.
+        @type cache: L{PointCache}
+        @return: The point array.
+        @rtype: L{PointArray}
+        """
+        points = list(cache)
+        return cls.from_points(points, [cache[point] for point in points])
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __repr__(self):
+        return '%s(%d points)' % (type(self).__name__, len(self))
+
+    @property
+    def positions(self):
+        """\
+        The M{(N, 3)} array of point positions.
+        """
+        return np.column_stack((self.x, self.y, self.z))
+
+    @property
+    def angles(self):
+        """\
+        The M{(N, 2)} array of direction angles (NaN if non-directional).
+        """
+        return np.column_stack((self.rho, self.eta))
+
+    @property
+    def directional(self):
+        """\
+        Boolean mask of directional points.
+        """
+        return ~np.isnan(self.rho)
+
+    def point(self, i):
+        """\
+        Return the point at a given index as a L{Point} or L{DirectionalPoint}.
+
+        @param i: The index.
+        @type i: C{int}
+        @return: The point.
+        @rtype: L{Point}
+        """
+        if np.isnan(self.rho[i]):
+            return Point(self.x[i], self.y[i], self.z[i])
+        return DirectionalPoint(self.x[i], self.y[i], self.z[i], self.rho[i],
+            self.eta[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.point(i)
+
+    def pose_map(self, pose):
+        """\
+        Return the points mapped through a pose, as in L{Pose.map}. The mapped
+        array shares the relevance values of this array.
+
+        @param pose: The pose.
+        @type pose: L{Pose}
+        @return: The mapped point array.
+        @rtype: L{PointArray}
+        """
+        mapped = type(self)(map_positions(pose, self.positions),
+            direction_angles(rotate_vectors(pose,
+            direction_vectors(self.angles))))
+        mapped.values = self.values
+        return mapped
+
+    def iteritems(self):
+        """\
+        Iterate over (point, value) pairs, so that a L{PointCache} may be
+        constructed from the array.
+        """
+        for i in range(len(self)):
+            yield self.point(i), self.values[i]
+
+    def _columns(self):
+        """\
+        Return the point coordinates as an M{(N, 5)} array.
+        """
+        return np.column_stack((self.x, self.y, self.z, self.rho, self.eta))
+
+    def _grid(self):
+        """\
+        Return the quantized grid coordinates and nearer-neighbour offsets of
+        the points. Non-directional points share a sentinel cell in the angular
+        dimensions.
+        """
+        scaled = self._columns() / (2 * self.tolerance)
+        nondirectional = np.isnan(scaled[:, 3])
+        scaled[nondirectional, 3:] = 0.0
+        cells = np.floor(scaled)
+        offsets = np.where(scaled - cells < 0.5, -1, 1).astype(np.int64)
+        cells = cells.astype(np.int64)
+        cells[nondirectional, 3:] = np.iinfo(np.int64).min
+        offsets[nondirectional, 3:] = 0
+        return cells, offsets
+
+    @property
+    def _index(self):
+        """\
+        Sorted grid cell keys and the corresponding point order.
+        """
+        try:
+            return self._index_c
+        except AttributeError:
+            keys = _row_keys(self._grid()[0])
+            order = np.argsort(keys, kind='mergesort')
+            self._index_c = keys[order], order
+            return self._index_c
+
+    def lookup(self, other):
+        """\
+        Find the index in this array of a point matching each point of another
+        array, or -1 where there is no match.
+
+        @param other: The points to look up.
+        @type other: L{PointArray}
+        @return: The indices of the matching points.
+        @rtype: C{numpy.ndarray}
+        """
+        result = -np.ones(len(other), dtype=np.intp)
+        if not len(self) or not len(other):
+            return result
+        keys, order = self._index
+        columns, ocolumns = self._columns(), other._columns()
+        cells, offsets = other._grid()
+        directional = other.directional
+        for probe in product((0, 1), repeat=5):
+            pending = result < 0
+            if not pending.any():
+                break
+            if probe[3] or probe[4]:
+                # Non-directional points have no angular neighbours.
+                pending &= directional
+            pending = np.flatnonzero(pending)
+            if not pending.size:
+                continue
+            pkeys = _row_keys(cells[pending] + offsets[pending] * probe)
+            lo = np.searchsorted(keys, pkeys, side='left')
+            hi = np.searchsorted(keys, pkeys, side='right')
+            while True:
+                live = lo < hi
+                if not live.any():
+                    break
+                candidates = order[lo[live]]
+                rows = pending[live]
+                with np.errstate(invalid='ignore'):
+                    match = np.all((np.abs(columns[candidates] - \
+                        ocolumns[rows]) < self.tolerance) | \
+                        (np.isnan(columns[candidates]) & \
+                        np.isnan(ocolumns[rows])), axis=1)
+                found = result[rows] < 0
+                result[rows[match & found]] = candidates[match & found]
+                lo[live] += 1
+        return result
+
+    def __contains__(self, point):
+        return self.lookup(type(self).from_points([point]))[0] >= 0
+
+    def __getitem__(self, point):
+        i = self.lookup(type(self).from_points([point]))[0]
+        if i < 0:
+            raise KeyError(point)
+        return self.values[i]
+
+    def _merge(self, other, ufunc):
+        """\
+        Merge another point array into a copy of this one, combining the
+        values of matching points with the given ufunc.
+        """
+        index = self.lookup(other)
+        matched = index >= 0
+        values = self.values.copy()
+        ufunc.at(values, index[matched], other.values[matched])
+        new = ~matched
+        return type(self)(np.vstack((self.positions, other.positions[new])),
+            np.vstack((self.angles, other.angles[new])),
+            np.concatenate((values, other.values[new])))
+
+    def __or__(self, other):
+        return self._merge(other, np.maximum)
+
+    def __and__(self, other):
+        return self._merge(other, np.minimum)
+
+
+def _row_keys(cells):
+    """\
+    Hash the rows of an integer array into single sortable keys. Distinct rows
+    may collide, so matches found through these keys must be verified.
+    """
+    cells = np.asarray(cells, dtype=np.int64)
+    with np.errstate(over='ignore'):
+        return np.dot(cells, _ROW_KEY_MULTIPLIERS[:cells.shape[1]])
+
+
+_ROW_KEY_MULTIPLIERS = np.array([73856093, 19349663, 83492791, 50331653,
+    25165843], dtype=np.int64)
+
+
+class TriangleArray(object):
+    """\
+    Packed triangle store.
+
+    A L{TriangleArray} holds a set of triangles as an M{(K, 9)} array of vertex
+    coordinates, for testing many line segments against all of them at once
+    with L{segment_triangle_intersection}. If the array is created from vertex
+    coordinates, the L{Triangle} objects are only created on request. If the
+    array is a translation of another (see L{translate}), the vertex
+    coordinates are also only computed on request.
+    """
+    def __init__(self, triangles):
+        """\
+        Constructor.
+
+        @param triangles: The triangles.
+        @type triangles: C{list} of L{Triangle}
+        """
+        self._triangles = list(triangles)
+        self._vertices = np.array([[c for v in triangle.vertices \
+            for c in (v.x, v.y, v.z)] for triangle in self._triangles],
+            dtype=float).reshape((-1, 9))
+
+    @classmethod
+    def from_vertices(cls, vertices):
+        """\
+        Create a triangle array from packed vertex coordinates.
+
+        @param vertices: The vertex coordinates (M{K x 9}).
+        @type vertices: C{numpy.ndarray}
+        @return: The triangle array.
+        @rtype: L{TriangleArray}
+        """
+        array = cls([])
+        array._vertices = np.asarray(vertices, dtype=float).reshape((-1, 9))
+        array._triangles = [None] * array._vertices.shape[0]
+        return array
+
+    def __len__(self):
+        return len(self._triangles)
+
+    @property
+    def vertices(self):
+        """\
+        The M{(K, 9)} array of vertex coordinates.
+
+        @rtype: C{numpy.ndarray}
+        """
+        try:
+            return self._vertices
+        except AttributeError:
+            source, offset = self.translation
+            self._vertices = source.vertices + np.tile(offset, 3)
+            return self._vertices
+
+    def triangle(self, i):
+        """\
+        Return one of the triangles, creating it if necessary.
+
+        @param i: The index of the triangle.
+        @type i: C{int}
+        @return: The triangle.
+        @rtype: L{Triangle}
+        """
+        if self._triangles[i] is None:
+            v = self.vertices[i].tolist()
+            self._triangles[i] = Triangle(Point(*v[0:3]), Point(*v[3:6]),
+                Point(*v[6:9]))
+        return self._triangles[i]
+
+    @property
+    def triangles(self):
+        """\
+        The triangles (all created, if necessary).
+
+        @rtype: C{list} of L{Triangle}
+        """
+        return [self.triangle(i) for i in range(len(self))]
+
+    def take(self, indices):
+        """\
+        Return a triangle array of a subset of the triangles, sharing any
+        triangles already created.
+
+        @param indices: The indices of the triangles.
+        @type indices: C{numpy.ndarray}
+        @return: The triangle array.
+        @rtype: L{TriangleArray}
+        """
+        array = type(self).from_vertices(self.vertices[indices])
+        array._triangles = [self._triangles[i] for i in indices]
+        return array
+
+    def translate(self, offset):
+        """\
+        Return the triangle array translated by an offset vector. The
+        translated array records the source array and offset as its
+        C{translation}, so that segment tests against many translations of one
+        array can be performed at once by translating the segments instead;
+        its own vertex coordinates (and triangles) are only computed on
+        request. A translation of a translated array shares the same source.
+
+        @param offset: The offset vector.
+        @type offset: C{numpy.ndarray}
+        @return: The translated triangle array.
+        @rtype: L{TriangleArray}
+        """
+        offset = np.asarray(offset, dtype=float).reshape(3)
+        try:
+            source, base = self.translation
+        except AttributeError:
+            source, base = self, np.zeros(3)
+        array = type(self)([])
+        del array._vertices
+        array._triangles = [None] * len(self)
+        array.translation = source, base + offset
+        return array
+
+    def digest(self):
+        """\
+        Content hash of the triangle geometry. This is cached, as the array is
+        not expected to change after construction.
+
+        @rtype: C{str}
+        """
+        try:
+            return self._digest
+        except AttributeError:
+            self._digest = sha1(np.ascontiguousarray(self.vertices).tostring())\
+                .hexdigest()
+            return self._digest
+
+    def bounds(self):
+        """\
+        Return the axis-aligned bounding box of the triangles. If there are no
+        triangles, the box is empty (its minimum corner is infinite and its
+        maximum corner negative infinite).
+
+        @return: The minimum and maximum corners of the bounding box.
+        @rtype: C{tuple} of C{numpy.ndarray}
+        """
+        if not len(self):
+            return np.array([float('inf')] * 3), np.array([-float('inf')] * 3)
+        vertices = self.vertices.reshape((-1, 3))
+        return vertices.min(axis=0), vertices.max(axis=0)
+
+    def normals(self):
+        """\
+        Return the unit normal vectors of the triangles, as in
+        L{Triangle.normal}.
+
+        @return: The normal vectors.
+        @rtype: C{numpy.ndarray}
+        """
+        v = self.vertices.reshape((-1, 3, 3))
+        normals = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 1])
+        return normals / np.sqrt((normals ** 2).sum(axis=1))[:, np.newaxis]
+
+    def intersect(self, origins, ends, limit=True, nearest=False):
+        """\
+        Test line segments against the triangles (see
+        L{segment_triangle_intersection}).
+
+        @param origins: The origins of the segments (or a single origin).
+        @type origins: C{numpy.ndarray}
+        @param ends: The ends of the segments.
+        @type ends: C{numpy.ndarray}
+        @param limit: If true, limit intersection to the line segments.
+        @type limit: C{bool}
+        @param nearest: If true, find the intersection nearest to the origin.
+        @type nearest: C{bool}
+        @return: Hit mask, signed intersection distances, and triangle indices.
+        @rtype: C{tuple} of C{numpy.ndarray}
+        """
+        origins = np.ascontiguousarray(origins, dtype=float).reshape((-1, 3))
+        ends = np.ascontiguousarray(ends, dtype=float).reshape((-1, 3))
+        hits = np.zeros(ends.shape[0], dtype=np.uint8)
+        distances = np.zeros(ends.shape[0])
+        indices = np.empty(ends.shape[0], dtype=np.intp)
+        indices.fill(-1)
+        if len(self):
+            segment_triangle_intersection(origins, ends, self.vertices,
+                bool(limit), bool(nearest), hits, distances, indices)
+        return hits.astype(bool), distances, indices
+
+
+class PointGrid(object):
+    """\
+    Uniform grid spatial index over an array of positions, for selecting the
+    points within an axis-aligned box.
+    """
+    def __init__(self, positions, cell_size=None):
+        """\
+        Constructor. By default, the cell size is chosen so that there are
+        roughly as many cells along the longest axis of the bounding box as the
+        cube root of the number of points.
+
+        @param positions: The positions of the points.
+        @type positions: C{numpy.ndarray}
+        @param cell_size: The edge length of the grid cells (optional).
+        @type cell_size: C{float}
+        """
+        self.positions = np.asarray(positions, dtype=float).reshape((-1, 3))
+        n = self.positions.shape[0]
+        if n:
+            self.lo = self.positions.min(axis=0)
+            self.hi = self.positions.max(axis=0)
+        else:
+            self.lo = self.hi = np.zeros(3)
+        if cell_size is None:
+            cell_size = max(float((self.hi - self.lo).max()), 1e-9) / \
+                max(1, int(round(n ** (1.0 / 3.0))))
+        self.cell_size = cell_size
+        self.shape = tuple((np.floor((self.hi - self.lo) / cell_size) \
+            .astype(int) + 1).tolist())
+        cells = self._cells(self.positions)
+        self._order = np.argsort(cells, kind='mergesort')
+        self._starts = np.concatenate(([0], np.cumsum(np.bincount(cells,
+            minlength=int(np.prod(self.shape))))))
+
+    def __len__(self):
+        return self.positions.shape[0]
+
+    def _cell_coordinates(self, positions):
+        """\
+        Return the (clipped) integer grid coordinates of positions.
+        """
+        return np.clip(np.floor((positions - self.lo) / self.cell_size) \
+            .astype(int), 0, np.array(self.shape) - 1)
+
+    def _cells(self, positions):
+        """\
+        Return the flat grid cell indices of positions.
+        """
+        return np.ravel_multi_index(self._cell_coordinates(positions).T,
+            self.shape).reshape(-1)
+
+    def query(self, lo, hi):
+        """\
+        Return the indices of the points within an axis-aligned box.
+
+        @param lo: The minimum corner of the box.
+        @type lo: C{numpy.ndarray}
+        @param hi: The maximum corner of the box.
+        @type hi: C{numpy.ndarray}
+        @return: The sorted indices of the points in the box.
+        @rtype: C{numpy.ndarray}
+        """
+        lo, hi = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+        if not len(self) or (lo > self.hi).any() or (hi < self.lo).any() \
+        or (lo > hi).any():
+            return np.zeros(0, dtype=np.intp)
+        clo = self._cell_coordinates(lo[np.newaxis])[0]
+        chi = self._cell_coordinates(hi[np.newaxis])[0]
+        cells = np.ravel_multi_index(np.meshgrid(*[np.arange(clo[i],
+            chi[i] + 1) for i in range(3)], indexing='ij'), self.shape).ravel()
+        starts = self._starts[cells]
+        counts = self._starts[cells + 1] - starts
+        # Gather the contents of all cells as one index array.
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        indices = self._order[offsets + np.arange(counts.sum())]
+        positions = self.positions[indices]
+        inside = ((positions >= lo) & (positions <= hi)).all(axis=1)
+        return np.sort(indices[inside])
+
+
+def _quaternion_product(p, q):
+    """\
+    Return the products of (broadcast) arrays of quaternions, as in
+    L{Quaternion._mul}, with quaternions stored as M{(a, x, y, z)} rows.
+    """
+    pa, pv = p[..., :1], p[..., 1:]
+    qa, qv = q[..., :1], q[..., 1:]
+    return np.concatenate((pa * qa - (pv * qv).sum(axis=-1)[..., np.newaxis],
+        qv * pa + pv * qa + np.cross(pv, qv)), axis=-1)
+
+
+class PoseArray(object):
+    """\
+    Packed pose store.
+
+    A L{PoseArray} holds a set of poses as an M{(N, 7)} array of translation
+    vectors and unit rotation quaternions, M{(x, y, z, a, b, c, d)}. It provides
+    the composition and inversion of L{Pose} (via the C{+}, C{-} and unary
+    C{-} operators) for all of the poses at once, and maps point arrays
+    through them. A single L{Pose} operand is broadcast over the array.
+    """
+    def __init__(self, data=None):
+        """\
+        Constructor.
+
+        @param data: The translations and rotation quaternions (optional).
+        @type data: C{numpy.ndarray}
+        """
+        if data is None:
+            data = np.empty((0, 7))
+        self.data = np.ascontiguousarray(data, dtype=float).reshape((-1, 7))
+
+    @classmethod
+    def from_poses(cls, poses):
+        """\
+        Create a pose array from a sequence of poses.
+
+        @param poses: The poses.
+        @type poses: C{list} of L{Pose}
+        @return: The pose array.
+        @rtype: L{PoseArray}
+        """
+        return cls([(pose.T.x, pose.T.y, pose.T.z, pose.R.Q.a, pose.R.Q.v.x,
+            pose.R.Q.v.y, pose.R.Q.v.z) for pose in poses])
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __repr__(self):
+        return '%s(%d poses)' % (type(self).__name__, len(self))
+
+    @property
+    def T(self):
+        """\
+        The M{(N, 3)} array of translation vectors.
+        """
+        return self.data[:, :3]
+
+    @property
+    def Q(self):
+        """\
+        The M{(N, 4)} array of rotation quaternions M{(a, b, c, d)}.
+        """
+        return self.data[:, 3:]
+
+    def pose(self, i):
+        """\
+        Return the pose at a given index as a L{Pose}.
+
+        @param i: The index.
+        @type i: C{int}
+        @return: The pose.
+        @rtype: L{Pose}
+        """
+        x, y, z, a, b, c, d = self.data[i].tolist()
+        return Pose(Point(x, y, z), Rotation(Quaternion(a, Point(b, c, d))))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.pose(i)
+
+    @staticmethod
+    def _packed(other):
+        """\
+        Return the packed data of a pose array or a single pose.
+        """
+        if isinstance(other, Pose):
+            return PoseArray.from_poses([other]).data
+        return other.data
+
+    def rotation_matrices(self):
+        """\
+        Return the rotation matrices of the poses, as in
+        L{Rotation.to_rotation_matrix}.
+
+        @return: The rotation matrices.
+        @rtype: C{numpy.ndarray}
+        """
+        a, b, c, d = [self.data[:, i] for i in range(3, 7)]
+        return np.array([[1.0 - 2.0 * (c * c + d * d), 2.0 * (b * c - a * d),
+            2.0 * (b * d + a * c)], [2.0 * (b * c + a * d),
+            1.0 - 2.0 * (b * b + d * d), 2.0 * (c * d - a * b)],
+            [2.0 * (b * d - a * c), 2.0 * (c * d + a * b),
+            1.0 - 2.0 * (b * b + c * c)]]).transpose((2, 0, 1))
+
+    def rotate(self, vectors):
+        """\
+        Rotate an array of vectors through the rotation of each pose.
+
+        @param vectors: The vectors to rotate (M{M x 3}).
+        @type vectors: C{numpy.ndarray}
+        @return: The rotated vectors (M{N x M x 3}).
+        @rtype: C{numpy.ndarray}
+        """
+        vectors = np.asarray(vectors, dtype=float).reshape((-1, 3))
+        return np.einsum('nij,mj->nmi', self.rotation_matrices(), vectors)
+
+    def map(self, positions):
+        """\
+        Map an array of positions through each pose.
+
+        @param positions: The positions to map (M{M x 3}).
+        @type positions: C{numpy.ndarray}
+        @return: The mapped positions (M{N x M x 3}).
+        @rtype: C{numpy.ndarray}
+        """
+        return self.rotate(positions) + self.T[:, np.newaxis]
+
+    def __add__(self, other):
+        """\
+        Pose composition: M{PB(PA(x)) = (PA + PB)(x)}, pairwise or with a
+        single pose.
+
+        @param other: The other pose transformations.
+        @type other: L{PoseArray} or L{Pose}
+        @return: Composed transformations.
+        @rtype: L{PoseArray}
+        """
+        other = PoseArray(self._packed(other))
+        T = (other.rotation_matrices() * self.T[:, np.newaxis]).sum(axis=2) \
+            + other.T
+        Q = _quaternion_product(other.Q, self.Q)
+        Q /= np.sqrt((Q ** 2).sum(axis=1))[:, np.newaxis]
+        return PoseArray(np.hstack((T, Q)))
+
+    def inverse(self):
+        """\
+        Return the inverses of the poses.
+
+        @return: Inverted poses.
+        @rtype: L{PoseArray}
+        """
+        inverse = PoseArray(np.hstack((np.zeros((len(self), 3)),
+            self.Q * np.array([1.0, -1.0, -1.0, -1.0]))))
+        inverse.data[:, :3] = -(inverse.rotation_matrices() * \
+            self.T[:, np.newaxis]).sum(axis=2)
+        return inverse
+
+    def __neg__(self):
+        return self.inverse()
+
+    def __sub__(self, other):
+        """\
+        Pose composition with the inverse, pairwise or with a single pose.
+
+        @param other: The other pose transformations.
+        @type other: L{PoseArray} or L{Pose}
+        @return: Composed transformations.
+        @rtype: L{PoseArray}
+        """
+        return self + PoseArray(self._packed(other)).inverse()
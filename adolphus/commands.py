@@ -35,10 +35,22 @@ from .laser import RangeModel
 from .tensor import TensorModel
 from .yamlparser import YAMLParser
 from .geometry import Angle, Point, DirectionalPoint, Quaternion, Rotation, Pose
+from .coverage import PointCache
 
 
 commands = {}
 
+# Commands which only signal another command in progress (e.g. L{cancel}). The
+# interfaces execute these as soon as they are received, rather than after the
+# command in progress has finished.
+immediate = set(['cancel'])
+
+# Commands which stream coverage results (see L{stream_coverage}). The display
+# executes these in a background thread, so that it remains responsive while
+# they run; they make their visualization updates through
+# L{Experiment.on_display}.
+background = set(['coverage', 'rangecoveragelt'])
+
 class CommandError(Exception):
     "Command failed (usually non-fatal)."
     pass
@@ -132,6 +144,13 @@ def event(ex, args, response):
     """
     ex.event.set()
 
+@command
+def cancel(ex, args, response):
+    """\
+    Cancel the coverage computation in progress (if any).
+    """
+    ex.cancel.set()
+
 @command
 def exit(ex, args, response):
     """\
@@ -618,6 +637,40 @@ def showtensors(ex, args, response):
         for t in ex.model[arg].triangles:
             t.toggle_tensor_vis()
 
+def stream_coverage(ex, key, task, stream):
+    """\
+    Collect the chunks of a coverage stream into the named coverage cache of
+    the experiment, visualizing each chunk and reporting progress (with the
+    running performance estimate) as it arrives. The stream stops early when
+    the L{cancel} command is executed.
+
+    @param ex: The experiment.
+    @type ex: L{Experiment}
+    @param key: The name of the coverage cache.
+    @type key: C{str}
+    @param task: The task model.
+    @type task: L{Task}
+    @param stream: The coverage stream (see L{Model.coverage_stream}).
+    @type stream: C{generator}
+    @return: The coverage performance (estimated, if cancelled).
+    @rtype: C{float}
+    """
+    ex.coverage[key] = PointCache()
+    Fn, Fd = 0.0, 0.0
+    performance = 0.0
+    for chunk, done, total in stream:
+        ex.coverage[key].update(chunk)
+        ex.on_display(ex.coverage[key].visualize, points=chunk)
+        # Running sums as in Model.performance.
+        points = chunk.keys()
+        relevance = task.relevance(points)
+        Fn += sum([chunk[point] * r for point, r in zip(points, relevance)])
+        Fd += relevance.sum()
+        performance = Fn / Fd if Fd else 0.0
+        ex.on_display(ex.display.message, '%s: %d/%d points, %.4f' % (key,
+            done, total, performance))
+    return performance
+
 @command
 def coverage(ex, args, response):
     """\
@@ -634,11 +687,10 @@ def coverage(ex, args, response):
         performance = {}
         if not args:
             args = ex.tasks.keys()
+        ex.cancel.clear()
         for arg in args:
-            ex.coverage[arg] = ex.model.coverage(ex.tasks[arg])
-            ex.coverage[arg].visualize()
-            performance[arg] = ex.model.performance(ex.tasks[arg],
-                coverage=ex.coverage[arg])
+            performance[arg] = stream_coverage(ex, arg, ex.tasks[arg],
+                ex.model.coverage_stream(ex.tasks[arg], cancel=ex.cancel))
         if response == 'pickle':
             return pickle.dumps(performance)
         elif response == 'csv':
@@ -668,7 +720,7 @@ def tensorcoverage(ex, args, response):
                     args.append(item)
         for arg in args:
             ex.coverage[arg] = ex.model.coverage(ex.model[arg])
-            ex.coverage[arg].visualize()
+            ex.on_display(ex.coverage[arg].visualize)
             performance[arg] = ex.model.performance(ex.model[arg], \
                 coverage=ex.coverage[arg])
         if response == 'pickle':
@@ -696,12 +748,12 @@ def rangecoveragelt(ex, args, response):
             taxis = Point(*[float(t) for t in args[1:4]])
         except (TypeError, IndexError):
             taxis = None
-        transport = RangeModel.LinearTargetTransport(ex.model)
-        ex.coverage['range'] = ex.model.range_coverage(ex.tasks[args[0]],
-                               transport, taxis=taxis)
-        ex.coverage['range'].visualize()
-        performance = ex.model.performance(ex.tasks[args[0]],
-            coverage=ex.coverage['range'])
+        transport = RangeModel.LinearTargetTransport(ex.model, taxis=taxis,
+            analytic=True)
+        ex.cancel.clear()
+        performance = stream_coverage(ex, 'range', ex.tasks[args[0]],
+            ex.model.range_coverage_stream(ex.tasks[args[0]], transport,
+            batch=True, cancel=ex.cancel))
         if response == 'pickle':
             return pickle.dumps(performance)
         elif response == 'csv':
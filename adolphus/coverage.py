@@ -14,6 +14,8 @@ from numbers import Number
 from itertools import combinations
 from math import pi, sin, cos, tan, atan, atan2
 
+import numpy as np
+
 HYPERGRAPH_ENABLED = True
 try:
     import hypergraph
@@ -22,7 +24,12 @@ except ImportError:
 
 from .posable import Posable, SceneObject
 from .visualization import Visualizable, VISUAL_SETTINGS
-from .geometry import Angle, Point, Pose, triangle_frustum_intersection, avg_points
+from .geometry import Angle, Point, Pose, triangle_frustum_intersection, \
+    avg_points, neighbour_probes
+from .occlusion import TriangleBVH, boxes_overlap, frustum_triangle_mask
+from .parallel import ShardPool
+from .batch import map_positions, rotate_vectors, direction_vectors, \
+    kocular_strength, PointArray, PointGrid, TriangleArray
 
 
 class PointCache(dict):
@@ -33,7 +40,39 @@ class PointCache(dict):
     involving task models and discrete coverage functions. It provides the
     equivalent of standard fuzzy intersection and union via the C{&} and C{|}
     operators, respectively. It also provides a visualization method.
+
+    Point hashes are computed from quantized coordinates, so a point may be
+    within tolerance of a cached point but fall into a neighbouring hash cell;
+    such lookups (item access, C{in}, and C{get}) are resolved by probing the
+    neighbouring cells.
     """
+    def _key(self, point):
+        """\
+        Return a key equal to the point which finds its cached entry (the point
+        itself or a neighbouring cell probe), or None if it is not cached.
+        """
+        if dict.__contains__(self, point):
+            return point
+        for probe in neighbour_probes(point):
+            if dict.__contains__(self, probe):
+                return probe
+        return None
+
+    def __missing__(self, point):
+        key = self._key(point)
+        if key is None:
+            raise KeyError(point)
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, point):
+        return self._key(point) is not None
+
+    def get(self, point, default=None):
+        key = self._key(point)
+        if key is None:
+            return default
+        return dict.__getitem__(self, key)
+
     def __or__(self, other):
         if len(self) < len(other):
             ds = self
@@ -43,8 +82,11 @@ class PointCache(dict):
             dl = self
         result = type(self)(dl)
         for point, value in ds.iteritems():
-            if not point in result or result[point] < value:
+            key = result._key(point)
+            if key is None:
                 result[point] = value
+            elif result[key] < value:
+                result[key] = value
         return result
 
     def __ior__(self, other):
@@ -60,10 +102,11 @@ class PointCache(dict):
             dl = self
         result = type(self)(dl)
         for point, value in ds.iteritems():
-            if not point in result:
+            key = result._key(point)
+            if key is None:
                 result[point] = value
             else:
-                result[point] = min(result[point], value)
+                result[key] = min(result[key], value)
         return result
 
     def __iand__(self, other):
@@ -71,25 +114,35 @@ class PointCache(dict):
         return self
 
     def __del__(self):
-        try:
-            self.visual.visible = False
-        except AttributeError:
-            pass
+        self._hide_visuals()
+
+    def _hide_visuals(self):
+        """\
+        Hide and discard all visualizations of the point cache.
+        """
+        for visual in getattr(self, 'visuals', []):
+            visual.visible = False
+        self.visuals = []
 
-    def visualize(self, color=(1, 0, 0)):
+    def visualize(self, color=(1, 0, 0), points=None):
         """\
         Visualize the point cache, with opacity representing coverage strength.
+        If a set of points is specified, only those points are visualized, in
+        addition to any existing visualization (e.g. to show results as they
+        are computed by L{Model.coverage_stream}).
 
         @param color: The color of the points.
         @type color: C{tuple} of C{float}
+        @param points: The points to add to the visualization (optional).
+        @type points: C{list} of L{Point}
         """
-        try:
-            self.visual.visible = False
-            del self.visual
-        except AttributeError:
-            pass
+        if points is None:
+            self._hide_visuals()
+            points = self
+        elif not hasattr(self, 'visuals'):
+            self.visuals = []
         primitives = []
-        for point in set([point for point in self if self[point]]):
+        for point in set([point for point in points if self[point]]):
             primitives.append({'type': 'sphere', 'pos': (point.x, point.y,
                 point.z), 'radius': 3 * VISUAL_SETTINGS['scale'],
                 'color': color, 'opacity': self[point]})
@@ -100,8 +153,8 @@ class PointCache(dict):
                     'opacity': self[point]})
             except AttributeError:
                 pass
-        self.visual = Visualizable(primitives=primitives)
-        self.visual.visualize()
+        self.visuals.append(Visualizable(primitives=primitives))
+        self.visuals[-1].visualize()
 
 
 class Task(Posable):
@@ -111,7 +164,10 @@ class Task(Posable):
     A L{Task} object is functionally a posable discrete set of relevant points
     to be covered according to requirements defined by its task parameters. It
     manages two L{PointCache} objects: a static original and a volatile version
-    mapped through its pose.
+    mapped through its pose. The mapped points are computed from a packed
+    L{PointArray} of the original points, mapped all at once; the mapped
+    L{PointCache} is only built (once per pose) when it is requested, and array
+    callers should use L{mapped_array} and L{relevance} instead.
 
     The available task parameters are:
 
@@ -150,6 +206,7 @@ class Task(Posable):
         """
         super(Task, self).__init__(pose=pose, mount=mount)
         self._params = {}
+        self._resolve_params()
         for param in params:
             self.setparam(param, params[param])
         self._original = original
@@ -158,10 +215,11 @@ class Task(Posable):
         """\
         Hook called on pose change.
         """
-        try:
-            del self._mapped
-        except AttributeError:
-            pass
+        for attribute in ['_mapped', '_mapped_array']:
+            try:
+                delattr(self, attribute)
+            except AttributeError:
+                pass
         super(Task, self)._pose_changed_hook()
 
     @property
@@ -171,28 +229,72 @@ class Task(Posable):
         """
         return self._original
 
+    @property
+    def original_array(self):
+        """\
+        Original (unmapped) task model points, packed.
+        """
+        try:
+            return self._original_array
+        except AttributeError:
+            self._original_array = PointArray.from_cache(self.original)
+            return self._original_array
+
+    @property
+    def mapped_array(self):
+        """\
+        Actual (mapped) task model points, packed. The relevance values are
+        shared with L{original_array}.
+        """
+        try:
+            return self._mapped_array
+        except AttributeError:
+            self._mapped_array = self.original_array.pose_map(self.pose)
+            return self._mapped_array
+
     @property
     def mapped(self):
         """\
-        Actual (mapped) task model points.
+        Actual (mapped) task model points, built from L{mapped_array} on first
+        access after each pose change.
         """
         try:
             return self._mapped
         except AttributeError:
-            self._mapped = PointCache()
-            for point in self.original:
-                self._mapped[self.pose.map(point)] = self.original[point]
+            self._mapped = PointCache(self.mapped_array.iteritems())
             return self._mapped
 
+    def relevance(self, points):
+        """\
+        Return the relevance values of a list of (mapped) task points, looked
+        up in L{mapped_array}.
+
+        @param points: The task points.
+        @type points: C{list} of L{Point}
+        @return: The relevance value of each point.
+        @rtype: C{numpy.ndarray}
+        """
+        index = self.mapped_array.lookup(PointArray.from_points(points))
+        if (index < 0).any():
+            raise KeyError(points[np.flatnonzero(index < 0)[0]])
+        return self.mapped_array.values[index]
+
     @property
     def params(self):
         """\
-        Task parameters, with defaults filled in for missing values.
+        Task parameters, with defaults filled in for missing values. These are
+        resolved whenever a parameter is set, so that the same dictionary is
+        returned until the next change.
         """
-        params = self.defaults
-        for param in self._params:
-            params[param] = self._params[param]
-        return params
+        return self._params_resolved
+
+    def _resolve_params(self):
+        """\
+        Resolve the task parameters, with defaults filled in.
+        """
+        params = dict(self.defaults)
+        params.update(self._params)
+        self._params_resolved = params
 
     def getparam(self, param):
         """\
@@ -239,6 +341,7 @@ class Task(Posable):
         if param == 'ocular':
             value = int(value)
         self._params[param] = value
+        self._resolve_params()
 
     def visualize(self):
         """\
@@ -262,6 +365,149 @@ class Task(Posable):
             self.visualize()
 
 
+class CoverageEvaluator(object):
+    """\
+    Pre-computed coverage strength evaluator for a single camera and set of
+    task parameters.
+
+    A L{CoverageEvaluator} holds the inverse camera pose and all of the
+    coverage component thresholds which do not depend on the point being
+    tested, so that evaluating a point requires only its mapping to camera
+    coordinates and a few comparisons. It is only valid as long as the camera
+    pose and parameters do not change (see L{Camera.evaluator}).
+
+    This is the only implementation of the scalar coverage components, to
+    which those of L{Camera} delegate; the array components of L{Camera} also
+    take their thresholds from it.
+    """
+    def __init__(self, camera, task_params):
+        """\
+        Constructor.
+
+        @param camera: The camera.
+        @type camera: L{Camera}
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        """
+        self.pose = camera.pose.inverse()
+        fov = camera.fov
+        self.tahl, self.tahr = fov['tahl'], fov['tahr']
+        self.tavt, self.tavb = fov['tavt'], fov['tavb']
+        # Visibility.
+        self.padded = bool(task_params['boundary_padding'])
+        if self.padded:
+            self.gh = task_params['boundary_padding'] / \
+                float(camera.getparam('dim')[0]) * fov['tah']
+            self.gv = task_params['boundary_padding'] / \
+                float(camera.getparam('dim')[1]) * fov['tav']
+        # Resolution.
+        self.zrmaxi = camera.zres(task_params['res_max'][0])
+        self.zrmaxa = camera.zres(task_params['res_max'][1])
+        self.zrmini = camera.zres(task_params['res_min'][0])
+        self.zrmina = camera.zres(task_params['res_min'][1])
+        # Focus.
+        smin = min(camera.getparam('s'))
+        self.zn, self.zf = camera.zc(task_params['blur_max'][1] * smin)
+        self.focus_step = task_params['blur_max'][0] == \
+            task_params['blur_max'][1]
+        if not self.focus_step:
+            self.zl, self.zr = camera.zc(task_params['blur_max'][0] * smin)
+        # View angle.
+        self.aa = cos(task_params['angle_max'][1])
+        self.angle_step = task_params['angle_max'][0] == \
+            task_params['angle_max'][1]
+        if not self.angle_step:
+            self.ai = cos(task_params['angle_max'][0])
+
+    def cv(self, p):
+        """\
+        Visibility component of the coverage function.
+
+        @param p: The point to test (in camera coordinates).
+        @type p: L{Point}
+        @return: The visibility coverage component value in M{[0, 1]}.
+        @rtype: C{float}
+        """
+        if p.z <= 0:
+            return 0.0
+        xz, yz = p.x / p.z, p.y / p.z
+        if not self.padded:
+            return float(xz > self.tahl and xz < self.tahr \
+                     and yz > self.tavt and yz < self.tavb)
+        return min(min(max((min(xz - self.tahl, self.tahr - xz) / self.gh),
+            0.0), 1.0), min(max((min(yz - self.tavt, self.tavb - yz) / \
+            self.gv), 0.0), 1.0))
+
+    def cr(self, p):
+        """\
+        Resolution component of the coverage function.
+
+        @param p: The point to test (in camera coordinates).
+        @type p: L{Point}
+        @return: The resolution coverage component value in M{[0, 1]}.
+        @rtype: C{float}
+        """
+        if self.zrmaxa == self.zrmaxi and self.zrmina == self.zrmini:
+            return float(p.z > self.zrmaxa and p.z < self.zrmina)
+        elif self.zrmaxa == self.zrmaxi:
+            return min(max((self.zrmina - p.z) / (self.zrmina - self.zrmini),
+                0.0), 1.0) if p.z > self.zrmaxa else 0.0
+        elif self.zrmina == self.zrmini:
+            return min(max((p.z - self.zrmaxa) / (self.zrmaxi - self.zrmaxa),
+                0.0), 1.0) if p.z < self.zrmina else 0.0
+        else:
+            return min(max(min((p.z - self.zrmaxa) / (self.zrmaxi - \
+                self.zrmaxa), (self.zrmina - p.z) / (self.zrmina - \
+                self.zrmini)), 0.0), 1.0)
+
+    def cf(self, p):
+        """\
+        Focus component of the coverage function.
+
+        @param p: The point to test (in camera coordinates).
+        @type p: L{Point}
+        @return: The focus coverage component value in M{[0, 1]}.
+        @rtype: C{float}
+        """
+        if self.focus_step:
+            return float(p.z > self.zn and p.z < self.zf)
+        return min(max(min((p.z - self.zn) / (self.zl - self.zn),
+                           (self.zf - p.z) / (self.zf - self.zr)), 0.0), 1.0)
+
+    def cd(self, p):
+        """\
+        View angle component of the coverage function.
+
+        @param p: The point to test (in camera coordinates).
+        @type p: L{Point}
+        @return: The view angle coverage component value in M{[0, 1]}.
+        @rtype: C{float}
+        """
+        try:
+            # Find the cosine of the angle between the ray from the camera to
+            # the point and the direction of the directional point.
+            sigma = -(p.unit()).dot(p.direction_unit())
+        except (ValueError, AttributeError):
+            # Point is at the origin or is non-directional.
+            return 1.0
+        if self.angle_step:
+            return float(sigma > self.aa)
+        return min(max((sigma - self.aa) / (self.ai - self.aa), 0.0), 1.0)
+
+    def strength(self, point):
+        """\
+        Return the coverage strength for a directional point (see
+        L{Camera.strength}).
+
+        @param point: The (directional) point to test.
+        @type point: L{Point}
+        @return: The coverage strength of the point.
+        @rtype: C{float}
+        """
+        cp = self.pose.map(point)
+        return self.cv(cp) * self.cr(cp) * self.cf(cp) * self.cd(cp)
+
+
 class Camera(SceneObject):
     """\
     Single-camera coverage strength model.
@@ -340,6 +586,10 @@ class Camera(SceneObject):
             value = [value, value]
         self._params[param] = value
         # Clear cached values if they depend on the parameter.
+        try:
+            del self._evaluator
+        except AttributeError:
+            pass
         if param in ['f', 's', 'o', 'dim']:
             try:
                 del self._fov
@@ -353,6 +603,39 @@ class Camera(SceneObject):
         for callback in self.paramcallbacks.values():
             callback()
 
+    def _pose_changed_hook(self):
+        """\
+        Hook called on pose change.
+        """
+        try:
+            del self._evaluator
+        except AttributeError:
+            pass
+        super(Camera, self)._pose_changed_hook()
+
+    def evaluator(self, task_params):
+        """\
+        Return the pre-computed coverage strength evaluator for this camera and
+        the given task parameters. The most recent evaluator is cached until
+        the task parameters, camera pose, or camera parameters change. Task
+        parameters are compared by identity, so they must not be modified in
+        place (L{Task.params} is replaced whenever a parameter is set).
+
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @return: The coverage strength evaluator.
+        @rtype: L{CoverageEvaluator}
+        """
+        try:
+            params, evaluator = self._evaluator
+            if params is task_params:
+                return evaluator
+        except AttributeError:
+            pass
+        evaluator = CoverageEvaluator(self, task_params)
+        self._evaluator = (task_params, evaluator)
+        return evaluator
+
     @property
     def fov(self):
         """\
@@ -397,7 +680,7 @@ class Camera(SceneObject):
         @rtype: C{tuple} of C{float}
         """
         cp = self.pose.inverse().map(point)
-        if self.cv(cp, {'boundary_padding': 0.0}):
+        if self.cv(cp, Task.defaults):
             return tuple([(self._params['f'] / self._params['s'][i]) * \
                 (cp[i] / cp.z) + self._params['o'][i] for i in range(2)])
         else:
@@ -442,100 +725,160 @@ class Camera(SceneObject):
 
     def cv(self, p, tp):
         """\
-        Visibility component of the coverage function.
+        Visibility component of the coverage function (see L{CoverageEvaluator}).
 
-        @param p: The point to test.
+        @param p: The point to test (in camera coordinates).
         @type p: L{Point}
         @param tp: Task parameters.
         @type tp: C{dict}
         @return: The visibility coverage component value in M{[0, 1]}.
         @rtype: C{float}
         """
-        if not tp['boundary_padding']:
-            return float(p.x / p.z > self.fov['tahl'] \
-                     and p.x / p.z < self.fov['tahr'] \
-                     and p.y / p.z > self.fov['tavt'] \
-                     and p.y / p.z < self.fov['tavb']) if p.z > 0 else 0.0
-        else:
-            gh = tp['boundary_padding'] / \
-                float(self._params['dim'][0]) * self.fov['tah']
-            gv = tp['boundary_padding'] / \
-                float(self._params['dim'][1]) * self.fov['tav']
-            return min(min(max((min(p.x / p.z - self.fov['tahl'],
-                self.fov['tahr'] - p.x / p.z) / gh), 0.0), 1.0),
-                min(max((min(p.y / p.z - self.fov['tavt'], self.fov['tavb'] - \
-                p.y / p.z) / gv), 0.0), 1.0)) if p.z > 0 else 0.0
+        return self.evaluator(tp).cv(p)
 
     def cr(self, p, tp):
         """\
-        Resolution component of the coverage function.
+        Resolution component of the coverage function (see L{CoverageEvaluator}).
 
-        @param p: The point to test.
+        @param p: The point to test (in camera coordinates).
         @type p: L{Point}
         @param tp: Task parameters.
         @type tp: C{dict}
         @return: The resolution coverage component value in M{[0, 1]}.
         @rtype: C{float}
         """
-        zrmaxi = self.zres(tp['res_max'][0])
-        zrmaxa = self.zres(tp['res_max'][1])
-        zrmini = self.zres(tp['res_min'][0])
-        zrmina = self.zres(tp['res_min'][1])
-        if zrmaxa == zrmaxi and zrmina == zrmini:
-            return float(p.z > zrmaxa and p.z < zrmina)
-        elif zrmaxa == zrmaxi:
-            return min(max((zrmina - p.z) / (zrmina - zrmini), 0.0), 1.0) \
-                if p.z > zrmaxa else 0.0
-        elif zrmina == zrmini:
-            return min(max((p.z - zrmaxa) / (zrmaxi - zrmaxa), 0.0), 1.0) \
-                if p.z < zrmina else 0.0
-        else:
-            return min(max(min((p.z - zrmaxa) / (zrmaxi - zrmaxa),
-                (zrmina - p.z) / (zrmina - zrmini)), 0.0), 1.0)
+        return self.evaluator(tp).cr(p)
 
     def cf(self, p, tp):
         """\
-        Focus component of the coverage function.
+        Focus component of the coverage function (see L{CoverageEvaluator}).
 
-        @param p: The point to test.
+        @param p: The point to test (in camera coordinates).
         @type p: L{Point}
         @param tp: Task parameters.
         @type tp: C{dict}
         @return: The focus coverage component value in M{[0, 1]}.
         @rtype: C{float}
         """
-        zn, zf = self.zc(tp['blur_max'][1] * min(self._params['s']))
-        if tp['blur_max'][0] == tp['blur_max'][1]:
-            return float(p.z > zn and p.z < zf)
-        else:
-            zl, zr = self.zc(tp['blur_max'][0] * min(self._params['s']))
-            return min(max(min((p.z - zn) / (zl - zn),
-                               (zf - p.z) / (zf - zr)), 0.0), 1.0)
+        return self.evaluator(tp).cf(p)
 
     def cd(self, p, tp):
         """\
-        View angle component of the coverage function.
+        View angle component of the coverage function (see L{CoverageEvaluator}).
 
-        @param p: The point to test.
+        @param p: The point to test (in camera coordinates).
         @type p: L{Point}
         @param tp: Task parameters.
         @type tp: C{dict}
         @return: The view angle coverage component value in M{[0, 1]}.
         @rtype: C{float}
         """
-        try:
-            # Find the cosine of the angle between the ray from the camera to
-            # the point and the direction of the directional point.
-            sigma = -(p.unit()).dot(p.direction_unit())
-        except (ValueError, AttributeError):
-            # Point is at the origin or is non-directional.
-            return 1.0
-        aa = cos(tp['angle_max'][1])
-        if tp['angle_max'][0] == tp['angle_max'][1]:
-            return float(sigma > aa)
+        return self.evaluator(tp).cd(p)
+
+    def cv_array(self, p, tp):
+        """\
+        Visibility component of the coverage function for an array of points.
+
+        @param p: The points to test (in camera coordinates).
+        @type p: C{numpy.ndarray}
+        @param tp: Task parameters.
+        @type tp: C{dict}
+        @return: The visibility coverage component values in M{[0, 1]}.
+        @rtype: C{numpy.ndarray}
+        """
+        e = self.evaluator(tp)
+        front = p[:, 2] > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            xz = p[:, 0] / p[:, 2]
+            yz = p[:, 1] / p[:, 2]
+        if not e.padded:
+            return (front & (xz > e.tahl) & (xz < e.tahr) \
+                & (yz > e.tavt) & (yz < e.tavb)).astype(float)
+        else:
+            with np.errstate(invalid='ignore'):
+                cv = np.minimum(np.clip(np.minimum(xz - e.tahl,
+                    e.tahr - xz) / e.gh, 0.0, 1.0),
+                    np.clip(np.minimum(yz - e.tavt, e.tavb - yz) / e.gv,
+                    0.0, 1.0))
+            return np.where(front, cv, 0.0)
+
+    def cr_array(self, p, tp):
+        """\
+        Resolution component of the coverage function for an array of points.
+
+        @param p: The points to test (in camera coordinates).
+        @type p: C{numpy.ndarray}
+        @param tp: Task parameters.
+        @type tp: C{dict}
+        @return: The resolution coverage component values in M{[0, 1]}.
+        @rtype: C{numpy.ndarray}
+        """
+        z = p[:, 2]
+        e = self.evaluator(tp)
+        zrmaxi, zrmaxa, zrmini, zrmina = e.zrmaxi, e.zrmaxa, e.zrmini, e.zrmina
+        with np.errstate(invalid='ignore'):
+            if zrmaxa == zrmaxi and zrmina == zrmini:
+                return ((z > zrmaxa) & (z < zrmina)).astype(float)
+            elif zrmaxa == zrmaxi:
+                return np.where(z > zrmaxa, np.clip((zrmina - z) / \
+                    (zrmina - zrmini), 0.0, 1.0), 0.0)
+            elif zrmina == zrmini:
+                return np.where(z < zrmina, np.clip((z - zrmaxa) / \
+                    (zrmaxi - zrmaxa), 0.0, 1.0), 0.0)
+            else:
+                return np.clip(np.minimum((z - zrmaxa) / (zrmaxi - zrmaxa),
+                    (zrmina - z) / (zrmina - zrmini)), 0.0, 1.0)
+
+    def cf_array(self, p, tp):
+        """\
+        Focus component of the coverage function for an array of points.
+
+        @param p: The points to test (in camera coordinates).
+        @type p: C{numpy.ndarray}
+        @param tp: Task parameters.
+        @type tp: C{dict}
+        @return: The focus coverage component values in M{[0, 1]}.
+        @rtype: C{numpy.ndarray}
+        """
+        z = p[:, 2]
+        e = self.evaluator(tp)
+        if e.focus_step:
+            return ((z > e.zn) & (z < e.zf)).astype(float)
         else:
-            ai = cos(tp['angle_max'][0])
-            return min(max((sigma - aa) / (ai - aa), 0.0), 1.0)
+            near = (z - e.zn) / (e.zl - e.zn)
+            # With an infinite far limit (e.g. the default blur_max), there is
+            # no far component (the scalar path's min() drops inf / inf).
+            if e.zf == float('inf'):
+                return np.clip(near, 0.0, 1.0)
+            return np.clip(np.minimum(near, (e.zf - z) / (e.zf - e.zr)), 0.0,
+                1.0)
+
+    def cd_array(self, p, d, tp):
+        """\
+        View angle component of the coverage function for an array of points.
+
+        @param p: The points to test (in camera coordinates).
+        @type p: C{numpy.ndarray}
+        @param d: The unit direction vectors of the points (in camera
+                  coordinates), with NaN rows for non-directional points.
+        @type d: C{numpy.ndarray}
+        @param tp: Task parameters.
+        @type tp: C{dict}
+        @return: The view angle coverage component values in M{[0, 1]}.
+        @rtype: C{numpy.ndarray}
+        """
+        magnitude = np.sqrt((p ** 2).sum(axis=1))
+        # Points at the origin or non-directional points are fully covered.
+        undefined = (magnitude == 0) | np.isnan(d[:, 0])
+        e = self.evaluator(tp)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma = -(p * d).sum(axis=1) / magnitude
+            if e.angle_step:
+                cd = (sigma > e.aa).astype(float)
+            else:
+                cd = np.clip((sigma - e.aa) / (e.ai - e.aa), 0.0, 1.0)
+        cd[undefined] = 1.0
+        return cd
 
     def occluded_by(self, triangle, task_params):
         """\
@@ -560,6 +903,25 @@ class Camera(SceneObject):
         # Return whether an intersection exists.
         return triangle_frustum_intersection(ctriangle, hull)
 
+    def occluded_by_array(self, triangles, task_params):
+        """\
+        Return whether this camera's field of view is occluded (in part) by
+        each of an array of triangles. This is the batch equivalent of
+        L{occluded_by}, with the frustum hull generated and all of the triangles
+        mapped to camera coordinates at once.
+
+        @param triangles: The (mapped) triangles to check.
+        @type triangles: L{TriangleArray}
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @return: True for each occluding triangle.
+        @rtype: C{numpy.ndarray}
+        """
+        vertices = map_positions(self.pose.inverse(),
+            triangles.vertices.reshape((-1, 3))).reshape((-1, 9))
+        return frustum_triangle_mask(self.gen_frustum_hull(task_params),
+            vertices)
+
     def strength(self, point, task_params):
         """\
         Return the coverage strength for a directional point. Note that since
@@ -573,11 +935,50 @@ class Camera(SceneObject):
         @return: The coverage strength of the point.
         @rtype: C{float}
         """
-        # Map the point to camera coordinates.
-        cp = self.pose.inverse().map(point)
-        # Return the coverage value.
-        return self.cv(cp, task_params) * self.cr(cp, task_params) \
-             * self.cf(cp, task_params) * self.cd(cp, task_params)
+        return self.evaluator(task_params).strength(point)
+
+    def strength_array(self, positions, directions, task_params, grid=None):
+        """\
+        Return the coverage strength for an array of (directional) points,
+        mapping all of them to camera coordinates at once. As with
+        L{strength}, occlusion is computed in the L{Model} object.
+
+        If a spatial index over the positions is given, only the points within
+        the bounds of the frustum (see L{frustum_bounds}) are evaluated; all
+        others have zero strength.
+
+        @param positions: The positions of the points to test.
+        @type positions: C{numpy.ndarray}
+        @param directions: The unit direction vectors of the points, with NaN
+                           rows for non-directional points.
+        @type directions: C{numpy.ndarray}
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @param grid: Spatial index over the positions (optional).
+        @type grid: L{PointGrid}
+        @return: The coverage strength of each point.
+        @rtype: C{numpy.ndarray}
+        """
+        if grid is not None:
+            bounds = self.frustum_bounds(task_params)
+            if bounds is not None:
+                strengths = np.zeros(positions.shape[0])
+                candidates = grid.query(*bounds)
+                strengths[candidates] = self.strength_array(
+                    positions[candidates], directions[candidates], task_params)
+                return strengths
+        # Map the points and directions to camera coordinates.
+        pose = self.evaluator(task_params).pose
+        return self._strength_array(map_positions(pose, positions),
+            rotate_vectors(pose, directions), task_params)
+
+    def _strength_array(self, p, d, tp):
+        """\
+        Return the coverage strength for an array of (directional) points in
+        camera coordinates.
+        """
+        return self.cv_array(p, tp) * self.cr_array(p, tp) \
+             * self.cf_array(p, tp) * self.cd_array(p, d, tp)
 
     def update_visualization(self):
         """\
@@ -615,6 +1016,27 @@ class Camera(SceneObject):
                      (self.fov['tahr'] * z, self.fov['tavt'] * z, z)]
         return hull
 
+    def frustum_bounds(self, task_params):
+        """\
+        Return the world axis-aligned bounding box of this camera's frustum
+        hull for a given task. Points outside of it have zero coverage
+        strength. If the frustum is unbounded, returns None.
+
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @return: The minimum and maximum corners of the bounding box.
+        @rtype: C{tuple} of C{numpy.ndarray}
+        """
+        hull = self.gen_frustum_hull(task_params)
+        if not hull:
+            return np.array([float('inf')] * 3), np.array([-float('inf')] * 3)
+        with np.errstate(invalid='ignore'):
+            vertices = map_positions(self.pose, np.array(hull, dtype=float))
+        if not np.isfinite(vertices).all():
+            return None
+        pad = 1e-6 + 1e-9 * np.abs(vertices).max()
+        return vertices.min(axis=0) - pad, vertices.max(axis=0) + pad
+
     def frustum_primitives(self, task_params):
         """\
         Generate the curve primitives for this camera's frustum for a given
@@ -679,6 +1101,10 @@ class Model(dict):
         self._oc_updated = {}
         self._oc_needs_update = {}
         self._oc_mask = set()
+        self._oc_bvh = {}
+        self._oc_array = {}
+        self._oc_bounds = {}
+        self.occlusion_store = None
 
     def __setitem__(self, key, value):
         # Mark occlusion cache for update.
@@ -702,6 +1128,8 @@ class Model(dict):
         self[key].visible = False
         self[key].__del__()
         self.cameras.discard(key)
+        if not key in self._oc_mask:
+            self._remove_from_occlusion_cache(key)
         self._oc_mask.discard(key)
         super(Model, self).__delitem__(key)
 
@@ -756,17 +1184,7 @@ class Model(dict):
         # Add the object to the mask.
         self._oc_mask.add(sceneobject)
         # Remove the object from existing cache.
-        obj_set = set(reduce(lambda a, b: a | b, [getattr(self, oc_set) \
-            for oc_set in self.oc_sets]))
-        for ckey in self._occlusion_cache:
-            for obj in obj_set:
-                for triangle in self[sceneobject].triangles:
-                    try:
-                        del self._occlusion_cache[ckey][obj]\
-                            [triangle.triangle]
-                    except KeyError:
-                        pass
-            self._oc_updated[ckey][sceneobject] = True
+        self._remove_from_occlusion_cache(sceneobject)
         # Remove occlusion cache callbacks from object.
         try:
             del self[sceneobject].posecallbacks['occlusion_cache']
@@ -799,6 +1217,45 @@ class Model(dict):
         if hasattr(self[sceneobject], 'paramcallbacks'):
             self[sceneobject].paramcallbacks['occlusion_cache'] = callback
 
+    def _remove_from_occlusion_cache(self, sceneobject):
+        """\
+        Remove the triangles of an object from the existing occlusion cache.
+
+        @param sceneobject: The object to remove.
+        @type sceneobject: C{str}
+        """
+        obj_set = set(reduce(lambda a, b: a | b, [getattr(self, oc_set) \
+            for oc_set in self.oc_sets]))
+        for ckey in self._occlusion_cache:
+            for obj in obj_set:
+                for triangle in self[sceneobject].triangles:
+                    try:
+                        del self._occlusion_cache[ckey][obj]\
+                            [triangle.triangle]
+                    except KeyError:
+                        pass
+                self._invalidate_occlusion_index(ckey, obj, sceneobject)
+            self._oc_bounds.get(ckey, {}).pop(sceneobject, None)
+            self._oc_updated[ckey][sceneobject] = True
+
+    def _invalidate_occlusion_index(self, key, obj, sceneobject=None):
+        """\
+        Discard the indexing structures built over an occlusion cache entry,
+        either entirely or for the triangles of one scene object.
+
+        @param key: The occlusion cache key.
+        @type key: C{tuple}
+        @param obj: The object ID.
+        @type obj: C{str}
+        @param sceneobject: The scene object ID (optional).
+        @type sceneobject: C{str}
+        """
+        self._oc_array.get(key, {}).pop(obj, None)
+        if sceneobject is None:
+            self._oc_bvh.get(key, {}).pop(obj, None)
+        else:
+            self._oc_bvh.get(key, {}).get(obj, {}).pop(sceneobject, None)
+
     def _update_occlusion_cache(self, task_params=None):
         if task_params:
             # The key is a hash on the values defining the frustum depth.
@@ -817,10 +1274,21 @@ class Model(dict):
         # Build a set of objects which can be occluded (e.g. cameras).
         obj_set = set(reduce(lambda a, b: a | b, [getattr(self, oc_set) \
             for oc_set in self.oc_sets]))
+        # Mapped triangles packed for batch occlusion tests, by scene object.
+        packed = {}
+        if key is not None:
+            # Bounds of the object frusta, and of the scene objects as of the
+            # last update (None if unbounded or unknown).
+            frusta = dict.fromkeys(obj_set)
+            for obj in obj_set:
+                if hasattr(self[obj], 'frustum_bounds'):
+                    frusta[obj] = self[obj].frustum_bounds(task_params)
+            bounds = self._oc_bounds.setdefault(key, {})
         # Update cache for all objects for any occludables needing update.
         for obj in set(obj_set):
             if not self._oc_updated[key][obj]:
                 self._occlusion_cache[key][obj] = {}
+                self._invalidate_occlusion_index(key, obj)
                 for sceneobject in self:
                     if sceneobject in self._oc_mask:
                         continue
@@ -829,38 +1297,145 @@ class Model(dict):
                             self._occlusion_cache[key][obj]\
                                 [triangle.triangle] = triangle.mapped_triangle()
                     else:
-                        for triangle in self[sceneobject].triangles:
-                            mt = triangle.mapped_triangle()
-                            if self[obj].occluded_by(mt, task_params):
-                                self._occlusion_cache[key][obj]\
-                                    [triangle.triangle] = mt
+                        if not sceneobject in packed:
+                            packed[sceneobject] = \
+                                self._mapped_triangles(sceneobject)
+                        keys, triangles = packed[sceneobject]
+                        if not boxes_overlap(frusta[obj], triangles.bounds()):
+                            continue
+                        mask = self._occlusion_mask(obj, triangles,
+                            task_params)
+                        for i in np.flatnonzero(mask):
+                            self._occlusion_cache[key][obj][keys[i]] = \
+                                triangles.triangle(i)
                 obj_set.remove(obj)
         # Update cache for all occludables for any objects needing update.
         for sceneobject in self:
             if sceneobject in self._oc_mask:
                 continue
             if not self._oc_updated[key][sceneobject]:
-                for obj in obj_set:
+                targets = obj_set
+                if key is not None and obj_set:
+                    if not sceneobject in packed:
+                        packed[sceneobject] = \
+                            self._mapped_triangles(sceneobject)
+                    keys, triangles = packed[sceneobject]
+                    # Only objects whose frustum overlaps the old or the new
+                    # bounds of the scene object can have changed entries.
+                    swept = (bounds.get(sceneobject), triangles.bounds())
+                    targets = [obj for obj in obj_set if any([boxes_overlap(\
+                        frusta[obj], box) for box in swept])]
+                for obj in targets:
+                    self._invalidate_occlusion_index(key, obj, sceneobject)
                     if key is None:
                         for triangle in self[sceneobject].triangles:
                             self._occlusion_cache[key][obj]\
                                 [triangle.triangle] = triangle.mapped_triangle()
                     else:
-                        for triangle in self[sceneobject].triangles:
-                            mt = triangle.mapped_triangle()
-                            if self[obj].occluded_by(mt, task_params):
-                                self._occlusion_cache[key][obj]\
-                                    [triangle.triangle] = mt
+                        mask = self._occlusion_mask(obj, triangles,
+                            task_params)
+                        for i, occluding in enumerate(mask):
+                            if occluding:
+                                self._occlusion_cache[key][obj][keys[i]] = \
+                                    triangles.triangle(i)
                             else:
                                 try:
                                     del self._occlusion_cache[key][obj]\
-                                        [triangle.triangle]
+                                        [keys[i]]
                                 except KeyError:
                                     pass
                 self._oc_updated[key][sceneobject] = True
+        if key is not None:
+            for sceneobject in packed:
+                bounds[sceneobject] = packed[sceneobject][1].bounds()
         self._oc_needs_update[key] = False
         return key
 
+    def _mapped_triangles(self, sceneobject):
+        """\
+        Return the mapped occluding triangles of a scene object packed for
+        batch occlusion tests, along with the original triangles (the
+        occlusion cache keys). Since the triangles of a scene object are a set,
+        they are sorted by their mapped vertices, so that the packing (and its
+        digest) is the same for the same geometry.
+
+        @param sceneobject: The scene object ID.
+        @type sceneobject: C{str}
+        @return: The original triangles and the packed mapped triangles.
+        @rtype: C{list} of L{Triangle}, L{TriangleArray}
+        """
+        occluding, triangles = self[sceneobject].packed_triangles()
+        order = np.lexsort(triangles.vertices.T[::-1])
+        return [occluding[i].triangle for i in order], triangles.take(order)
+
+    def _occlusion_mask(self, obj, triangles, task_params):
+        """\
+        Return whether an object is occluded by each of an array of mapped
+        triangles, from the persistent occlusion cache store if one is set and
+        it has a matching entry (computing and saving the entry otherwise).
+
+        @param obj: The object ID.
+        @type obj: C{str}
+        @param triangles: The packed mapped triangles.
+        @type triangles: L{TriangleArray}
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @return: True for each occluding triangle.
+        @rtype: C{numpy.ndarray}
+        """
+        if self.occlusion_store is None:
+            return self[obj].occluded_by_array(triangles, task_params)
+        digest = self.occlusion_store.digest(type(self[obj]).__name__,
+            self[obj].params, self[obj].pose, task_params, triangles.digest())
+        mask = np.zeros(len(triangles), dtype=bool)
+        if digest in self.occlusion_store:
+            mask[self.occlusion_store.load(digest)] = True
+        else:
+            mask = self[obj].occluded_by_array(triangles, task_params)
+            self.occlusion_store.save(digest, np.flatnonzero(mask))
+        return mask
+
+    def _occlusion_bvhs(self, key, obj):
+        """\
+        Return the bounding volume hierarchies (one per scene object) over the
+        occlusion cache entry for an object, building any which are missing.
+
+        @param key: The occlusion cache key.
+        @type key: C{tuple}
+        @param obj: The object ID.
+        @type obj: C{str}
+        @return: The bounding volume hierarchies.
+        @rtype: C{list} of L{TriangleBVH}
+        """
+        forest = self._oc_bvh.setdefault(key, {}).setdefault(obj, {})
+        cache = self._occlusion_cache[key][obj]
+        for sceneobject in self:
+            if sceneobject in self._oc_mask or sceneobject in forest:
+                continue
+            forest[sceneobject] = TriangleBVH([cache[triangle.triangle] \
+                for triangle in self[sceneobject].triangles \
+                if triangle.triangle in cache])
+        return forest.values()
+
+    def _occlusion_array(self, key, obj):
+        """\
+        Return the packed triangle array over the occlusion cache entry for an
+        object, building it if necessary.
+
+        @param key: The occlusion cache key.
+        @type key: C{tuple}
+        @param obj: The object ID.
+        @type obj: C{str}
+        @return: The packed triangle array.
+        @rtype: L{TriangleArray}
+        """
+        arrays = self._oc_array.setdefault(key, {})
+        try:
+            return arrays[obj]
+        except KeyError:
+            arrays[obj] = TriangleArray(self._occlusion_cache[key][obj].values())
+            return arrays[obj]
+
     def occluded(self, point, obj, task_params=None, triangle_set=None):
         """\
         Return whether the specified point is occluded with respect to the
@@ -874,23 +1449,59 @@ class Model(dict):
         @param task_params: Task parameters (optional).
         @type task_params: C{dict}
         @param triangle_set: Alternative triangle set to use.
-        @type triangle_set: C{list} of L{Triangle}
+        @type triangle_set: C{list} of L{Triangle} or L{TriangleArray}
         @return: True if occluded.
         @rtype: C{bool}
         """
         if triangle_set is None:
             key = self._update_occlusion_cache(task_params)
-            triangle_set = self._occlusion_cache[key][obj].values()
+            for bvh in self._occlusion_bvhs(key, obj):
+                if bvh.intersects(self[obj].pose.T, point):
+                    return True
+            return False
+        if isinstance(triangle_set, TriangleArray):
+            return bool(triangle_set.intersect(self[obj].pose.T.to_list(),
+                point.to_list())[0][0])
         for triangle in triangle_set:
             if triangle.intersection(self[obj].pose.T, point, True):
                 return True
         return False
 
+    def occluded_many(self, points, obj, task_params=None, triangle_set=None):
+        """\
+        Return whether each of an array of points is occluded with respect to
+        the specified object. This is the batch equivalent of L{occluded}.
+
+        @param points: The positions of the points to check.
+        @type points: C{numpy.ndarray}
+        @param obj: The object ID to check.
+        @type obj: C{str}
+        @param task_params: Task parameters (optional).
+        @type task_params: C{dict}
+        @param triangle_set: Alternative triangle set to use.
+        @type triangle_set: C{list} of L{Triangle} or L{TriangleArray}
+        @return: True for each occluded point.
+        @rtype: C{numpy.ndarray}
+        """
+        if triangle_set is None:
+            key = self._update_occlusion_cache(task_params)
+            triangles = self._occlusion_array(key, obj)
+        elif isinstance(triangle_set, TriangleArray):
+            triangles = triangle_set
+        else:
+            triangles = TriangleArray(triangle_set)
+        return triangles.intersect(self[obj].pose.T.to_list(), points)[0]
+
     def strength(self, point, task_params, subset=None, triangle_set=None):
         """\
         Return the individual coverage strength of a point in the coverage
         strength model.
 
+        The strength over the best I{k}-ocular view is the I{k}-th largest of
+        the (unoccluded) camera strengths. Occlusion is checked for cameras in
+        order of decreasing strength, stopping as soon as I{k} unoccluded
+        cameras are found, or too few cameras with non-zero strength remain.
+
         @param point: The (directional) point to test.
         @type point: L{Point}
         @param task_params: Task parameters.
@@ -902,32 +1513,136 @@ class Model(dict):
         @return: The coverage strength of the point.
         @rtype: C{float}
         """
-        maxstrength = 0.0
-        # If there are no views, this loop does nothing and 0.0 is returned.
-        for view in self.views(ocular=task_params['ocular'], subset=subset):
-            # The view has at least one camera, so minstrength will be
-            # overwritten with the minimum strength within the view.
-            minstrength = float('inf')
-            for camera in view:
-                # Check the coverage strength for this camera.
-                strength = self[camera].strength(point, task_params)
-                # The following should short-circuit if strength = 0, and thus
-                # not incur a performance hit for the occlusion check(s).
-                if not strength or self.occluded(point, camera,
-                task_params=task_params) or (triangle_set and
-                self.occluded(point, camera, triangle_set=triangle_set)):
-                    minstrength = 0.0
-                    break
-                elif strength < minstrength:
-                    minstrength = strength
-            # Update the maximum strength for any view.
-            maxstrength = max(maxstrength, minstrength)
-            # If the strength is 1.0, return it immediately.
-            if maxstrength == 1.0:
+        ocular = task_params['ocular']
+        if ocular < 1:
+            return 0.0
+        strengths = []
+        for camera in subset or self.active_cameras:
+            strength = self[camera].strength(point, task_params)
+            if strength:
+                strengths.append((strength, camera))
+        strengths.sort(reverse=True)
+        # Only cameras with non-zero strength need the occlusion check(s).
+        for i, (strength, camera) in enumerate(strengths):
+            if len(strengths) - i < ocular:
                 break
-        return maxstrength
+            if self.occluded(point, camera, task_params=task_params) or \
+            (triangle_set and self.occluded(point, camera,
+            triangle_set=triangle_set)):
+                continue
+            ocular -= 1
+            if not ocular:
+                return strength
+        return 0.0
+
+    def strength_array(self, positions, angles, task_params, subset=None):
+        """\
+        Return the individual coverage strength of an array of points in the
+        coverage strength model. This is the batch equivalent of L{strength}.
+
+        @param positions: The positions of the points to test.
+        @type positions: C{numpy.ndarray}
+        @param angles: The direction angles (rho, eta) of the points, with NaN
+                       rows for non-directional points (optional).
+        @type angles: C{numpy.ndarray}
+        @param task_params: Task parameters.
+        @type task_params: C{dict}
+        @param subset: Subset of cameras (defaults to all active cameras).
+        @type subset: C{set}
+        @return: The coverage strength of each point.
+        @rtype: C{numpy.ndarray}
+        """
+        positions = np.asarray(positions, dtype=float).reshape((-1, 3))
+        if angles is None:
+            directions = np.empty_like(positions)
+            directions.fill(float('nan'))
+        else:
+            directions = direction_vectors(angles)
+        grid = PointGrid(positions)
+        strengths = {}
+        for camera in subset or self.active_cameras:
+            strengths[camera] = self[camera].strength_array(positions,
+                directions, task_params, grid=grid)
+            # Only points with non-zero strength need the occlusion check.
+            visible = np.flatnonzero(strengths[camera])
+            occluded = self.occluded_many(positions[visible], camera,
+                task_params=task_params)
+            strengths[camera][visible[occluded]] = 0.0
+        return kocular_strength(np.reshape(strengths.values(),
+            (len(strengths), positions.shape[0])), task_params['ocular'])
+
+    def prepare_occlusion_cache(self, task_params=None):
+        """\
+        Bring the occlusion cache and its indexing structures up to date for
+        all occludable objects, so that they can be shared by worker processes
+        (see L{parallel}).
+
+        @param task_params: Task parameters (optional).
+        @type task_params: C{dict}
+        """
+        key = self._update_occlusion_cache(task_params)
+        for obj in self._occlusion_cache[key]:
+            self._occlusion_bvhs(key, obj)
+            self._occlusion_array(key, obj)
+
+    def _coverage_values(self, points, task_params, subset, batch):
+        """\
+        Return the coverage strength of each of a list of points.
+        """
+        if batch:
+            points = PointArray.from_points(points)
+            return self.strength_array(points.positions, points.angles,
+                task_params, subset).tolist()
+        # Calculate coverage strength for each mapped task point.
+        return [self.strength(point, task_params, subset) for point in points]
+
+    def coverage_stream(self, task, subset=None, batch=False, processes=1,
+                        chunksize=256, cancel=None):
+        """\
+        Generator which evaluates the coverage model of this multi-camera
+        network with respect to the points in a given task model in chunks,
+        yielding the coverage of each chunk along with the number of points
+        evaluated so far and in total.
 
-    def coverage(self, task, subset=None):
+        Evaluation stops before the next chunk if the cancellation event is
+        set (or if the generator is closed). The union of the chunks yielded so
+        far may be passed to L{performance} for an estimate of the coverage
+        performance over the points evaluated.
+
+        @param task: The task model.
+        @type task: L{Task}
+        @param subset: Subset of cameras (defaults to all active cameras).
+        @type subset: C{set}
+        @param batch: If true, evaluate the points of each chunk at once with
+                      array operations (see L{strength_array}).
+        @type batch: C{bool}
+        @param processes: Number of worker processes over which to distribute
+                          the points of each chunk (see L{parallel}); the
+                          workers are started once for the whole stream.
+        @type processes: C{int}
+        @param chunksize: The number of points per chunk (None for a single
+                          chunk).
+        @type chunksize: C{int}
+        @param cancel: Cancellation event (optional).
+        @type cancel: C{threading.Event}
+        @return: The coverage of the chunk, and the evaluated and total numbers
+                 of points.
+        @rtype: L{PointCache}, C{int}, C{int}
+        """
+        points = list(task.mapped_array)
+        chunksize = chunksize or max(len(points), 1)
+        if processes > 1:
+            self.prepare_occlusion_cache(task.params)
+        with ShardPool(self._coverage_values, points, processes, task.params,
+                subset, batch) as pool:
+            for start in range(0, len(points), chunksize):
+                if cancel is not None and cancel.is_set():
+                    return
+                chunk = points[start:start + chunksize]
+                yield PointCache(zip(chunk, pool.map(start,
+                    start + len(chunk)))), start + len(chunk), len(points)
+
+    def coverage(self, task, subset=None, batch=False, processes=1):
         """\
         Return the coverage model of this multi-camera network with respect to
         the points in a given task model.
@@ -936,13 +1651,19 @@ class Model(dict):
         @type task: L{Task}
         @param subset: Subset of cameras (defaults to all active cameras).
         @type subset: C{set}
+        @param batch: If true, evaluate all points at once with array
+                      operations (see L{strength_array}).
+        @type batch: C{bool}
+        @param processes: Number of worker processes over which to distribute
+                          the task points (see L{parallel}).
+        @type processes: C{int}
         @return: The coverage model.
         @rtype: L{PointCache}
         """
         coverage = PointCache()
-        for point in task.mapped:
-            # Calculate coverage strength for each mapped task point.
-            coverage[point] = self.strength(point, task.params, subset)
+        for chunk, done, total in self.coverage_stream(task, subset=subset,
+                batch=batch, processes=processes, chunksize=None):
+            coverage.update(chunk)
         return coverage
 
     def performance(self, task, subset=None, coverage=None):
@@ -950,7 +1671,8 @@ class Model(dict):
         Return the coverage performance of this multi-camera network with
         respect to a given task model. If a previously computed coverage cache
         is provided, it is assumed to contain the same points as the mapped
-        task model.
+        task model; if it contains only some of them (e.g. the partial results
+        of L{coverage_stream}), the performance is estimated over those points.
 
         @param task: The task model.
         @type task: L{Task}
@@ -961,12 +1683,17 @@ class Model(dict):
         @return: Performance metric in [0, 1].
         @rtype: C{float}
         """
-        coverage = coverage or self.coverage(task, subset)
-        Fn, Fd = 0.0, 0.0
-        for point in coverage.keys():
-            Fn += coverage[point] * task.mapped[point]
-            Fd += task.mapped[point]
-        return Fn / Fd
+        if coverage is None:
+            coverage = self.coverage(task, subset)
+        points = coverage.keys()
+        if not points:
+            return 0.0
+        relevance = task.relevance(points)
+        Fd = relevance.sum()
+        if not Fd:
+            return 0.0
+        return float(np.dot([coverage[point] for point in points],
+            relevance) / Fd)
 
     def performance_complex(self, task, subset=None, coverage=None):
         """\
@@ -1087,3 +1814,169 @@ class Model(dict):
         """
         for sceneobject in self:
             self[sceneobject].update_visualization()
+
+
+class IncrementalCoverage(object):
+    """\
+    Incrementally maintained coverage model of a task.
+
+    An L{IncrementalCoverage} object keeps, for each camera, the coverage
+    strength of every task point, and for each camera and scene object, which
+    task points are occluded by that object. Pose and parameter change
+    callbacks on the objects in the model mark only the affected results for
+    recomputation, so that after a single camera moves, only its own strengths
+    and occlusion results (and the occlusion of other cameras by its
+    triangles) are recomputed before the I{k}-ocular reduction across views.
+
+    Changes to the task pose or parameters, the set of objects in the model, or
+    the occlusion cache mask cause a full recomputation. The L{close} method
+    should be called when the object is no longer needed, to remove its
+    callbacks from the model.
+    """
+    def __init__(self, model, task, subset=None):
+        """\
+        Constructor.
+
+        @param model: The coverage model.
+        @type model: L{Model}
+        @param task: The task model.
+        @type task: L{Task}
+        @param subset: Subset of cameras (defaults to all active cameras).
+        @type subset: C{set}
+        """
+        self.model = model
+        self.task = task
+        self.subset = subset
+        self._callback_key = 'incremental_coverage_%d' % id(self)
+        self._objects = {}
+        self.task.posecallbacks[self._callback_key] = self._reset
+        self._reset()
+
+    def _reset(self):
+        """\
+        Discard all results.
+        """
+        self._points = None
+        self._strengths = {}
+        self._occlusion = {}
+        self._dirty_objects = set()
+
+    def _register(self):
+        """\
+        Register change callbacks on all objects in the model.
+        """
+        self.close(task=False)
+        for key in self.model:
+            def pose_callback(key=key):
+                self._dirty_objects.add(key)
+                self._strengths.pop(key, None)
+            def param_callback(key=key):
+                self._strengths.pop(key, None)
+            self.model[key].posecallbacks[self._callback_key] = pose_callback
+            if hasattr(self.model[key], 'paramcallbacks'):
+                self.model[key].paramcallbacks[self._callback_key] = \
+                    param_callback
+            self._objects[key] = self.model[key]
+
+    def close(self, task=True):
+        """\
+        Remove the change callbacks from the model (and the task).
+
+        @param task: If true, also remove the callback from the task.
+        @type task: C{bool}
+        """
+        for obj in self._objects.values():
+            obj.posecallbacks.pop(self._callback_key, None)
+            if hasattr(obj, 'paramcallbacks'):
+                obj.paramcallbacks.pop(self._callback_key, None)
+        self._objects = {}
+        if task:
+            self.task.posecallbacks.pop(self._callback_key, None)
+
+    def _state(self):
+        """\
+        Return the state which, when changed, requires a full recomputation.
+        """
+        return (dict(self.task.params), set(self.model.keys()),
+            set(self.model.oc_mask))
+
+    def _occluded(self, key, camera, sceneobject):
+        """\
+        Return which task points with non-zero strength for a camera are
+        occluded by the triangles of a scene object.
+        """
+        cache = self.model._occlusion_cache[key][camera]
+        triangles = TriangleArray([cache[triangle.triangle] for triangle \
+            in self.model[sceneobject].triangles if triangle.triangle in cache])
+        occluded = np.zeros(len(self._points), dtype=bool)
+        if len(triangles):
+            visible = np.flatnonzero(self._strengths[camera])
+            occluded[visible] = triangles.intersect(
+                self.model[camera].pose.T.to_list(),
+                self._points.positions[visible])[0]
+        return occluded
+
+    def _update(self):
+        """\
+        Recompute all results marked for update.
+
+        @return: The coverage strength of each task point.
+        @rtype: C{numpy.ndarray}
+        """
+        if self._points is None or self._state() != self._last_state:
+            self._reset()
+            self._register()
+            self._points = self.task.mapped_array
+            self._point_list = list(self._points)
+            self._directions = direction_vectors(self._points.angles)
+            self._grid = PointGrid(self._points.positions)
+            self._last_state = self._state()
+        task_params = self.task.params
+        key = self.model._update_occlusion_cache(task_params)
+        cameras = self.subset or self.model.active_cameras
+        columns = {}
+        for camera in cameras:
+            if not camera in self._strengths:
+                self._strengths[camera] = self.model[camera].strength_array(
+                    self._points.positions, self._directions, task_params,
+                    grid=self._grid)
+                self._occlusion[camera] = {}
+            occlusion = self._occlusion[camera]
+            for sceneobject in self.model:
+                if sceneobject in self.model.oc_mask:
+                    continue
+                if not sceneobject in occlusion \
+                or sceneobject in self._dirty_objects:
+                    occlusion[sceneobject] = self._occluded(key, camera,
+                        sceneobject)
+            columns[camera] = np.where(reduce(np.logical_or,
+                occlusion.values(), np.zeros(len(self._points), dtype=bool)),
+                0.0, self._strengths[camera])
+        # Results for inactive cameras are stale once any object moves.
+        for camera in set(self._occlusion) - set(cameras):
+            for sceneobject in self._dirty_objects:
+                self._occlusion[camera].pop(sceneobject, None)
+        self._dirty_objects = set()
+        return kocular_strength(np.reshape(columns.values(),
+            (len(columns), len(self._points))), task_params['ocular'])
+
+    def coverage(self):
+        """\
+        Return the (updated) coverage model of the task.
+
+        @return: The coverage model.
+        @rtype: L{PointCache}
+        """
+        values = self._update()
+        return PointCache(zip(self._point_list, values.tolist()))
+
+    def performance(self):
+        """\
+        Return the (updated) coverage performance of the task.
+
+        @return: Performance metric in [0, 1].
+        @rtype: C{float}
+        """
+        values = self._update()
+        Fd = self._points.values.sum()
+        return float(np.dot(values, self._points.values) / Fd) if Fd else 0.0
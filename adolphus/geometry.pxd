@@ -10,6 +10,10 @@ Geometry module definition file.
 from cpython cimport bool
 
 
+cdef struct vec3:
+    double x, y, z
+
+
 cdef class Point:
     cdef public double x, y, z
     cdef double _magnitude
@@ -53,7 +57,11 @@ cdef class Quaternion:
 
 
 cdef class Rotation:
-    cdef public Quaternion Q
+    cdef readonly Quaternion Q
+    cdef double _matrix[3][3]
+    cdef bint _matrix_c
+    cdef void _cache_matrix(self)
+    cdef vec3 _rotate(self, vec3 p)
     cpdef Rotation _add(self, Rotation other)
     cpdef Rotation inverse(self)
     cpdef Point rotate(self, Point p)
@@ -69,6 +77,7 @@ cdef class Pose:
     cpdef Point _map(self, Point p)
     cpdef Point _dmap(self, Point p)
     cpdef Point map(self, Point p)
+    cpdef map_many(self, double[:, :] positions, double[:, :] out)
 
 
 cdef class Face:
@@ -96,5 +105,8 @@ cpdef bool point_in_segment(Point s1, Point s2, Point p)
 cpdef double point_segment_dis(Point s1, Point s2, Point p)
 cpdef bool segment_intersect(Point p1, Point p2, Point q1, Point q2)
 cpdef bool triangle_frustum_intersection(Triangle triangle, object hull)
+cpdef int segment_triangle_intersection(double[:, :] origins,
+    double[:, :] ends, double[:, :] triangles, bool limit, bool nearest,
+    unsigned char[:] hits, double[:] distances, Py_ssize_t[:] indices)
 cpdef Point avg_points(object points)
 cpdef Quaternion avg_quaternions(object qts)
@@ -11,7 +11,10 @@ geometric descriptor functions for features.
 from math import pi, sqrt, sin, cos, asin, acos, atan2, copysign
 from random import uniform, gauss
 from functools import reduce
+from itertools import product
+cimport cython
 from cpython cimport bool
+from libc.math cimport floor, fabs, sqrt as c_sqrt
 
 
 class Angle(float):
@@ -33,6 +36,87 @@ class Angle(float):
         return Angle(-float(self))
 
 
+cdef inline long long _quantize(double value):
+    """\
+    Quantize a coordinate to the nearest multiple of twice the point tolerance,
+    so that points equal to it lie either in the same cell or in the
+    neighbouring cell on the nearer side.
+    """
+    return <long long>floor(value * 5e3 + 0.5)
+
+
+cdef long _hash_cells(unsigned long seed, long long *cells, int n):
+    """\
+    Combine quantized coordinates into a hash value, in the manner of the
+    built-in tuple hash.
+    """
+    cdef unsigned long x = seed, y, mult = 1000003UL
+    cdef int i
+    for i in range(n):
+        y = <unsigned long>(cells[i] ^ (cells[i] >> 32))
+        x = (x ^ y) * mult
+        mult += <unsigned long>(82520 + n + n)
+    x += 97531UL
+    if <long>x == -1:
+        return -2
+    return <long>x
+
+
+# Inline vector arithmetic on C structs (vec3, declared in the definition
+# file), used internally by the geometry hot paths in place of the L{Point}
+# operations, which allocate a new object each.
+
+cdef inline vec3 _vec(Point p):
+    cdef vec3 r
+    r.x = p.x; r.y = p.y; r.z = p.z
+    return r
+
+
+cdef inline Point _point(vec3 a):
+    return Point(a.x, a.y, a.z)
+
+
+cdef inline vec3 _vadd(vec3 a, vec3 b):
+    cdef vec3 r
+    r.x = a.x + b.x; r.y = a.y + b.y; r.z = a.z + b.z
+    return r
+
+
+cdef inline vec3 _vsub(vec3 a, vec3 b):
+    cdef vec3 r
+    r.x = a.x - b.x; r.y = a.y - b.y; r.z = a.z - b.z
+    return r
+
+
+cdef inline vec3 _vmul(vec3 a, double s):
+    cdef vec3 r
+    r.x = a.x * s; r.y = a.y * s; r.z = a.z * s
+    return r
+
+
+cdef inline vec3 _vdiv(vec3 a, double s):
+    cdef vec3 r
+    r.x = a.x / s; r.y = a.y / s; r.z = a.z / s
+    return r
+
+
+cdef inline double _vdot(vec3 a, vec3 b):
+    return a.x * b.x + a.y * b.y + a.z * b.z
+
+
+cdef inline vec3 _vcross(vec3 a, vec3 b):
+    cdef vec3 r
+    r.x = a.y * b.z - a.z * b.y
+    r.y = a.z * b.x - a.x * b.z
+    r.z = a.x * b.y - a.y * b.x
+    return r
+
+
+cdef inline double _vmagnitude(vec3 a):
+    return c_sqrt(a.x * a.x + a.y * a.y + a.z * a.z)
+
+
+
 cdef class Point:
     """\
     3D point (vector) class.
@@ -51,7 +135,15 @@ cdef class Point:
         self.z = z
 
     def __hash__(self):
-        return hash(repr(self))
+        """\
+        Hash function. Intentionally collides on points which are very close to
+        each other (per the quantized coordinates).
+        """
+        cdef long long cells[3]
+        cells[0] = _quantize(self.x)
+        cells[1] = _quantize(self.y)
+        cells[2] = _quantize(self.z)
+        return _hash_cells(0x345678UL, cells, 3)
 
     def __reduce__(self):
         return (Point, (self.x, self.y, self.z))
@@ -275,9 +367,15 @@ cdef class DirectionalPoint(Point):
     def __hash__(self):
         """\
         Hash function. Intentionally collides on points which are very close to
-        each other (per the string representation precision).
+        each other (per the quantized coordinates).
         """
-        return hash(repr(self))
+        cdef long long cells[5]
+        cells[0] = _quantize(self.x)
+        cells[1] = _quantize(self.y)
+        cells[2] = _quantize(self.z)
+        cells[3] = _quantize(self.rho)
+        cells[4] = _quantize(self.eta)
+        return _hash_cells(0x5a3c96UL, cells, 5)
 
     def __getitem__(self, i):
         return (self.x, self.y, self.z, self.rho, self.eta).__getitem__(i)
@@ -352,6 +450,57 @@ cdef class DirectionalPoint(Point):
                      sin(self.rho) * sin(self.eta), cos(self.rho))
 
 
+class _PointProbe(Point):
+    """\
+    Probe point at the center of a quantization cell, which compares equal only
+    to points within tolerance of a target point.
+    """
+    __hash__ = Point.__hash__
+
+    def __eq__(self, other):
+        return type(other) is type(self.target) and self.target == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class _DirectionalPointProbe(DirectionalPoint):
+    __hash__ = DirectionalPoint.__hash__
+    __eq__ = _PointProbe.__dict__['__eq__']
+    __ne__ = _PointProbe.__dict__['__ne__']
+
+
+def neighbour_probes(Point p):
+    """\
+    Generate probe points for the quantization cells adjacent to that of a
+    point. Points within the equality tolerance of one another may be hashed
+    into neighbouring cells, but only on the side of the cell boundary nearer
+    to the point in each dimension, so at most M{2^n - 1} probes are needed.
+    Looking up each probe in a point-keyed C{dict} finds such an equal key,
+    since a probe compares equal only to points equal to the original point.
+
+    @param p: The point.
+    @type p: L{Point}
+    @return: Probe points.
+    @rtype: C{generator} of L{Point}
+    """
+    if isinstance(p, DirectionalPoint):
+        probe_type = _DirectionalPointProbe
+        coordinates = (p.x, p.y, p.z, p.rho, p.eta)
+    else:
+        probe_type = _PointProbe
+        coordinates = (p.x, p.y, p.z)
+    cells = [_quantize(c) for c in coordinates]
+    sides = [-1 if c * 5e3 < cell else 1 for c, cell in zip(coordinates, cells)]
+    for mask in product((0, 1), repeat=len(cells)):
+        if not any(mask):
+            continue
+        probe = probe_type(*[(cell + side * m) * 2e-4 \
+            for cell, side, m in zip(cells, sides, mask)])
+        probe.target = p
+        yield probe
+
+
 cdef class Quaternion:
     """\
     Quaternion class.
@@ -544,12 +693,15 @@ cdef class Quaternion:
 cdef class Rotation:
     """\
     3D Euclidean rotation class. Handles multiple representations of SO(3).
+
+    The quaternion is read-only, since the rotation matrix is cached from it.
     """
     def __init__(self, Q=Quaternion(1, Point(0, 0, 0))):
         """\
         Constructor.
         """
         self.Q = Q.unit()
+        self._matrix_c = False
 
     def __reduce__(self):
         return (Rotation, (self.Q,))
@@ -618,7 +770,7 @@ cdef class Rotation:
         @return: The rotated vector.
         @rtype: L{Point}
         """
-        return (self.Q._mul(Quaternion(0, p))._mul(self.Q.inverse())).v
+        return _point(self._rotate(_vec(p)))
 
     @classmethod
     def from_rotation_matrix(cls, R):
@@ -714,15 +866,12 @@ cdef class Rotation:
         else:
             return Rotation(Quaternion(-a, Point(b, c, d)))
 
-    def to_rotation_matrix(self):
+    cdef void _cache_matrix(self):
         """\
-        Return the rotation matrix representation from the internal quaternion
-        representation.
+        Compute the rotation matrix representation from the internal quaternion
+        representation, and cache it.
 
             - U{http://en.wikipedia.org/wiki/Rotation_matrix#Quaternion}
-
-        @return: Rotation matrix.
-        @rtype: C{list} of C{list}
         """
         cdef double a, b, c, d, Nq, s
         cdef double B, C, D, aB, aC, aD, bB, bC, bD, cC, cD, dD
@@ -737,9 +886,43 @@ cdef class Rotation:
         aB = a * B; aC = a * C; aD = a * D
         bB = b * B; bC = b * C; bD = b * D
         cC = c * C; cD = c * D; dD = d * D
-        return [[1.0 - (cC + dD), bC - aD, bD + aC],
-                [bC + aD, 1.0 - (bB + dD), cD - aB],
-                [bD - aC, cD + aB, 1.0 - (bB + cC)]]
+        self._matrix[0][0] = 1.0 - (cC + dD)
+        self._matrix[0][1] = bC - aD
+        self._matrix[0][2] = bD + aC
+        self._matrix[1][0] = bC + aD
+        self._matrix[1][1] = 1.0 - (bB + dD)
+        self._matrix[1][2] = cD - aB
+        self._matrix[2][0] = bD - aC
+        self._matrix[2][1] = cD + aB
+        self._matrix[2][2] = 1.0 - (bB + cC)
+        self._matrix_c = True
+
+    cdef vec3 _rotate(self, vec3 p):
+        """\
+        Rotate a vector by the (cached) rotation matrix.
+        """
+        cdef vec3 r
+        if not self._matrix_c:
+            self._cache_matrix()
+        r.x = self._matrix[0][0] * p.x + self._matrix[0][1] * p.y + \
+              self._matrix[0][2] * p.z
+        r.y = self._matrix[1][0] * p.x + self._matrix[1][1] * p.y + \
+              self._matrix[1][2] * p.z
+        r.z = self._matrix[2][0] * p.x + self._matrix[2][1] * p.y + \
+              self._matrix[2][2] * p.z
+        return r
+
+    def to_rotation_matrix(self):
+        """\
+        Return the rotation matrix representation from the internal quaternion
+        representation. The matrix is computed once, and cached.
+
+        @return: Rotation matrix.
+        @rtype: C{list} of C{list}
+        """
+        if not self._matrix_c:
+            self._cache_matrix()
+        return [[self._matrix[i][j] for j in range(3)] for i in range(3)]
 
     def to_axis_angle(self):
         """\
@@ -804,7 +987,7 @@ cdef class Pose:
     cpdef Pose _add(self, Pose other):
         cdef Point Tnew
         cdef Rotation Rnew
-        Tnew = other.R.rotate(self.T)._add(other.T)
+        Tnew = _point(_vadd(other.R._rotate(_vec(self.T)), _vec(other.T)))
         Rnew = other.R._add(self.R)
         return Pose(Tnew, Rnew)
 
@@ -858,7 +1041,7 @@ cdef class Pose:
             return self._inverse
 
     cpdef Point _map(self, Point p):
-        return self.R.rotate(p)._add(self.T)
+        return _point(_vadd(self.R._rotate(_vec(p)), _vec(self.T)))
 
     cpdef Point _dmap(self, Point p):
         cdef Point unit
@@ -889,6 +1072,32 @@ cdef class Pose:
         else:
             return self._map(p)
 
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cpdef map_many(self, double[:, :] positions, double[:, :] out):
+        """\
+        Map a packed buffer of points through this pose, in the same manner as
+        L{map} for non-directional points. No objects are allocated. The output
+        buffer may be the input buffer, to map the points in place.
+
+        @param positions: The positions of the points (M{N x 3}).
+        @type positions: C{double[:, :]}
+        @param out: The output buffer for the mapped positions (M{N x 3}).
+        @type out: C{double[:, :]}
+        """
+        cdef Py_ssize_t i
+        cdef vec3 p, t = _vec(self.T)
+        if out.shape[0] < positions.shape[0]:
+            raise ValueError('output buffer too small')
+        for i in range(positions.shape[0]):
+            p.x = positions[i, 0]
+            p.y = positions[i, 1]
+            p.z = positions[i, 2]
+            p = _vadd(self.R._rotate(p), t)
+            out[i, 0] = p.x
+            out[i, 1] = p.y
+            out[i, 2] = p.z
+
 
 cdef class Face:
     """\
@@ -975,12 +1184,11 @@ cdef class Face:
         @rtype: C{double}
         """
         cdef double sn, sd, sb
-        cdef Point b
-        sn = -(self.normal().dot(p - self.vertices[2]))
-        sd = self.normal().dot(self.normal())
+        cdef vec3 n = _vec(self.normal()), q = _vec(p)
+        sn = -_vdot(n, _vsub(q, _vec(self.vertices[2])))
+        sd = _vdot(n, n)
         sb = sn / sd
-        b = p + self.normal()._mul(sb)
-        return p.euclidean(b)
+        return _vmagnitude(_vmul(n, sb))
 
     cpdef object normal_angles(self):
         """\
@@ -1059,27 +1267,32 @@ cdef class Triangle(Face):
         @return: The point of intersection.
         @rtype: L{Point}
         """
-        cdef Point origin_end, direction, P, T, Q
-        cdef double det, inv_det, u, v, t
-        origin_end = end._sub(origin)
-        direction = origin_end.unit()
-        P = direction.cross(self._edge_2._neg())
-        det = self._edge_0.dot(P)
+        cdef vec3 o, origin_end, direction, edge_0, edge_2, P, T, Q
+        cdef double length, det, inv_det, u, v, t
+        o = _vec(origin)
+        origin_end = _vsub(_vec(end), o)
+        length = _vmagnitude(origin_end)
+        if length == 0.0:
+            raise ValueError('cannot normalize a zero vector')
+        direction = _vdiv(origin_end, length)
+        edge_0, edge_2 = _vec(self._edge_0), _vmul(_vec(self._edge_2), -1.0)
+        P = _vcross(direction, edge_2)
+        det = _vdot(edge_0, P)
         if det > -1e-4 and det < 1e-4:
             return None
         inv_det = 1.0 / det
-        T = origin._sub(self._vertex_0)
-        u = (T.dot(P)) * inv_det
+        T = _vsub(o, _vec(self._vertex_0))
+        u = _vdot(T, P) * inv_det
         if u < 0 or u > 1.0:
             return None
-        Q = T.cross(self._edge_0)
-        v = (direction.dot(Q)) * inv_det
+        Q = _vcross(T, edge_0)
+        v = _vdot(direction, Q) * inv_det
         if v < 0 or u + v > 1.0:
             return None
-        t = (Q.dot(self._edge_2._neg())) * inv_det
-        if limit and (t < 1e-04 or t > origin_end.magnitude() - 1e-04):
+        t = _vdot(Q, edge_2) * inv_det
+        if limit and (t < 1e-04 or t > length - 1e-04):
             return None
-        return origin._add(direction._mul(t))
+        return _point(_vadd(o, _vmul(direction, t)))
 
     cpdef bool overlap(self, Triangle other):
         """\
@@ -1196,6 +1409,97 @@ cdef class Triangle(Face):
         return c
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef int segment_triangle_intersection(double[:, :] origins,
+        double[:, :] ends, double[:, :] triangles, bool limit, bool nearest,
+        unsigned char[:] hits, double[:] distances, Py_ssize_t[:] indices):
+    """\
+    Test a batch of line segments against a batch of packed triangles, in the
+    same manner as L{Triangle.intersection}. No objects are allocated.
+
+    Each triangle is a row of nine vertex coordinates. A single origin row may
+    be given for all segments. Segments of zero length never intersect. For
+    each segment, the hit flag, signed distance along the segment direction to
+    the intersection, and index of the intersected triangle are written to the
+    output arrays. Unless the nearest intersection is requested, testing a
+    segment stops at the first hit.
+
+    @param origins: The origins of the segments (M{M x 3} or M{1 x 3}).
+    @type origins: C{double[:, :]}
+    @param ends: The ends of the segments (M{M x 3}).
+    @type ends: C{double[:, :]}
+    @param triangles: The packed triangles (M{K x 9}).
+    @type triangles: C{double[:, :]}
+    @param limit: If true, limit intersection to the line segments.
+    @type limit: C{bool}
+    @param nearest: If true, find the intersection nearest to the origin.
+    @type nearest: C{bool}
+    @param hits: Output hit flags (M{M}).
+    @type hits: C{unsigned char[:]}
+    @param distances: Output signed intersection distances (M{M}).
+    @type distances: C{double[:]}
+    @param indices: Output intersected triangle indices (M{M}).
+    @type indices: C{Py_ssize_t[:]}
+    @return: The number of segments with an intersection.
+    @rtype: C{int}
+    """
+    cdef Py_ssize_t m, k, o
+    cdef int count = 0
+    cdef bint climit = limit, cnearest = nearest
+    cdef double ox, oy, oz, dx, dy, dz, length
+    cdef double e0x, e0y, e0z, e2x, e2y, e2z, px, py, pz, tx, ty, tz
+    cdef double qx, qy, qz, det, inv_det, u, v, t
+    for m in range(ends.shape[0]):
+        o = 0 if origins.shape[0] == 1 else m
+        ox, oy, oz = origins[o, 0], origins[o, 1], origins[o, 2]
+        dx, dy, dz = ends[m, 0] - ox, ends[m, 1] - oy, ends[m, 2] - oz
+        length = c_sqrt(dx * dx + dy * dy + dz * dz)
+        hits[m] = 0
+        distances[m] = 0.0
+        indices[m] = -1
+        if length == 0.0:
+            continue
+        dx, dy, dz = dx / length, dy / length, dz / length
+        for k in range(triangles.shape[0]):
+            e0x = triangles[k, 3] - triangles[k, 0]
+            e0y = triangles[k, 4] - triangles[k, 1]
+            e0z = triangles[k, 5] - triangles[k, 2]
+            e2x = triangles[k, 6] - triangles[k, 0]
+            e2y = triangles[k, 7] - triangles[k, 1]
+            e2z = triangles[k, 8] - triangles[k, 2]
+            px = dy * e2z - dz * e2y
+            py = dz * e2x - dx * e2z
+            pz = dx * e2y - dy * e2x
+            det = e0x * px + e0y * py + e0z * pz
+            if det > -1e-4 and det < 1e-4:
+                continue
+            inv_det = 1.0 / det
+            tx = ox - triangles[k, 0]
+            ty = oy - triangles[k, 1]
+            tz = oz - triangles[k, 2]
+            u = (tx * px + ty * py + tz * pz) * inv_det
+            if u < 0 or u > 1.0:
+                continue
+            qx = ty * e0z - tz * e0y
+            qy = tz * e0x - tx * e0z
+            qz = tx * e0y - ty * e0x
+            v = (dx * qx + dy * qy + dz * qz) * inv_det
+            if v < 0 or u + v > 1.0:
+                continue
+            t = (qx * e2x + qy * e2y + qz * e2z) * inv_det
+            if climit and (t < 1e-04 or t > length - 1e-04):
+                continue
+            if not hits[m] or fabs(t) < fabs(distances[m]):
+                hits[m] = 1
+                distances[m] = t
+                indices[m] = k
+            if not cnearest:
+                break
+        count += hits[m]
+    return count
+
+
 cpdef bool point_in_segment(Point s1, Point s2, Point p):
     """\
     Check if a point is in the line segment.
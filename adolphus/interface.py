@@ -19,7 +19,8 @@ elif _platform == "linux" or _platform == "linux2":
     VIS_LIB = False
     vis_type = Display
     emissive_material = {'GL_EMISSION': 0.5}
-from threading import Thread, Event
+from Queue import Queue, Empty
+from threading import Thread, Event, current_thread
 from math import copysign
 
 import commands
@@ -215,6 +216,15 @@ class Experiment(Thread):
         # generic event flag
         self.event = Event()
 
+        # coverage cancellation flag
+        self.cancel = Event()
+
+        # command (from the prompt or key bindings) running in the background
+        self._command = None
+
+        # calls from other threads to be made in the display thread
+        self._display_calls = Queue()
+
         # state variables
         self.selected = None
         self._camera_names = True
@@ -393,6 +403,58 @@ class Experiment(Thread):
         '''
         return commands.commands[cmd](self, args, response=response)
 
+    def _execute_message(self, cmd):
+        """\
+        Execute a command and display its result as a message.
+
+        @param cmd: The command string to execute.
+        @type cmd: C{str}
+        """
+        try:
+            message = self.execute(cmd, response='text')
+        except commands.CommandError as e:
+            message = str(e)
+        self.on_display(self.display.message, message)
+
+    def on_display(self, function, *args, **kwargs):
+        """\
+        Call a function (e.g. a visualization update) in the display thread:
+        at once if called from the display thread, otherwise at the next
+        iteration of the event loop. Calls are made in the order requested.
+
+        @param function: The function to call.
+        @type function: C{callable}
+        """
+        if current_thread() is self:
+            function(*args, **kwargs)
+        else:
+            self._display_calls.put((function, args, kwargs))
+
+    def execute_background(self, cmd):
+        """\
+        Execute a command from the display (prompt or key binding), displaying
+        its result as a message. Immediate commands (e.g. C{cancel}) are
+        executed at once. Background commands (the coverage streams) are
+        executed in a background thread, so that the display remains responsive
+        (and may cancel them) while they run; they send their visualization
+        updates to the display thread (see L{on_display}). All other commands
+        are executed in the display thread, and are refused while a background
+        command is in progress.
+
+        @param cmd: The command string to execute.
+        @type cmd: C{str}
+        """
+        name = (cmd.split() or [None])[0]
+        if name in commands.immediate:
+            self._execute_message(cmd)
+        elif self._command and self._command.is_alive():
+            self.display.message('command in progress')
+        elif name in commands.background:
+            self._command = Thread(target=self._execute_message, args=(cmd,))
+            self._command.daemon = True
+            self._command.start()
+        else:
+            self._execute_message(cmd)
 
     def run(self):
         """\
@@ -407,6 +469,13 @@ class Experiment(Thread):
         # event loop
         while not self.exit:
             visual.rate(VISUAL_SETTINGS['rate'])
+            # make calls requested from other threads
+            while True:
+                try:
+                    function, args, kwargs = self._display_calls.get_nowait()
+                except Empty:
+                    break
+                function(*args, **kwargs)
             # clear mesages after a while
             if self.display._messagebox.visible:
                 self.display.message_time += 1
@@ -514,14 +583,6 @@ class Experiment(Thread):
                 if self.prompt_enabled and k == '\n':
                     cmd = self.display.prompt('Command:')
                     if cmd:
-                        try:
-                            self.display.message(self.execute(cmd,
-                                response='text'))
-                        except commands.CommandError as e:
-                            self.display.message(str(e))
+                        self.execute_background(cmd)
                 elif k in self.keybindings:
-                    try:
-                        self.display.message(self.execute(self.keybindings[k],
-                            response='text'))
-                    except commands.CommandError as e:
-                        self.display.message(str(e))
+                    self.execute_background(self.keybindings[k])
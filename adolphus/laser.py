@@ -10,9 +10,16 @@ modeling laser line based range imaging cameras.
 
 from math import pi, sin, tan, atan
 from copy import copy
+from collections import OrderedDict
+
+import numpy as np
 
 from .geometry import Angle, Pose, Point, DirectionalPoint, Triangle
 from .coverage import PointCache, Task, Camera, Model
+from .batch import map_positions, direction_vectors, kocular_strength, \
+    pack_points, TriangleArray
+from .occlusion import OcclusionCacheStore, triangle_overlap_mask
+from .parallel import ShardPool
 from .posable import SceneObject
 
 
@@ -142,6 +149,42 @@ class LineLaser(SceneObject):
         """
         return self.triangle.overlap(triangle)
 
+    def occluded_by_array(self, triangles, *args):
+        """\
+        Return whether this laser's projection plane is occluded (in part) by
+        each of an array of triangles. This is the batch equivalent of
+        L{occluded_by}, testing all of the triangles against the laser triangle
+        at once (see L{triangle_overlap_mask}).
+
+        @param triangles: The triangles to check.
+        @type triangles: L{TriangleArray}
+        @return: True for each occluding triangle.
+        @rtype: C{numpy.ndarray}
+        """
+        return triangle_overlap_mask(TriangleArray([self.triangle]).vertices,
+            triangles.vertices)
+
+    def plane_intersections(self, positions, axis):
+        """\
+        Return the intersections with the laser triangle of the lines through
+        an array of points along a given axis, as in L{Triangle.intersection}
+        without the segment limit.
+
+        @param positions: The positions of the points.
+        @type positions: C{numpy.ndarray}
+        @param axis: The direction of the lines.
+        @type axis: L{Point}
+        @return: Hit mask and intersection positions.
+        @rtype: C{tuple} of C{numpy.ndarray}
+        """
+        positions = np.asarray(positions, dtype=float).reshape((-1, 3))
+        ends = positions + axis.to_list()
+        hits, distances = TriangleArray([self.triangle]).intersect(positions,
+            ends, limit=False)[:2]
+        directions = ends - positions
+        directions /= np.sqrt((directions ** 2).sum(axis=1))[:, np.newaxis]
+        return hits, positions + directions * distances[:, np.newaxis]
+
     def triangle_primitives(self):
         """\
         Generate the curve primitives for this laser's triangle.
@@ -221,6 +264,34 @@ class RangeCamera(Camera):
         else:
             return min(max((zhmina - p.z) / (zhmina - zhmini), 0.0), 1.0)
 
+    def ch_array(self, p, d, tp):
+        """\
+        Height resolution component of the coverage function for an array of
+        points (see L{ch}).
+
+        @param p: The points to test (in camera coordinates).
+        @type p: C{numpy.ndarray}
+        @param d: The unit direction vectors of the points (in camera
+                  coordinates), with NaN rows for non-directional points.
+        @type d: C{numpy.ndarray}
+        @param tp: Task parameters.
+        @type tp: C{dict}
+        @return: The height resolution coverage component values in M{[0, 1]}.
+        @rtype: C{numpy.ndarray}
+        """
+        z = p[:, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            angle = np.arccos(np.clip(-(p * d).sum(axis=1) / \
+                np.sqrt((p ** 2).sum(axis=1)), -1.0, 1.0))
+            mr = np.sin(angle) * float(self._params['dim'][1]) / \
+                self.fov['tav']
+            zhmini = mr * tp['hres_min'][0]
+            zhmina = mr * tp['hres_min'][1]
+            ch = np.where(zhmina == zhmini, (z < zhmina).astype(float),
+                np.clip((zhmina - z) / (zhmina - zhmini), 0.0, 1.0))
+        ch[np.isnan(d[:, 0])] = 0.0
+        return ch
+
     def strength(self, point, task_params):
         """\
         Return the coverage strength for a directional point. Includes the
@@ -233,15 +304,27 @@ class RangeCamera(Camera):
         @return: The coverage strength of the point.
         @rtype: C{float}
         """
-        cp = self.pose.inverse().map(point)
+        evaluator = self.evaluator(task_params)
+        cp = evaluator.pose.map(point)
         try:
             if abs(cp.direction_unit().x) > 1e-4:
                 raise ValueError('point is not aligned for range coverage')
         except AttributeError:
             raise TypeError('point must be directional for range coverage')
-        return self.cv(cp, task_params) * self.cr(cp, task_params) \
-             * self.cf(cp, task_params) * self.cd(cp, task_params) \
-             * self.ch(cp, task_params)
+        return evaluator.cv(cp) * evaluator.cr(cp) * evaluator.cf(cp) \
+             * evaluator.cd(cp) * self.ch(cp, task_params)
+
+    def _strength_array(self, p, d, tp):
+        """\
+        Return the coverage strength for an array of directional points in
+        camera coordinates, including the height resolution component.
+        """
+        if np.isnan(d[:, 0]).any():
+            raise TypeError('point must be directional for range coverage')
+        if (np.abs(d[:, 0]) > 1e-4).any():
+            raise ValueError('point is not aligned for range coverage')
+        return super(RangeCamera, self)._strength_array(p, d, tp) \
+             * self.ch_array(p, d, tp)
 
 
 class RangeModel(Model):
@@ -307,13 +390,18 @@ class RangeModel(Model):
         @param task_params: Task parameters (optional).
         @type task_params: C{dict}
         @param triangle_set: Alternative triangle set to use.
-        @type triangle_set: C{list} of L{Triangle}
+        @type triangle_set: C{list} of L{Triangle} or L{TriangleArray}
         @return: True if occluded, plus incidence angle.
         @rtype: C{bool}, C{float}
         """
         if not isinstance(self[obj], LineLaser):
             return super(RangeModel, self).occluded(point, obj,
                 task_params=task_params, triangle_set=triangle_set)
+        if isinstance(triangle_set, TriangleArray):
+            occluded, angles = self.occluded_many(point.to_list(), obj,
+                triangle_set=triangle_set)
+            return bool(occluded[0]), \
+                None if np.isnan(angles[0]) else float(angles[0])
         if triangle_set is None:
             key = self._update_occlusion_cache(task_params)
             triangle_set = self._occlusion_cache[key][obj].values()
@@ -331,6 +419,96 @@ class RangeModel(Model):
                 angle = atan(ln.x / ln.z)
         return False, angle
 
+    def occluded_many(self, points, obj, task_params=None, triangle_set=None):
+        """\
+        Return whether each of an array of points is occluded with respect to
+        the specified object. This is the batch equivalent of L{occluded}.
+
+        If the object is a laser, this also returns the incidence angles to
+        nearby surface normals in the laser plane (NaN where there is none).
+
+        @param points: The positions of the points to check.
+        @type points: C{numpy.ndarray}
+        @param obj: The object ID to check.
+        @type obj: C{str}
+        @param task_params: Task parameters (optional).
+        @type task_params: C{dict}
+        @param triangle_set: Alternative triangle set to use.
+        @type triangle_set: C{list} of L{Triangle} or L{TriangleArray}
+        @return: True for each occluded point, plus incidence angles.
+        @rtype: C{numpy.ndarray}, C{numpy.ndarray}
+        """
+        if not isinstance(self[obj], LineLaser):
+            return super(RangeModel, self).occluded_many(points, obj,
+                task_params=task_params, triangle_set=triangle_set)
+        if triangle_set is None:
+            key = self._update_occlusion_cache(task_params)
+            triangles = self._occlusion_array(key, obj)
+        elif isinstance(triangle_set, TriangleArray):
+            triangles = triangle_set
+        else:
+            triangles = TriangleArray(triangle_set)
+        return self._laser_occluded(obj, triangles,
+            np.array(self[obj].pose.T.to_list()), points)
+
+    def _laser_occluded(self, obj, triangles, origins, points):
+        """\
+        Return whether each of an array of points is occluded with respect to
+        a laser by a triangle array, along with the incidence angles to nearby
+        surface normals (see L{occluded_many}). The segments may be translated
+        with the triangles, so their origins are given separately.
+        """
+        points = np.asarray(points, dtype=float).reshape((-1, 3))
+        d = np.sqrt(((points - origins) ** 2).sum(axis=1))
+        hits, distances, indices = triangles.intersect(origins, points,
+            limit=False, nearest=True)
+        di = np.abs(distances)
+        occluded = hits & (di < d - 1e-4)
+        surface = np.flatnonzero(hits & ~occluded & (np.abs(di - d) < 1e-4))
+        angles = np.empty(points.shape[0])
+        angles.fill(float('nan'))
+        if surface.size:
+            ln = map_positions(self[obj].pose.inverse(),
+                triangles.normals()[indices[surface]])
+            with np.errstate(divide='ignore'):
+                angles[surface] = np.arctan(ln[:, 0] / ln[:, 2])
+        return occluded, angles
+
+    def _transported_occluded(self, points, obj, triangle_sets):
+        """\
+        Return whether each of an array of points is occluded with respect to
+        the specified object by its own triangle set (as in the transport
+        stops of L{range_coverage}), along with the incidence angles if the
+        object is a laser. Triangle sets translated from a common array (see
+        L{TriangleArray.translate}) are tested at once, with the segments
+        translated by the opposite offsets.
+        """
+        points = np.asarray(points, dtype=float).reshape((-1, 3))
+        origin = np.array(self[obj].pose.T.to_list())
+        occluded = np.zeros(points.shape[0], dtype=bool)
+        angles = np.empty(points.shape[0])
+        angles.fill(float('nan'))
+        groups = {}
+        for i, triangles in enumerate(triangle_sets):
+            try:
+                source, offset = triangles.translation
+            except AttributeError:
+                if not isinstance(triangles, TriangleArray):
+                    triangles = TriangleArray(triangles)
+                source, offset = triangles, np.zeros(3)
+            groups.setdefault(id(source), (source, [], []))
+            groups[id(source)][1].append(i)
+            groups[id(source)][2].append(offset)
+        for source, indices, offsets in groups.values():
+            offsets = np.array(offsets)
+            if isinstance(self[obj], LineLaser):
+                occluded[indices], angles[indices] = self._laser_occluded(obj,
+                    source, origin - offsets, points[indices] - offsets)
+            else:
+                occluded[indices] = source.intersect(origin - offsets,
+                    points[indices] - offsets)[0]
+        return occluded, angles
+
     class Transport(object):
         """\
         Transport base class.
@@ -349,13 +527,15 @@ class RangeModel(Model):
         def __enter__(self):
             # Store the original object pose.
             self.original_pose = self.tobject.pose
+            self._moved = False
             # Mask the object from the occlusion cache.
             self.oc_mask(self.tobject)
             return self
 
         def __exit__(self, exc_type, exc_value, exc_traceback):
-            # Restore the object to its original pose.
-            self.tobject.set_absolute_pose(self.original_pose)
+            # Restore the object to its original pose (if it was moved).
+            if self._moved:
+                self.tobject.set_absolute_pose(self.original_pose)
             # Unmask the object from the occlusion cache.
             self.oc_unmask(self.tobject)
 
@@ -401,6 +581,22 @@ class RangeModel(Model):
                     triangles += self.get_triangles(child)
             return triangles
 
+        def get_packed_triangles(self, sceneobject):
+            """\
+            Pack the mapped occlusion triangles of the scene object and its
+            children recursively (see L{SceneObject.packed_triangles}).
+
+            @param sceneobject: The object.
+            @type sceneobject: L{SceneObject}
+            @return: The recursive set of triangles, packed.
+            @rtype: L{TriangleArray}
+            """
+            arrays = [sceneobject.packed_triangles()[1].vertices]
+            for child in sceneobject.children:
+                if isinstance(child, SceneObject):
+                    arrays.append(self.get_packed_triangles(child).vertices)
+            return TriangleArray.from_vertices(np.vstack(arrays))
+
         @property
         def tobject(self):
             """\
@@ -425,8 +621,12 @@ class RangeModel(Model):
         Linear target transport class. Translates the inspection target linearly
         along a specified axis through the laser plane. Assumes that the task's
         mount is the object to be transported.
+
+        In analytic mode, the object is not actually moved; instead, each
+        stop carries a copy of the object's packed triangles (at its original
+        pose) translated by the offset of the task point to the laser plane.
         """
-        def __init__(self, model, taxis=None):
+        def __init__(self, model, taxis=None, analytic=False):
             """\
             Constructor.
 
@@ -434,8 +634,11 @@ class RangeModel(Model):
             @type model: L{RangeModel}
             @param taxis: The axis along which to transport the object.
             @type taxis: L{Point}
+            @param analytic: If true, do not move the object.
+            @type analytic: C{bool}
             """
             super(RangeModel.LinearTargetTransport, self).__init__(model)
+            self.analytic = analytic
             if not taxis:
                 # Translate normal to the laser plane if no axis is specified.
                 self.taxis = self.laser.triangle.normal()
@@ -470,26 +673,178 @@ class RangeModel(Model):
                 rho, eta = self.laser.pose._dmap(\
                     DirectionalPoint(0, 0, 0, pi, 0))[3:5]
                 # Store the original set of mapped task points of the task.
-                task_original = PointCache(self.task.mapped)
-                for point in task_original:
-                    lp = self.laser.triangle.intersection(point,
-                        point + self.taxis, False)
+                task_original = list(self.task.mapped_array)
+                # Intersect all of the task points with the laser plane.
+                positions = self.task.mapped_array.positions
+                hits, lps = self.laser.plane_intersections(positions,
+                    self.taxis)
+                if self.analytic:
+                    packed = self.get_packed_triangles(self.tobject)
+                for i, point in enumerate(task_original):
                     # If no intersection exists, point not covered by the laser.
-                    if lp is None:
+                    if not hits[i]:
                         self._transport_cache.append((point, None, None))
                         yield self._transport_cache[-1]
                         continue
-                    # Translate the object so the point lies in the laser plane.
+                    lp = Point(*lps[i])
                     pose = Pose(T=(lp - point))
-                    self.tobject.absolute_pose = self.original_pose + pose
+                    if self.analytic:
+                        # Translate the triangles so the point lies in the
+                        # laser plane.
+                        triangles = packed.translate(lps[i] - positions[i])
+                    else:
+                        # Translate the object so the point lies in the laser
+                        # plane.
+                        self.tobject.absolute_pose = self.original_pose + pose
+                        self._moved = True
+                        triangles = self.get_triangles(self.tobject)
                     # Yield the mapped directional point.
                     mp = pose._map(point)
-                    triangles = self.get_triangles(self.tobject)
                     self._transport_cache.append((point, DirectionalPoint(mp.x,
                         mp.y, mp.z, rho, eta), triangles))
                     yield self._transport_cache[-1]
 
-    def range_coverage(self, task, transport, subset=None, **kwargs):
+    def _range_coverage_values(self, stops, task_params, subset):
+        """\
+        Return the range coverage strength of each of a list of transport
+        stops.
+        """
+        values = []
+        for point, mdp, triangles in stops:
+            if not mdp:
+                values.append(0.0)
+                continue
+            # Compute the laser coverage (occlusion and incidence angle).
+            occluded = self.occluded(mdp, self.active_laser)[0]
+            toccluded, inc_angle = self.occluded(mdp, self.active_laser,
+                                                 triangle_set=triangles)
+            if occluded or toccluded \
+                or inc_angle > task_params['inc_angle_max']:
+                values.append(0.0)
+                continue
+            # Compute the camera coverage.
+            values.append(self.strength(mdp, task_params, subset=subset,
+                triangle_set=triangles))
+        return values
+
+    def _range_coverage_array(self, stops, task_params, subset):
+        """\
+        Return the range coverage strength of each of a list of transport
+        stops, evaluating all of them at once with array operations. This is
+        the batch equivalent of L{_range_coverage_values}.
+        """
+        values = np.zeros(len(stops))
+        index, positions, directions, triangle_sets = \
+            self._range_laser_array(stops, task_params)
+        if not index.size:
+            return values.tolist()
+        cameras = list(subset or self.active_cameras)
+        strengths = np.zeros((len(cameras), index.size))
+        for j, camera in enumerate(cameras):
+            strengths[j] = self._range_camera_array(camera, positions,
+                directions, triangle_sets, task_params)
+        values[index] = kocular_strength(strengths, task_params['ocular'])
+        return values.tolist()
+
+    def _range_laser_array(self, stops, task_params):
+        """\
+        Return the transport stops which are covered by the laser (not
+        occluded, and within the maximum incidence angle), as their indices,
+        the positions and unit direction vectors of their mapped directional
+        points, and their triangle sets.
+        """
+        stops = [(i, stop) for i, stop in enumerate(stops) if stop[1]]
+        if not stops:
+            return np.zeros(0, dtype=np.intp), np.empty((0, 3)), \
+                np.empty((0, 3)), []
+        index = np.array([i for i, stop in stops])
+        positions, angles = pack_points([stop[1] for i, stop in stops])
+        triangle_sets = [stop[2] for i, stop in stops]
+        # Compute the laser coverage (occlusion and incidence angle).
+        laser = self.active_laser
+        occluded = self.occluded_many(positions, laser)[0]
+        toccluded, inc_angles = self._transported_occluded(positions, laser,
+            triangle_sets)
+        with np.errstate(invalid='ignore'):
+            lit = np.flatnonzero(~occluded & ~toccluded & \
+                ~(inc_angles > task_params['inc_angle_max']))
+        return index[lit], positions[lit], direction_vectors(angles[lit]), \
+            [triangle_sets[i] for i in lit]
+
+    def _range_camera_array(self, camera, positions, directions, triangle_sets,
+                            task_params):
+        """\
+        Return the coverage strength of an array of laser-covered points (see
+        L{_range_laser_array}) for one camera, including occlusion by the
+        scene and by the transported triangles of each point.
+        """
+        strengths = self[camera].strength_array(positions, directions,
+            task_params)
+        # Only points with non-zero strength need the occlusion checks.
+        visible = np.flatnonzero(strengths)
+        occluded = self.occluded_many(positions[visible], camera,
+            task_params=task_params) | self._transported_occluded(
+            positions[visible], camera, [triangle_sets[i] for i in visible])[0]
+        strengths[visible[occluded]] = 0.0
+        return strengths
+
+    def range_coverage_stream(self, task, transport, subset=None, batch=False,
+                              processes=1, chunksize=256, cancel=None):
+        """\
+        Generator which evaluates the range coverage model according to the
+        given transport class in chunks of transport stops, yielding the
+        coverage of each chunk along with the number of stops evaluated so far
+        and in total (see L{Model.coverage_stream}). The transport is
+        performed in full before the first chunk is evaluated.
+
+        @param task: The range coverage task.
+        @type task: L{RangeTask}
+        @param transport: Transport class.
+        @type transport: L{RangeModel.Transport}
+        @param subset: Subset of cameras (defaults to all active cameras).
+        @type subset: C{set}
+        @param batch: If true, evaluate the stops of each chunk at once with
+                      array operations.
+        @type batch: C{bool}
+        @param processes: Number of worker processes over which to distribute
+                          the transport stops of each chunk (see L{parallel});
+                          the workers are started once for the whole stream.
+        @type processes: C{int}
+        @param chunksize: The number of stops per chunk (None for a single
+                          chunk).
+        @type chunksize: C{int}
+        @param cancel: Cancellation event (optional).
+        @type cancel: C{threading.Event}
+        @return: The coverage of the chunk, and the evaluated and total numbers
+                 of stops.
+        @rtype: L{PointCache}, C{int}, C{int}
+        """
+        if not isinstance(task, RangeTask):
+            raise TypeError('task is not a range coverage task')
+        # Give the transport object a task context (required).
+        transport.task = task
+        with transport:
+            # The stops do not depend on the pose of the transported object
+            # once generated, so they can be evaluated in any order.
+            stops = list(transport.transport())
+            chunksize = chunksize or max(len(stops), 1)
+            if processes > 1:
+                self.prepare_occlusion_cache()
+                self.prepare_occlusion_cache(task.params)
+            function = self._range_coverage_array if batch \
+                else self._range_coverage_values
+            with ShardPool(function, stops, processes, task.params,
+                    subset) as pool:
+                for start in range(0, len(stops), chunksize):
+                    if cancel is not None and cancel.is_set():
+                        return
+                    chunk = stops[start:start + chunksize]
+                    yield PointCache(zip([stop[0] for stop in chunk],
+                        pool.map(start, start + len(chunk)))), \
+                        start + len(chunk), len(stops)
+
+    def range_coverage(self, task, transport, subset=None, batch=False,
+                       processes=1, **kwargs):
         """\
         Return the range coverage model according to the given transport class.
         Assumptions about the configuration of objects are detailed in the
@@ -504,28 +859,167 @@ class RangeModel(Model):
         @type transport: L{RangeModel.Transport}
         @param subset: Subset of cameras (defaults to all active cameras).
         @type subset: C{set}
+        @param batch: If true, evaluate all stops at once with array
+                      operations (laser-plane intersection is always batched
+                      by the transport).
+        @type batch: C{bool}
+        @param processes: Number of worker processes over which to distribute
+                          the transport stops (see L{parallel}).
+        @type processes: C{int}
         @return: The coverage model.
         @rtype: L{PointCache}
         """
-        if not isinstance(task, RangeTask):
-            raise TypeError('task is not a range coverage task')
         coverage = PointCache()
-        # Give the transport object a task context (required).
-        transport.task = task
-        with transport:
-            for point, mdp, triangles in transport.transport():
-                if not mdp:
-                    coverage[point] = 0.0
-                    continue
-                # Compute the laser coverage (occlusion and incidence angle).
-                occluded = self.occluded(mdp, self.active_laser)[0]
-                toccluded, inc_angle = self.occluded(mdp, self.active_laser,
-                                                     triangle_set=triangles)
-                if occluded or toccluded \
-                    or inc_angle > task.params['inc_angle_max']:
-                    coverage[point] = 0.0
-                    continue
-                # Compute the camera coverage.
-                coverage[point] = self.strength(mdp, task.params, subset=subset,
-                    triangle_set=triangles)
+        for chunk, done, total in self.range_coverage_stream(task, transport,
+                subset=subset, batch=batch, processes=processes,
+                chunksize=None):
+            coverage.update(chunk)
         return coverage
+
+
+class RangeCoverage(object):
+    """\
+    Range coverage session.
+
+    A L{RangeCoverage} object performs the transport of a range coverage task
+    once, and pins the laser side of the results for each transport stop:
+    whether the point is covered by the laser (occlusion and incidence angle)
+    and the transported triangles. Subsequent evaluations compute only the
+    camera-dependent terms, as in L{RangeModel.range_coverage} with C{batch}.
+    The strength of the points for each camera is also memoized, keyed by the
+    pose and parameters of the camera, so that a camera which has not changed
+    (or has returned to a previous configuration) is not re-evaluated.
+
+    Changes to the pose of any object other than the cameras (or of a camera
+    with occluding triangles), the laser parameters, the task pose or
+    parameters, or the set of objects in the model cause the transport and the
+    laser results to be recomputed. The L{close} method should be called when
+    the object is no longer needed, to remove its callbacks from the model.
+    """
+    memo_size = 64
+
+    def __init__(self, model, task, transport, subset=None):
+        """\
+        Constructor.
+
+        @param model: The range coverage model.
+        @type model: L{RangeModel}
+        @param task: The range coverage task.
+        @type task: L{RangeTask}
+        @param transport: Transport class.
+        @type transport: L{RangeModel.Transport}
+        @param subset: Subset of cameras (defaults to all active cameras).
+        @type subset: C{set}
+        """
+        if not isinstance(task, RangeTask):
+            raise TypeError('task is not a range coverage task')
+        self.model = model
+        self.task = task
+        self.transport = transport
+        self.subset = subset
+        self._callback_key = 'range_coverage_%d' % id(self)
+        self._objects = {}
+        self._reset()
+
+    def _reset(self):
+        """\
+        Discard all results.
+        """
+        self._lit = None
+        self._columns = {}
+
+    def _invalidate(self):
+        """\
+        Discard all results, including the transport stops.
+        """
+        self.transport._transport_cache = []
+        self._reset()
+
+    def _register(self):
+        """\
+        Register change callbacks on the task, the laser, and all objects in
+        the model other than cameras without occluding triangles.
+        """
+        self._objects['task'] = self.task
+        for key in self.model:
+            if key in self.model.cameras and not self.model[key].triangles:
+                continue
+            self._objects[key] = self.model[key]
+        for obj in self._objects.values():
+            obj.posecallbacks[self._callback_key] = self._invalidate
+        laser = self.model[self.model.active_laser]
+        laser.paramcallbacks[self._callback_key] = self._invalidate
+
+    def close(self):
+        """\
+        Remove the change callbacks from the model and the task.
+        """
+        for obj in self._objects.values():
+            obj.posecallbacks.pop(self._callback_key, None)
+            if hasattr(obj, 'paramcallbacks'):
+                obj.paramcallbacks.pop(self._callback_key, None)
+        self._objects = {}
+
+    def _state(self):
+        """\
+        Return the state which, when changed, requires a full recomputation.
+        """
+        return (dict(self.task.params), set(self.model.keys()),
+            self.model.active_laser)
+
+    def _update(self):
+        """\
+        Perform the transport and compute the laser results, if necessary.
+        """
+        if self._lit is None or self._state() != self._last_state:
+            # The transport may move objects, so the callbacks are only
+            # registered once it is complete.
+            self.close()
+            self._reset()
+            self.transport.task = self.task
+            with self.transport:
+                stops = list(self.transport.transport())
+                self._lit = self.model._range_laser_array(stops,
+                    self.task.params)
+            self._points = [stop[0] for stop in stops]
+            self._register()
+            self._last_state = self._state()
+
+    def coverage(self):
+        """\
+        Return the (updated) range coverage model of the task.
+
+        @return: The coverage model.
+        @rtype: L{PointCache}
+        """
+        self._update()
+        task_params = self.task.params
+        index, positions, directions, triangle_sets = self._lit
+        cameras = list(self.subset or self.model.active_cameras)
+        keys = [OcclusionCacheStore.digest(self.model[camera].pose,
+            self.model[camera].params) for camera in cameras]
+        missing = [(camera, key) for camera, key in zip(cameras, keys) \
+            if not key in self._columns.setdefault(camera, OrderedDict())]
+        if missing:
+            # Mask the transported object from the occlusion cache.
+            with self.transport:
+                for camera, key in missing:
+                    memo = self._columns[camera]
+                    memo[key] = self.model._range_camera_array(camera,
+                        positions, directions, triangle_sets, task_params)
+                    if len(memo) > self.memo_size:
+                        memo.popitem(last=False)
+        values = np.zeros(len(self._points))
+        if index.size:
+            values[index] = kocular_strength([self._columns[camera][key] \
+                for camera, key in zip(cameras, keys)], task_params['ocular'])
+        return PointCache(zip(self._points, values.tolist()))
+
+    def performance(self):
+        """\
+        Return the (updated) range coverage performance of the task.
+
+        @return: Performance metric in [0, 1].
+        @rtype: C{float}
+        """
+        return self.model.performance(self.task, coverage=self.coverage())
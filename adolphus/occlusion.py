@@ -0,0 +1,388 @@
+"""\
+Occlusion module. Contains spatial indexing structures used to accelerate
+occlusion queries against large sets of occluding triangles.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+import os
+import tempfile
+from hashlib import sha1
+
+import numpy as np
+
+from .geometry import Point, Triangle
+
+
+class TriangleBVH(object):
+    """\
+    Bounding volume hierarchy over a set of triangles.
+
+    The hierarchy is a binary tree of axis-aligned bounding boxes, built by
+    splitting the triangles at the median centroid along the longest axis of
+    each node. Nodes are stored in flat lists, and segment queries traverse the
+    tree with an explicit stack, testing the triangles of each leaf reached
+    with L{Triangle.intersection} and returning on the first hit.
+    """
+    leaf_size = 4
+
+    def __init__(self, triangles):
+        """\
+        Constructor.
+
+        @param triangles: The (mapped) triangles to index.
+        @type triangles: C{list} of L{Triangle}
+        """
+        triangles = list(triangles)
+        self._lox, self._loy, self._loz = [], [], []
+        self._hix, self._hiy, self._hiz = [], [], []
+        self._left, self._right = [], []
+        self._start, self._end = [], []
+        if not triangles:
+            self.triangles = []
+            return
+        vertices = np.array([[v.x, v.y, v.z] for triangle in triangles \
+            for v in triangle.vertices], dtype=float).reshape((-1, 3, 3))
+        lo, hi = vertices.min(axis=1), vertices.max(axis=1)
+        centroids = vertices.mean(axis=1)
+        # Pad boxes to absorb rounding error in the intersection test.
+        self._pad = 1e-4 + 1e-9 * float(np.abs(vertices).max())
+        order = np.arange(len(triangles))
+        stack = [(self._add_node(), 0, len(triangles))]
+        while stack:
+            node, start, end = stack.pop()
+            indices = order[start:end]
+            nlo, nhi = lo[indices].min(axis=0), hi[indices].max(axis=0)
+            self._lox[node], self._loy[node], self._loz[node] = nlo.tolist()
+            self._hix[node], self._hiy[node], self._hiz[node] = nhi.tolist()
+            self._start[node], self._end[node] = start, end
+            if end - start <= self.leaf_size:
+                continue
+            extent = centroids[indices].max(axis=0) - \
+                centroids[indices].min(axis=0)
+            axis = int(np.argmax(extent))
+            if not extent[axis] > 0:
+                continue
+            mid = (end - start) // 2
+            order[start:end] = indices[np.argpartition(
+                centroids[indices, axis], mid)]
+            self._left[node], self._right[node] = \
+                self._add_node(), self._add_node()
+            stack.append((self._left[node], start, start + mid))
+            stack.append((self._right[node], start + mid, end))
+        self.triangles = [triangles[i] for i in order]
+
+    def __len__(self):
+        return len(self.triangles)
+
+    def _add_node(self):
+        """\
+        Append an empty node and return its index.
+        """
+        for nodes in (self._lox, self._loy, self._loz, self._hix, self._hiy,
+                      self._hiz, self._start, self._end):
+            nodes.append(0)
+        self._left.append(-1)
+        self._right.append(-1)
+        return len(self._left) - 1
+
+    def intersects(self, origin, end):
+        """\
+        Return whether the line segment between two points intersects any of
+        the indexed triangles (per L{Triangle.intersection} with the segment
+        limit).
+
+        @param origin: The origin of the segment.
+        @type origin: L{Point}
+        @param end: The end of the segment.
+        @type end: L{Point}
+        @return: True if the segment intersects a triangle.
+        @rtype: C{bool}
+        """
+        if not self.triangles:
+            return False
+        pad = self._pad
+        ox, oy, oz = origin.x, origin.y, origin.z
+        segment = ((ox, end.x - ox), (oy, end.y - oy), (oz, end.z - oz))
+        bounds = ((self._lox, self._hix), (self._loy, self._hiy),
+                  (self._loz, self._hiz))
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            # Clip the segment parameter interval against the node box.
+            tmin, tmax = 0.0, 1.0
+            for (o, d), (lo, hi) in zip(segment, bounds):
+                if d == 0.0:
+                    if o < lo[node] - pad or o > hi[node] + pad:
+                        break
+                    continue
+                t1 = (lo[node] - pad - o) / d
+                t2 = (hi[node] + pad - o) / d
+                if t1 > t2:
+                    t1, t2 = t2, t1
+                if t1 > tmin:
+                    tmin = t1
+                if t2 < tmax:
+                    tmax = t2
+                if tmin > tmax:
+                    break
+            else:
+                if self._left[node] < 0:
+                    for i in range(self._start[node], self._end[node]):
+                        if self.triangles[i].intersection(origin, end, True):
+                            return True
+                else:
+                    stack.append(self._right[node])
+                    stack.append(self._left[node])
+        return False
+
+
+class OcclusionCacheStore(object):
+    """\
+    Persistent on-disk store of occlusion cache entries.
+
+    Each entry holds the indices of the triangles of one scene object which
+    occlude one object (e.g. a camera), as a memory-mapped C{.npy} file named
+    by a content hash of everything the entry depends on: the triangle
+    geometry (mapped by the object poses), the occluded object's type,
+    parameters and pose, and the task parameters. Entries are never stale, so
+    the store can be shared between runs and processes.
+    """
+    def __init__(self, directory):
+        """\
+        Constructor.
+
+        @param directory: The directory in which to store entries.
+        @type directory: C{str}
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def digest(*parts):
+        """\
+        Return the content hash of a set of entry dependencies. Dictionaries
+        are hashed in sorted key order, and poses by their translation and
+        rotation quaternion.
+
+        @return: The hexadecimal digest.
+        @rtype: C{str}
+        """
+        h = sha1()
+        for part in parts:
+            if isinstance(part, dict):
+                part = sorted(part.items())
+            elif hasattr(part, 'T') and hasattr(part, 'R'):
+                part = (part.T.x, part.T.y, part.T.z, part.R.Q.a,
+                        part.R.Q.v.x, part.R.Q.v.y, part.R.Q.v.z)
+            h.update(repr(part))
+        return h.hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest + '.npy')
+
+    def __contains__(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def load(self, digest):
+        """\
+        Load an entry.
+
+        @param digest: The entry digest.
+        @type digest: C{str}
+        @return: The triangle indices (memory-mapped).
+        @rtype: C{numpy.ndarray}
+        """
+        return np.load(self._path(digest), mmap_mode='r')
+
+    def save(self, digest, indices):
+        """\
+        Save an entry. The file is written under a temporary name and renamed,
+        so that concurrent readers never see a partial entry.
+
+        @param digest: The entry digest.
+        @type digest: C{str}
+        @param indices: The triangle indices.
+        @type indices: C{numpy.ndarray}
+        """
+        fd, path = tempfile.mkstemp(suffix='.npy', dir=self.directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.asarray(indices, dtype=np.intp))
+        os.rename(path, self._path(digest))
+
+
+def boxes_overlap(a, b):
+    """\
+    Check whether two axis-aligned bounding boxes overlap. A box of None is
+    unbounded, and overlaps any non-empty box.
+
+    @param a: The minimum and maximum corners of the first box.
+    @type a: C{tuple} of C{numpy.ndarray}
+    @param b: The minimum and maximum corners of the second box.
+    @type b: C{tuple} of C{numpy.ndarray}
+    @return: True if the boxes overlap.
+    @rtype: C{bool}
+    """
+    if a is None or b is None:
+        return all([(box[0] <= box[1]).all() for box in (a, b) \
+            if box is not None])
+    return bool((a[0] <= b[1]).all() and (b[0] <= a[1]).all())
+
+
+def _sides(t, tolerance=0.0):
+    """\
+    Return which side of zero each row of projections lies upon, as in the
+    C{which_side} function of the geometry module: 1 if positive only, 0 if
+    both, -1 otherwise. Projections within the tolerance count as zero.
+    """
+    positive = (t > tolerance).any(axis=-1)
+    negative = (t < -tolerance).any(axis=-1)
+    return np.where(positive & negative, 0, np.where(positive, 1, -1))
+
+
+def _dot(a, b):
+    """\
+    Return the dot products of (broadcast) arrays of vectors.
+    """
+    return a[..., 0] * b[..., 0] + a[..., 1] * b[..., 1] + a[..., 2] * b[..., 2]
+
+
+def frustum_triangle_mask(hull, vertices):
+    """\
+    Check which of a set of triangles intersect a frustum. This is the batch
+    equivalent of L{triangle_frustum_intersection}, using the same separating
+    axes on the same pyramid of hull vertices; the triangles which are
+    separated by an earlier axis are dropped from the later tests.
+
+    Several hull vertices lie exactly on the planes through the frustum edges,
+    so for the edge cross product axes, projections of the hull which are zero
+    up to rounding error are taken as zero. Otherwise, the result of these
+    tests depends on the rounding error of the mapping into the frame of the
+    hull.
+
+        - D. Eberly, "Intersection of Convex Objects: The Method of Separating
+          Axes," 2008.
+
+    @param hull: The vertices of the frustum (in the frame of the triangles).
+    @type hull: C{numpy.ndarray}
+    @param vertices: The packed triangle vertices (see L{TriangleArray}).
+    @type vertices: C{numpy.ndarray}
+    @return: True for each triangle which intersects the frustum.
+    @rtype: C{numpy.ndarray}
+    """
+    hull = np.asarray(hull, dtype=float).reshape((-1, 3))
+    triangles = np.asarray(vertices, dtype=float).reshape((-1, 3, 3))
+    mask = np.zeros(triangles.shape[0], dtype=bool)
+    if not hull.shape[0]:
+        return mask
+    candidates = np.arange(triangles.shape[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Frustum face normals.
+        faces = [(hull[4], hull[3], hull[2])] + [(hull[0], hull[i + 1],
+            hull[(i + 1) % 4 + 1]) for i in range(4)]
+        for a, b, c in faces:
+            normal = np.cross(b - a, c - b)
+            normal /= np.sqrt(_dot(normal, normal))
+            candidates = candidates[_sides(_dot(normal,
+                triangles[candidates] - a)) <= 0]
+        # Triangle normals.
+        t = triangles[candidates]
+        normals = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 1])
+        normals /= np.sqrt(_dot(normals, normals))[:, np.newaxis]
+        candidates = candidates[_sides(_dot(normals[:, np.newaxis],
+            hull - t[:, np.newaxis, 0])) <= 0]
+        # Cross products of frustum and triangle edges.
+        edges = [(hull[i] - hull[0], hull[0]) for i in range(1, 5)] + \
+                [(hull[(i + 1) % 4 + 1] - hull[i + 1], hull[i + 1]) \
+                for i in range(4)]
+        for fedge, fvertex in edges:
+            for i in range(3):
+                t = triangles[candidates]
+                direction = np.cross(fedge, t[:, (i + 1) % 3] - t[:, i])
+                tolerance = 1e-12 * np.sqrt(_dot(direction, direction)) * \
+                    np.abs(hull - fvertex).max()
+                side0 = _sides(_dot(direction[:, np.newaxis], hull - fvertex),
+                    tolerance[:, np.newaxis])
+                side1 = _sides(_dot(direction[:, np.newaxis], t - fvertex))
+                candidates = candidates[side0 * side1 >= 0]
+    mask[candidates] = True
+    return mask
+
+
+def _overlap_interval(triangles, distances, axis):
+    """\
+    Return the interval of the line of intersection of two triangle planes
+    spanned by each of an array of triangles, as in L{Triangle.overlap}, given
+    the signed distances of its vertices from the other plane.
+    """
+    rows = np.arange(triangles.shape[0])
+    signs = distances > 0
+    odd = np.argmax(signs == (signs.sum(axis=1) % 2 == 1)[:, np.newaxis],
+        axis=1)
+    ends = []
+    for i in (odd + 1) % 3, (odd + 2) % 3:
+        ends.append(triangles[rows, i, axis] + (triangles[rows, odd, axis] - \
+            triangles[rows, i, axis]) * (distances[rows, i] / \
+            (distances[rows, i] - distances[rows, odd])))
+    return np.minimum(*ends), np.maximum(*ends)
+
+
+def triangle_overlap_mask(triangle, vertices):
+    """\
+    Check which of a set of triangles intersect a given triangle. This is the
+    batch equivalent of L{Triangle.overlap}, with the plane rejection tests and
+    the interval test on the line of intersection of the planes applied to all
+    of the triangles at once; the (rare) triangles coplanar with the given
+    triangle are checked individually.
+
+        - T. Moller, "A Fast Triangle/Triangle Intersection Test," J.
+          Graphics Tools, vol. 2, no. 2, pp. 25-30, 1997.
+
+    @param triangle: The packed vertices of the given triangle.
+    @type triangle: C{numpy.ndarray}
+    @param vertices: The packed triangle vertices (see L{TriangleArray}).
+    @type vertices: C{numpy.ndarray}
+    @return: True for each triangle which intersects the given triangle.
+    @rtype: C{numpy.ndarray}
+    """
+    s = np.asarray(triangle, dtype=float).reshape((3, 3))
+    triangles = np.asarray(vertices, dtype=float).reshape((-1, 3, 3))
+    mask = np.zeros(triangles.shape[0], dtype=bool)
+    candidates = np.arange(triangles.shape[0])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Vertices of the triangles against the plane of the given triangle.
+        normal = np.cross(s[1] - s[0], s[2] - s[1])
+        normal /= np.sqrt(_dot(normal, normal))
+        dt = _dot(triangles, normal) - _dot(s[0], normal)
+        keep = ~((dt > 1e-4).all(axis=1) | (dt < -1e-4).all(axis=1))
+        candidates, dt = candidates[keep], dt[keep]
+        # Vertices of the given triangle against the planes of the triangles.
+        t = triangles[candidates]
+        normals = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 1])
+        normals /= np.sqrt(_dot(normals, normals))[:, np.newaxis]
+        ds = _dot(s[np.newaxis], normals[:, np.newaxis]) - \
+            _dot(t[:, 0], normals)[:, np.newaxis]
+        keep = ~((ds > 1e-4).all(axis=1) | (ds < -1e-4).all(axis=1))
+        candidates, dt, ds = candidates[keep], dt[keep], ds[keep]
+        normals = normals[keep]
+        # Coplanar triangles.
+        coplanar = (np.abs(ds) < 1e-4).all(axis=1)
+        if coplanar.any():
+            given = Triangle(*[Point(*v) for v in s.tolist()])
+            for i in candidates[coplanar]:
+                mask[i] = given.overlap(Triangle(*[Point(*v) \
+                    for v in triangles[i].tolist()]))
+            candidates, dt, ds = candidates[~coplanar], dt[~coplanar], \
+                ds[~coplanar]
+            normals = normals[~coplanar]
+        # Intervals on the line of intersection of the planes.
+        axis = np.argmax(np.cross(normal, normals), axis=1)
+        smin, smax = _overlap_interval(np.repeat(s[np.newaxis],
+            candidates.shape[0], axis=0), ds, axis)
+        tmin, tmax = _overlap_interval(triangles[candidates], dt, axis)
+        mask[candidates[~((smax < tmin) | (tmax < smin))]] = True
+    return mask
@@ -0,0 +1,130 @@
+"""\
+Parallel evaluation module. Distributes coverage computations over contiguous
+shards of task points in a pool of worker processes.
+
+Worker processes are forked from the calling process, so they inherit the
+model (including its occlusion cache) and the points to evaluate rather than
+receiving them by pickling; only shard bounds and the resulting values are
+transferred. Where forking is not available, evaluation falls back to the
+calling process.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+import os
+import multiprocessing
+
+# Work inherited by this worker process (set only in worker processes).
+_context = None
+
+
+def _initialize(function, items, args):
+    """\
+    Set the work of a newly forked worker process.
+    """
+    global _context
+    _context = (function, items, args)
+
+
+def _evaluate_shard(shard):
+    """\
+    Evaluate the inherited function over one shard of the inherited items.
+    """
+    function, items, args = _context
+    return function(items[shard[0]:shard[1]], *args)
+
+
+class ShardPool(object):
+    """\
+    Pool of worker processes evaluating a function over contiguous shards of a
+    list of items. The function must accept a list of items (followed by any
+    supplementary arguments) and return a list of results in the same order.
+
+    The workers are forked once, when the pool is created, and inherit the
+    function, items, and arguments through the pool initializer; successive
+    ranges of the items (e.g. the chunks of a coverage stream) are then
+    evaluated without forking again. The pool should be closed when no longer
+    needed, or used as a context manager.
+    """
+    def __init__(self, function, items, processes, *args):
+        """\
+        Constructor.
+
+        @param function: The function to evaluate.
+        @type function: C{callable}
+        @param items: The items to evaluate.
+        @type items: C{list}
+        @param processes: The number of worker processes.
+        @type processes: C{int}
+        """
+        self.function = function
+        self.items = items
+        self.processes = processes
+        self.args = args
+        self._pool = None
+        if processes < 2 or len(items) < 2 or not hasattr(os, 'fork'):
+            return
+        try:
+            context = multiprocessing.get_context('fork')
+        except AttributeError:
+            context = multiprocessing
+        self._pool = context.Pool(min(processes, len(items)),
+            initializer=_initialize, initargs=(function, items, args))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def map(self, start=0, stop=None):
+        """\
+        Evaluate the function over a range of the items, returning the
+        concatenated results.
+
+        @param start: The index of the first item.
+        @type start: C{int}
+        @param stop: The index past the last item (defaults to the end).
+        @type stop: C{int}
+        @return: The results for the items in the range.
+        @rtype: C{list}
+        """
+        if stop is None:
+            stop = len(self.items)
+        if self._pool is None or stop - start < 2:
+            return self.function(self.items[start:stop], *self.args)
+        # Several shards per process balance uneven per-point costs.
+        size = max(1, -(-(stop - start) // (4 * self.processes)))
+        shards = [(i, min(i + size, stop)) for i in range(start, stop, size)]
+        results = self._pool.map(_evaluate_shard, shards)
+        return [result for shard in results for result in shard]
+
+    def close(self):
+        """\
+        Shut down the worker processes.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+def map_shards(function, items, processes, *args):
+    """\
+    Evaluate a function over contiguous shards of a list of items, returning
+    the concatenated results (see L{ShardPool}).
+
+    @param function: The function to evaluate.
+    @type function: C{callable}
+    @param items: The items to evaluate.
+    @type items: C{list}
+    @param processes: The number of worker processes.
+    @type processes: C{int}
+    @return: The results for all items.
+    @rtype: C{list}
+    """
+    with ShardPool(function, items, processes, *args) as pool:
+        return pool.map()
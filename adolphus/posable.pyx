@@ -18,8 +18,11 @@ elif _platform == "linux" or _platform == "linux2":
 print "in Posable:"
 print visual.Polygon()
 
+import numpy as np
+
 from geometry import Point, Pose, Triangle
 from geometry cimport Pose
+from batch import TriangleArray, map_positions
 from visualization import Visualizable
 
 
@@ -169,6 +172,13 @@ class OcclusionTriangle(Posable, Visualizable):
 
     def set_absolute_pose(self, Pose value):
         Posable.set_absolute_pose(self, value)
+        self._geometry_changed_hook()
+
+    def set_relative_pose(self, Pose value):
+        Posable.set_relative_pose(self, value)
+        self._geometry_changed_hook()
+
+    relative_pose = property(Posable.get_relative_pose, set_relative_pose)
 
     def get_absolute_pose(self):
         """\
@@ -198,6 +208,17 @@ class OcclusionTriangle(Posable, Visualizable):
             pass
         Posable._pose_changed_hook(self)
 
+    def _geometry_changed_hook(self):
+        """\
+        Hook called when the pose of the triangle relative to its mount is
+        set. The packed triangle buffers of the mount are discarded.
+        """
+        for attribute in ['_local_triangles', '_packed_triangles']:
+            try:
+                delattr(self._mount, attribute)
+            except AttributeError:
+                pass
+
     mount_pose = get_absolute_pose
 
     def mapped_triangle(self):
@@ -261,8 +282,43 @@ class SceneObject(Posable, Visualizable):
             del self._bounding_box
         except AttributeError:
             pass
+        try:
+            del self._packed_triangles
+        except AttributeError:
+            pass
         Posable._pose_changed_hook(self)
 
+    def packed_triangles(self):
+        """\
+        Return the occluding triangles of this object, along with the mapped
+        triangles packed in the same order. The vertices are kept in a buffer
+        in the frame of this object, so that on a pose change, they are mapped
+        all at once; the mapped L{Triangle} objects are created only on request
+        (see L{TriangleArray.triangle}).
+
+        @return: The occluding triangles and the packed mapped triangles.
+        @rtype: C{list} of L{OcclusionTriangle}, L{TriangleArray}
+        """
+        try:
+            return self._packed_triangles
+        except AttributeError:
+            pass
+        try:
+            source, triangles, local = self._local_triangles
+        except AttributeError:
+            source = None
+        # The buffer is rebuilt if the triangle set has been replaced or
+        # changed in size (triangle pose changes discard it directly).
+        if source is not self.triangles or len(source) != len(triangles):
+            triangles = list(self.triangles)
+            local = np.array([[c for v in triangle.triangle.pose_map(\
+                triangle.relative_pose).vertices for c in (v.x, v.y, v.z)] \
+                for triangle in triangles], dtype=float).reshape((-1, 9))
+            self._local_triangles = self.triangles, triangles, local
+        self._packed_triangles = triangles, TriangleArray.from_vertices(\
+            map_positions(self.pose, local.reshape((-1, 3))))
+        return self._packed_triangles
+
     def toggle_triangles(self):
         """\
         Toggle display of occluding triangles in the visualization. This fades
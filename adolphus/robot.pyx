@@ -10,7 +10,10 @@ Robot module.
 from math import pi
 from functools import reduce
 
+import numpy as np
+
 from geometry import Point, Rotation, Pose
+from batch import TriangleArray
 from posable import SceneObject
 
 
@@ -267,6 +270,22 @@ class Robot(SceneObject):
         return reduce(lambda a, b: a | b,
             [link.triangles for link in self.links])
 
+    def packed_triangles(self):
+        """\
+        Occluding triangles (of all links, combined), along with the mapped
+        triangles packed in the same order (see
+        L{SceneObject.packed_triangles}).
+        """
+        triangles, arrays = [], []
+        for link in self.links:
+            link_triangles, array = link.packed_triangles()
+            triangles += link_triangles
+            arrays.append(array)
+        packed = TriangleArray.from_vertices(np.vstack([np.empty((0, 9))] + \
+            [array.vertices for array in arrays]))
+        packed._triangles = [t for array in arrays for t in array._triangles]
+        return triangles, packed
+
     def visualize(self):
         """\
         Visualize this robot.
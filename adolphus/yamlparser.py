@@ -20,6 +20,7 @@ from .laser import RangeModel
 from .coverage import PointCache, Model
 from .tensor import CameraTensor, TensorModel
 from .posable import OcclusionTriangle, SceneObject
+from .occlusion import OcclusionCacheStore
 from .geometry import Angle, Point, DirectionalPoint, Pose, Rotation, Quaternion
 
 
@@ -268,6 +269,9 @@ class YAMLParser(object):
                     mounts[obj['name']] = obj['mount']
         for name in mounts:
             rmodel[name].mount = rmodel[mounts[name]]
+        if 'occlusion_cache' in model:
+            rmodel.occlusion_store = OcclusionCacheStore(\
+                os.path.join(self._path, model['occlusion_cache']))
         return rmodel
 
     @staticmethod
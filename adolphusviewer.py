@@ -6,28 +6,53 @@ except ImportError:
     import pickle
 
 from sys import stdin, stdout
+from Queue import Queue
 from threading import Thread
 from optparse import OptionParser
 
 from adolphus.interface import Experiment
-from adolphus.commands import CommandError
+from adolphus.commands import CommandError, immediate
+
+def execute(experiment, cmd, rf):
+    try:
+        response = experiment.execute(cmd, response=rf)
+    except CommandError, e:
+        response = pickle.dumps(e)
+    except IndexError:
+        return None
+    if not response:
+        response = pickle.dumps(None)
+    return response
+
+
+def respond(experiment, rf, queue):
+    while True:
+        cmd, response = queue.get()
+        if cmd:
+            response = execute(experiment, cmd, rf)
+        if response:
+            stdout.write(response + '\n')
+            stdout.flush()
+
 
 def receive(experiment, rf):
+    # Commands are executed in order by the responder thread, except that
+    # immediate commands (e.g. cancel) are executed as soon as they are read,
+    # so that they can act on the command in progress. Responses are written
+    # in command order.
+    queue = Queue()
+    responder = Thread(target=respond, args=(experiment, rf, queue))
+    responder.daemon = True
+    responder.start()
     while not experiment.exit:
         try:
             cmd = stdin.readline().rstrip()
         except IOError:
             continue
-        try:
-            response = experiment.execute(cmd, response=rf)
-        except CommandError, e:
-            response = pickle.dumps(e)
-        except IndexError:
-            continue
-        if not response:
-            response = pickle.dumps(None)
-        stdout.write(response + '\n')
-        stdout.flush()
+        if cmd.split()[:1] and cmd.split()[0] in immediate:
+            queue.put((None, execute(experiment, cmd, rf)))
+        else:
+            queue.put((cmd, None))
 
 
 def viewer_main(modelfile=None, config='', zoom=False, server=False,
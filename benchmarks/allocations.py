@@ -0,0 +1,159 @@
+"""\
+Geometry allocation micro-benchmark.
+
+Compares the geometry hot paths (triangle/segment intersection, point/face
+distance, and pose mapping), which do their arithmetic on C structs, against
+the former kernels which chained L{Point} operations, each allocating a new
+object (see C{chained.pyx}, compiled on the fly with C{pyximport}).
+
+For each path, the time per call and the number of geometry objects
+(L{Point}, L{DirectionalPoint}, L{Quaternion}, L{Rotation}, and L{Pose})
+allocated per call are reported under both kernels. Allocations are counted by
+wrapping the C{tp_alloc} slot of each of these types with C{ctypes} (see
+L{AllocationCounter}), which counts every temporary, including those freed
+within the call, on Python 2.7 as well as Python 3. The intersection test on a
+miss should allocate nothing, and on a hit only the resulting L{Point}.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+import os
+import sys
+import ctypes
+import argparse
+from math import pi
+from timeit import default_timer
+
+from adolphus.geometry import Point, DirectionalPoint, Quaternion, Rotation, \
+    Pose, Triangle
+
+
+class AllocationCounter(object):
+    """\
+    Counter of the allocations of instances of a set of extension types. While
+    active (as a context manager), the C{tp_alloc} slot of each type, which is
+    inherited from C{PyType_GenericAlloc}, is replaced with a C{ctypes}
+    callback which counts the call before allocating.
+    """
+    _generic = ctypes.pythonapi.PyType_GenericAlloc
+    _generic.restype = ctypes.c_void_p
+    _generic.argtypes = [ctypes.c_void_p, ctypes.c_ssize_t]
+
+    def __init__(self, types):
+        """\
+        Constructor.
+
+        @param types: The types whose allocations to count.
+        @type types: C{list} of C{type}
+        """
+        self.count = 0
+        generic = ctypes.cast(self._generic, ctypes.c_void_p).value
+        self._callback = ctypes.PYFUNCTYPE(ctypes.c_void_p, ctypes.c_void_p,
+            ctypes.c_ssize_t)(self._counted)
+        self._alloc = ctypes.cast(self._callback, ctypes.c_void_p).value
+        self._slots = []
+        for t in types:
+            words = (ctypes.c_void_p * (type.__basicsize__ // \
+                ctypes.sizeof(ctypes.c_void_p))).from_address(id(t))
+            slots = [i for i, word in enumerate(words) if word == generic]
+            if len(slots) != 1:
+                raise ValueError('cannot locate tp_alloc of %s' % t.__name__)
+            self._slots.append((words, slots[0], generic))
+
+    def _counted(self, t, n):
+        self.count += 1
+        return self._generic(t, n)
+
+    def __enter__(self):
+        for words, i, generic in self._slots:
+            words[i] = self._alloc
+        return self
+
+    def __exit__(self, *exc):
+        for words, i, generic in self._slots:
+            words[i] = generic
+
+
+def load_chained():
+    """\
+    Compile and import the former (chained L{Point} operation) kernels.
+
+    @return: The kernel module, or None if it cannot be built.
+    @rtype: C{module}
+    """
+    try:
+        import pyximport
+    except ImportError:
+        return None
+    pyximport.install()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        import chained
+    except ImportError:
+        return None
+    return chained
+
+
+def per_call(function, args, number, counter):
+    """\
+    Return the time per call and the number of objects allocated per call.
+    """
+    start = default_timer()
+    for i in range(number):
+        function(*args)
+    elapsed = (default_timer() - start) / number
+    # Warm up any cached state (e.g. normals, inverses) first.
+    function(*args)
+    calls = min(number, 1000)
+    counter.count = 0
+    with counter:
+        for i in range(calls):
+            function(*args)
+    return elapsed, float(counter.count) / calls
+
+
+def report(elapsed, allocations):
+    return '%10.3f us/call %6.1f allocations/call' % (elapsed * 1e6,
+        allocations)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', dest='number', type=int,
+        default=100000, help='number of calls')
+    args = parser.parse_args()
+    counter = AllocationCounter([Point, DirectionalPoint, Quaternion,
+        Rotation, Pose])
+    chained = load_chained()
+    if not chained:
+        sys.stderr.write('former kernels not available (requires Cython)\n')
+    triangle = Triangle(Point(-3, -3, 0), Point(-3, 2, 0), Point(4, 1, 0))
+    pose = Pose(T=Point(3, 2, 1), R=Rotation.from_axis_angle(pi / 3,
+        Point(1, 1, 0)))
+    hit = (Point(-1, -1, 3), Point(-1, -1, -3), True)
+    miss = (Point(5, 5, 3), Point(5, 5, -3), True)
+    benchmarks = [
+        ('intersection (hit)', triangle.intersection, hit,
+            'intersection', (triangle,) + hit),
+        ('intersection (miss)', triangle.intersection, miss,
+            'intersection', (triangle,) + miss),
+        ('dist_to_point', triangle.dist_to_point, (Point(1, 1, 5),),
+            'dist_to_point', (triangle, Point(1, 1, 5))),
+        ('Pose._map', pose._map, (Point(1, 2, 3),),
+            'map', (pose, Point(1, 2, 3))),
+        ('Rotation.rotate', pose.R.rotate, (Point(1, 2, 3),),
+            'rotate', (pose.R, Point(1, 2, 3)))]
+    for name, function, fargs, former, formerargs in benchmarks:
+        print('%s' % name)
+        if chained:
+            elapsed, allocations = per_call(getattr(chained, former),
+                formerargs, args.number, counter)
+            print('    %-8s %s' % ('before', report(elapsed, allocations)))
+            before = elapsed
+        elapsed, allocations = per_call(function, fargs, args.number, counter)
+        print('    %-8s %s' % ('after', report(elapsed, allocations)))
+        if chained:
+            print('    %-8s %10.2fx' % ('speedup', before / elapsed))
@@ -0,0 +1,55 @@
+"""\
+Former geometry kernels, which chain L{Point} operations (each of which
+allocates a new object), kept for comparison by the allocation benchmark.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+from adolphus.geometry cimport Point, Quaternion, Rotation, Pose, Face, \
+    Triangle
+
+
+cpdef Point intersection(Triangle triangle, Point origin, Point end,
+                         bint limit):
+    cdef Point origin_end, direction, P, T, Q
+    cdef double det, inv_det, u, v, t
+    origin_end = end._sub(origin)
+    direction = origin_end.unit()
+    P = direction.cross(triangle._edge_2._neg())
+    det = triangle._edge_0.dot(P)
+    if det > -1e-4 and det < 1e-4:
+        return None
+    inv_det = 1.0 / det
+    T = origin._sub(triangle._vertex_0)
+    u = (T.dot(P)) * inv_det
+    if u < 0 or u > 1.0:
+        return None
+    Q = T.cross(triangle._edge_0)
+    v = (direction.dot(Q)) * inv_det
+    if v < 0 or u + v > 1.0:
+        return None
+    t = (Q.dot(triangle._edge_2._neg())) * inv_det
+    if limit and (t < 1e-04 or t > origin_end.magnitude() - 1e-04):
+        return None
+    return origin._add(direction._mul(t))
+
+
+cpdef double dist_to_point(Face face, Point p):
+    cdef double sn, sd, sb
+    cdef Point b
+    sn = -(face.normal().dot(p - face.vertices[2]))
+    sd = face.normal().dot(face.normal())
+    sb = sn / sd
+    b = p + face.normal()._mul(sb)
+    return p.euclidean(b)
+
+
+cpdef Point rotate(Rotation rotation, Point p):
+    return (rotation.Q._mul(Quaternion(0, p))._mul(rotation.Q.inverse())).v
+
+
+cpdef Point map(Pose pose, Point p):
+    return rotate(pose.R, p)._add(pose.T)
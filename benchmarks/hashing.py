@@ -0,0 +1,57 @@
+"""\
+Point hashing micro-benchmark.
+
+Measures C{dict} insert and lookup throughput for a set of task points using
+the quantized point hash, against the former string representation hash.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+import argparse
+from random import seed, uniform
+from timeit import default_timer
+
+from adolphus.geometry import Point
+
+
+class ReprPoint(Point):
+    """\
+    Point with the former string representation hash.
+    """
+    def __hash__(self):
+        return hash(repr(self))
+
+
+def throughput(points):
+    """\
+    Return the insert and lookup throughput (operations per second) of a
+    C{dict} keyed by the given points.
+    """
+    start = default_timer()
+    cache = {}
+    for point in points:
+        cache[point] = 1.0
+    insert = default_timer() - start
+    start = default_timer()
+    for point in points:
+        cache[point]
+    lookup = default_timer() - start
+    return len(points) / insert, len(points) / lookup
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--number', dest='number', type=int,
+        default=1000000, help='number of points')
+    args = parser.parse_args()
+    seed(0)
+    coordinates = [(uniform(-1000, 1000), uniform(-1000, 1000),
+        uniform(-1000, 1000)) for i in range(args.number)]
+    for name, cls in [('repr', ReprPoint), ('quantized', Point)]:
+        points = [cls(*c) for c in coordinates]
+        insert, lookup = throughput(points)
+        print('%-10s insert: %12.0f/s  lookup: %12.0f/s' % (name, insert,
+            lookup))
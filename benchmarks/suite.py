@@ -0,0 +1,263 @@
+"""\
+Coverage benchmark suite.
+
+Generates synthetic scenes of scalable size (number of cameras, number of task
+points, number of occluding triangles), times the main coverage, occlusion and
+range coverage paths on each, and writes the results as JSON so that runs can
+be compared against each other.
+
+Task points are generated from ranges by the YAML parser, and occluding
+triangles come from raw meshes loaded as L{Solid} objects.
+
+@author: Aaron Mavrinac
+@organization: University of Windsor
+@contact: mavrin1@uwindsor.ca
+@license: GPL-3
+"""
+
+import os
+import sys
+import json
+import yaml
+import shutil
+import argparse
+import platform
+import tempfile
+from math import pi, sin, cos, sqrt
+from itertools import product
+from timeit import default_timer
+
+from adolphus.laser import RangeModel
+from adolphus.yamlparser import YAMLParser
+
+
+CAMERA = {'A': 4.5, 'f': 12, 's': 0.00465, 'o': [680, 512],
+    'dim': [1360, 1024], 'zS': 1200}
+RANGE_CAMERA = {'A': 4.4765, 'f': 12.5341, 's': 0.00465,
+    'o': [760.1805, 495.1859], 'dim': [1360, 1024], 'zS': 1216.1}
+TASK_PARAMETERS = {'boundary_padding': 20.0, 'res_min': [0.5, 3.0],
+    'blur_max': 5.0}
+RANGE_TASK_PARAMETERS = {'boundary_padding': 10, 'hres_min': [0.5, 2.0],
+    'res_min': [0.5, 2.0], 'blur_max': [1.0, 2.0], 'angle_max': 1.0}
+
+
+def look_at(position, target=(0.0, 0.0, 0.0)):
+    """\
+    Return the YAML pose of a camera at a position with its optical axis
+    pointed at a target.
+    """
+    z = [target[i] - position[i] for i in range(3)]
+    z = [c / sqrt(sum(c ** 2 for c in z)) for c in z]
+    up = (0.0, 0.0, 1.0) if abs(z[2]) < 0.99 else (0.0, 1.0, 0.0)
+    x = [z[1] * up[2] - z[2] * up[1], z[2] * up[0] - z[0] * up[2],
+         z[0] * up[1] - z[1] * up[0]]
+    x = [c / sqrt(sum(c ** 2 for c in x)) for c in x]
+    y = [z[1] * x[2] - z[2] * x[1], z[2] * x[0] - z[0] * x[2],
+         z[0] * x[1] - z[1] * x[0]]
+    return {'T': list(position), 'Rformat': 'matrix',
+            'R': [[x[i], y[i], z[i]] for i in range(3)]}
+
+
+def ring(n, radius, height=0.0):
+    """\
+    Return n positions evenly spaced on a horizontal ring.
+    """
+    return [(radius * cos(2 * pi * i / n), radius * sin(2 * pi * i / n),
+             height) for i in range(n)]
+
+
+def write_mesh(filename, triangles, size, offset):
+    """\
+    Write a raw triangle mesh of (at least) the given number of triangles,
+    forming a square grid in the plane M{x = offset}.
+    """
+    k = max(1, int(round(sqrt(triangles / 2.0))))
+    d = 2.0 * size / k
+    with open(filename, 'w') as f:
+        for i, j in product(range(k), repeat=2):
+            y, z = -size + i * d, -size + j * d
+            for vertices in [[(y, z), (y + d, z), (y + d, z + d)],
+                             [(y + d, z + d), (y, z + d), (y, z)]]:
+                f.write(' '.join(['%f %f %f' % (offset, v[0], v[1]) \
+                    for v in vertices]) + '\n')
+
+
+def standard_scene(directory, cameras, points, triangles, modeltype):
+    """\
+    Write a synthetic scene with a ring of cameras around a cube of task points
+    and a triangle mesh partially blocking the view, and return the filename.
+    """
+    write_mesh(os.path.join(directory, 'mesh.raw'), triangles, 150.0, 600.0)
+    m = max(2, int(round(points ** (1.0 / 3.0))))
+    experiment = {'type': modeltype, 'model': {'cameras': [], 'scene': [
+        {'name': 'M', 'sprites': [{'triangles': 'mesh.raw'}]}]},
+        'tasks': [{'name': 'T', 'parameters': TASK_PARAMETERS,
+        'step': 200.0 / (m - 1), 'ranges': [{'x': [-100, 100],
+        'y': [-100, 100], 'z': [-100, 100]}]}]}
+    for i, position in enumerate(ring(cameras, 1100.0)):
+        camera = dict(CAMERA, name='C%d' % i, pose=look_at(position))
+        experiment['model']['cameras'].append(camera)
+    filename = os.path.join(directory, '%s.yaml' % modeltype)
+    with open(filename, 'w') as f:
+        yaml.dump(experiment, f)
+    return filename
+
+
+def range_scene(directory, cameras, points, triangles):
+    """\
+    Write a synthetic range imaging scene with a ring of range cameras around a
+    line laser above a triangulated target plate, and return the filename.
+    """
+    k = max(1, int(round(sqrt(triangles / 2.0))))
+    d = 200.0 / k
+    plate = []
+    for i, j in product(range(k), repeat=2):
+        x, y = -100.0 + i * d, -100.0 + j * d
+        plate.append({'vertices': [[x, y, 0], [x + d, y, 0],
+            [x + d, y + d, 0]]})
+        plate.append({'vertices': [[x + d, y + d, 0], [x, y + d, 0],
+            [x, y, 0]]})
+    m = max(2, int(round(sqrt(points))))
+    step = 160.0 / (m - 1)
+    experiment = {'type': 'range', 'model': {'cameras': [],
+        'lasers': [{'name': 'L', 'fan': 1.05, 'depth': 800, 'pose': {
+        'T': [0, 0, 500], 'R': [0, 180, 0], 'Rformat': 'euler-zyx-deg'}}],
+        'scene': [{'name': 'P', 'sprites': [{'triangles': plate}]}]},
+        'tasks': [{'name': 'T', 'parameters': RANGE_TASK_PARAMETERS,
+        'mount': 'P', 'points': [[-80 + i * step, -80 + j * step, 0]
+        for i, j in product(range(m), repeat=2)]}]}
+    for i, position in enumerate(ring(cameras, 860.0, 860.0)):
+        camera = dict(RANGE_CAMERA, name='C%d' % i, pose=look_at(position))
+        experiment['model']['cameras'].append(camera)
+    filename = os.path.join(directory, 'range.yaml')
+    with open(filename, 'w') as f:
+        yaml.dump(experiment, f)
+    return filename
+
+
+def timed(function, repeat, setup=None):
+    """\
+    Return the wall clock times of repeated calls to a function. If a setup
+    function is given, it is called (untimed) before each call, and its return
+    value is passed to the function.
+    """
+    times = []
+    for i in range(repeat):
+        argument = setup() if setup else None
+        start = default_timer()
+        if setup:
+            function(argument)
+        else:
+            function()
+        times.append(default_timer() - start)
+    return times
+
+
+def run(directory, cameras, points, triangles, repeat, names):
+    """\
+    Run the selected benchmarks on the scenes of one size, and return the
+    result records.
+    """
+    results = []
+    filenames = {}
+    for modeltype in ['standard', 'tensor']:
+        filenames[modeltype] = standard_scene(directory, cameras, points,
+            triangles, modeltype)
+    filenames['range'] = range_scene(directory, cameras, points, triangles)
+
+    def load(modeltype):
+        return lambda: YAMLParser(filenames[modeltype]).experiment
+
+    model, tasks = load('standard')()
+    task = tasks['T']
+    size = {'cameras': cameras, 'points': len(list(task.mapped)),
+            'triangles': len(model['M'].triangles)}
+
+    def occlusion_cache(experiment):
+        experiment[0]._update_occlusion_cache(experiment[1]['T'].params)
+
+    def range_coverage(experiment):
+        experiment[0].range_coverage(experiment[1]['T'],
+            RangeModel.LinearTargetTransport(experiment[0]))
+
+    def tensor_coverage(experiment):
+        experiment[0].coverage(experiment[0]['M'])
+
+    # Warm the occlusion cache so that coverage timings exclude it.
+    model._update_occlusion_cache(task.params)
+    benchmarks = [
+        ('yaml_load', lambda: timed(load('standard'), repeat)),
+        ('occlusion_cache', lambda: timed(occlusion_cache, repeat,
+            load('standard'))),
+        ('coverage', lambda: timed(lambda: model.coverage(task), repeat)),
+        ('coverage_batch', lambda: timed(lambda: model.coverage(task,
+            batch=True), repeat)),
+        ('best_view', lambda: timed(lambda: model.best_view(task), repeat)),
+        ('range_coverage', lambda: timed(range_coverage, repeat,
+            load('range'))),
+        ('tensor_coverage', lambda: timed(tensor_coverage, repeat,
+            load('tensor')))]
+    for name, benchmark in benchmarks:
+        if names and not name in names:
+            continue
+        times = benchmark()
+        result = dict(size, name=name, times=times, best=min(times))
+        results.append(result)
+        sys.stderr.write('%-16s cameras=%-4d points=%-7d triangles=%-7d '
+            '%10.4f s\n' % (name, cameras, size['points'], size['triangles'],
+            result['best']))
+    return results
+
+
+def compare(results, baseline):
+    """\
+    Print the ratio of the best times of matching results in a baseline run.
+    """
+    key = lambda r: (r['name'], r['cameras'], r['points'], r['triangles'])
+    reference = dict((key(r), r['best']) for r in baseline['results'])
+    for result in results:
+        try:
+            ratio = reference[key(result)] / result['best']
+        except (KeyError, ZeroDivisionError):
+            continue
+        print('%-16s cameras=%-4d points=%-7d triangles=%-7d speedup %7.2fx' \
+            % (key(result) + (ratio,)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--cameras', dest='cameras', type=int,
+        nargs='+', default=[1, 4], help='numbers of cameras')
+    parser.add_argument('-p', '--points', dest='points', type=int, nargs='+',
+        default=[1000], help='approximate numbers of task points')
+    parser.add_argument('-t', '--triangles', dest='triangles', type=int,
+        nargs='+', default=[200], help='approximate numbers of triangles')
+    parser.add_argument('-r', '--repeat', dest='repeat', type=int, default=3,
+        help='number of timed repetitions')
+    parser.add_argument('-b', '--benchmarks', dest='names', nargs='+',
+        help='benchmarks to run (default all)')
+    parser.add_argument('-o', '--output', dest='output',
+        help='JSON output file (default standard output)')
+    parser.add_argument('--compare', dest='compare',
+        help='JSON output of a previous run to compare against')
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    results = []
+    try:
+        for cameras, points, triangles in product(args.cameras, args.points,
+            args.triangles):
+            results += run(directory, cameras, points, triangles, args.repeat,
+                args.names)
+    finally:
+        shutil.rmtree(directory)
+    report = {'python': platform.python_version(),
+              'platform': platform.platform(), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -9,6 +9,7 @@ Active triangulation 3D range imaging sensor planning optimizer.
 
 import argparse
 import csv
+import multiprocessing
 from bisect import bisect
 from math import pi, sin, cos
 from random import gauss
@@ -19,8 +20,9 @@ except ImportError:
     import pickle
 
 from adolphus.geometry import Angle, Point, DirectionalPoint, Rotation, Pose
-from adolphus.laser import RangeModel
+from adolphus.laser import RangeModel, RangeCoverage
 from adolphus.interface import Experiment
+from adolphus.yamlparser import YAMLParser
 
 import pso
 
@@ -80,26 +82,54 @@ class LensLUT(object):
         return params
         
 
-def load_model(modelfile, cameras, fnumber):
-    ex = Experiment()
-    ex.execute('loadmodel %s' % modelfile)
-    ex.execute('loadconfig')
+def setup_model(model, cameras, fnumber):
     # situate cameras on a side of the laser
     for camera in cameras:
-        if ex.model[camera[0]].pose.T.y < \
-           ex.model[ex.model.active_laser].pose.T.y:
-            ex.model[camera[0]].negative_side = True
+        if model[camera[0]].pose.T.y < model[model.active_laser].pose.T.y:
+            model[camera[0]].negative_side = True
         else:
-            ex.model[camera[0]].negative_side = False
+            model[camera[0]].negative_side = False
     # disable unspecified cameras
-    for camera in ex.model.cameras:
+    for camera in model.cameras:
         if not camera in [c[0] for c in cameras]:
-            ex.model[camera].active = False
+            model[camera].active = False
     # load lens lookup tables
     lut = []
     for camera in cameras:
         lut.append(LensLUT(camera[1], fnumber))
-    return ex, lut
+    return lut
+
+
+def load_model(modelfile, cameras, fnumber):
+    ex = Experiment()
+    ex.execute('loadmodel %s' % modelfile)
+    ex.execute('loadconfig')
+    return ex, setup_model(ex.model, cameras, fnumber)
+
+
+def evaluate(model, session, cameras, lut, particle):
+    for i in range(len(cameras)):
+        x, h, d, beta = particle[4 * i: 4 * (i + 1)]
+        if d < lut[i].bounds[0] or d > lut[i].bounds[1]:
+            return -float('inf')
+        modify_camera(model, cameras[i][0], lut[i], x, h, d, beta)
+    return session.performance()
+
+
+# Model replica of a worker process.
+_worker = None
+
+def init_worker(modelfile, cameras, fnumber):
+    global _worker
+    model, tasks = YAMLParser(modelfile).experiment
+    lut = setup_model(model, cameras, fnumber)
+    transport = RangeModel.LinearTargetTransport(model, analytic=True)
+    _worker = (model, RangeCoverage(model, tasks['scan'], transport), cameras,
+        lut)
+
+
+def worker_fitness(particle):
+    return evaluate(*(_worker + (particle,)))
 
 
 def modify_camera(model, camera, lut, x, h, d, beta):
@@ -125,7 +155,7 @@ def get_bounds(model, task, cameras, lut):
     # compute bounds on x and h
     xmin, xmax = float('inf'), -float('inf')
     zmin, zmax = float('inf'), -float('inf')
-    for point in task.mapped:
+    for point in task.mapped_array:
         lp = model[model.active_laser].triangle.intersection(point,
             point + Point(0, 1, 0), False)
         if lp:
@@ -180,27 +210,36 @@ if __name__ == '__main__':
         choices=pso.topologies.keys())
     parser.add_argument('-c', '--constraint', dest='constraint',
         choices=pso.constraints.keys())
+    parser.add_argument('-P', '--processes', dest='processes', type=int,
+        default=1)
     args = parser.parse_args()
 
     cameras = [('A', 'lens.lut'), ('B', 'lens.lut')]
+
+    # start worker processes (before any display is created), each with its
+    # own replica of the model
+    pool = None
+    if args.processes > 1:
+        pool = multiprocessing.Pool(args.processes, init_worker,
+            ('block.yaml', cameras, 1.0))
+
     ex, lut = load_model('block.yaml', cameras, 1.0)
 
     # get solution space bounds
     bounds = get_bounds(ex.model, ex.tasks['scan'],
         [camera[0] for camera in cameras], lut)
 
-    # create transport context
-    transport = RangeModel.LinearTargetTransport(ex.model)
+    # create transport context and range coverage session
+    transport = RangeModel.LinearTargetTransport(ex.model, analytic=True)
+    session = RangeCoverage(ex.model, ex.tasks['scan'], transport)
 
     # define fitness function
-    def fitness(particle):
-        for i in range(len(cameras)):
-            x, h, d, beta = particle[4 * i: 4 * (i + 1)]
-            if d < lut[i].bounds[0] or d > lut[i].bounds[1]:
-                return -float('inf')
-            modify_camera(ex.model, cameras[i][0], lut[i], x, h, d, beta)
-        coverage = ex.model.range_coverage(ex.tasks['scan'], transport)
-        return ex.model.performance(ex.tasks['scan'], coverage=coverage)
+    if pool:
+        fitness, mapper = worker_fitness, pool.map
+    else:
+        fitness = lambda particle: evaluate(ex.model, session, cameras, lut,
+            particle)
+        mapper = map
 
     # load visualization
     ex.start()
@@ -210,7 +249,8 @@ if __name__ == '__main__':
         for best, F in pso.particle_swarm_optimize(fitness,
             4 * len(cameras), bounds, args.size, args.omega, args.phip,
             args.phin, args.clamp, args.it, args.af, args.cluster,
-            topology_type=args.topology, constraint_type=args.constraint):
+            topology_type=args.topology, constraint_type=args.constraint,
+            mapper=mapper):
             print('%g' % F)
             for c, camera in enumerate(cameras):
                 modify_camera(ex.model, camera[0], lut[c],
@@ -218,3 +258,7 @@ if __name__ == '__main__':
                 ex.model[camera[0]].update_visualization()
     except KeyboardInterrupt:
         pass
+    finally:
+        session.close()
+        if pool:
+            pool.terminate()
@@ -1,6 +1,9 @@
 """\
 Particle Swarm Optimization
 
+Random numbers are drawn from C{numpy.random}, so a run is seeded with
+C{numpy.random.seed} (not C{random.seed}).
+
 @author: Aaron Mavrinac
 @organization: University of Windsor
 @contact: mavrin1@uwindsor.ca
@@ -8,125 +11,159 @@ Particle Swarm Optimization
 """
 
 import numpy
-from random import uniform
-
 
-class Particle(numpy.ndarray):
-    _gbest = None
-    _gbest_fitness = None
 
-    def __init__(self, *args):
-        self.velocity = numpy.ndarray(self.shape[0])
-        self._best = None
-        self._best_fitness = None
-        self.neighborhood = set()
+class Swarm(object):
+    """\
+    Particle swarm. The positions, velocities, and personal bests of all
+    particles are held as rows of 2-D arrays, so that each step of an iteration
+    is a single array operation over the whole swarm.
+    """
+    def __init__(self, size, bounds, neighborhood, l=1.0):
+        """\
+        Constructor. Positions are initialized uniformly within the bounds, and
+        velocities uniformly within the span of the bounds (clamped).
+
+        @param size: The number of particles.
+        @type size: C{int}
+        @param bounds: The lower and upper bound of each dimension.
+        @type bounds: C{list} of C{tuple}
+        @param neighborhood: Neighborhood adjacency matrix (see L{topology}).
+        @type neighborhood: C{numpy.ndarray}
+        @param l: Velocity clamp as a fraction of the span of the bounds.
+        @type l: C{float}
+        """
+        bounds = numpy.array(bounds, dtype=float)
+        self.lower, self.upper = bounds[:, 0], bounds[:, 1]
+        self.span = self.upper - self.lower
+        self.vmax = l * self.span
+        self.neighborhood = neighborhood
+        shape = (size, bounds.shape[0])
+        self.positions = numpy.random.uniform(self.lower, self.upper, shape)
+        self.velocities = numpy.clip(numpy.random.uniform(-self.span,
+            self.span, shape), -self.vmax, self.vmax)
+        self.best = self.positions.copy()
+        self.best_fitness = numpy.empty(size)
+        self.best_fitness.fill(-float('inf'))
+        self.evaluated = numpy.zeros(size, dtype=bool)
+        self._gbest = (None, None)
 
     @property
-    def best(self):
-        return (self._best, self._best_fitness)
+    def gbest(self):
+        return self._gbest
 
     @property
     def nbest(self):
-        if not self.neighborhood:
-            return self.gbest
-        candidates = [particle.best for particle in self.neighborhood]
-        return max(candidates, key=lambda best: best[1])
-
-    @property
-    def gbest(self):
-        return (self.__class__._gbest, self.__class__._gbest_fitness)
-
-    def initialize(self, bounds, l=1.0):
-        for d in range(self.shape[0]):
-            self[d] = uniform(bounds[d][0], bounds[d][1])
-            span = bounds[d][1] - bounds[d][0]
-            vmax = l * span
-            self.velocity[d] = min(max(uniform(-span, span), -vmax), vmax)
-
-    def update(self, omega, phip, phin, constraint, bounds, l=1.0):
-        for d in range(self.shape[0]):
-            vmax = l * (bounds[d][1] - bounds[d][0])
-            self.velocity[d] = min(max(omega * self.velocity[d] \
-                + uniform(0, phip) * (self.best[0][d] - self[d]) \
-                + uniform(0, phin) * (self.nbest[0][d] - self[d]), -vmax), vmax)
-        self += self.velocity
-        constraint(self, bounds)
+        """\
+        Best position in the neighborhood of each particle.
+        """
+        fitness = numpy.where(self.neighborhood, self.best_fitness,
+            -float('inf'))
+        return self.best[numpy.argmax(fitness, axis=1)]
+
+    def update(self, omega, phip, phin, constraint):
+        shape = self.positions.shape
+        self.velocities = numpy.clip(omega * self.velocities \
+            + numpy.random.uniform(0, phip, shape) \
+            * (self.best - self.positions) \
+            + numpy.random.uniform(0, phin, shape) \
+            * (self.nbest - self.positions), -self.vmax, self.vmax)
+        self.positions += self.velocities
+        constraint(self.positions, self.lower, self.upper)
 
     def update_best(self, fitness):
-        if fitness > self._best_fitness:
-            self._best = tuple(self)
-            self._best_fitness = fitness
-            if fitness > self.__class__._gbest_fitness:
-                self.__class__._gbest = tuple(self)
-                self.__class__._gbest_fitness = fitness
-    
-    def norm_dist_to_gbest(self, bounds):
-        base = numpy.array([b[0] for b in bounds])
-        span = numpy.array([b[1] for b in bounds]) - base
-        center = (numpy.array(self.gbest[0]) - base) / span
-        norm = (self - base) / span
-        return numpy.linalg.norm(norm - center)
-
-
-topologies = {None: lambda particles: None}
+        """\
+        Update the personal and global bests with the fitness of each particle.
+        The first evaluation of a particle always sets its personal best (even
+        if the fitness is -inf), and later ones only if strictly better. The
+        global best is updated, in particle order, whenever a personal best
+        strictly exceeds it.
+
+        @param fitness: The fitness of each particle.
+        @type fitness: C{list} of C{float}
+        """
+        fitness = numpy.asarray(fitness, dtype=float)
+        improved = ~self.evaluated | (fitness > self.best_fitness)
+        self.evaluated[:] = True
+        self.best[improved] = self.positions[improved]
+        self.best_fitness[improved] = fitness[improved]
+        improved = numpy.flatnonzero(improved)
+        if improved.size:
+            i = improved[numpy.argmax(fitness[improved])]
+            if self._gbest[1] is None or fitness[i] > self._gbest[1]:
+                self._gbest = (tuple(self.positions[i]), fitness[i])
+
+    def norm_dist_to_gbest(self):
+        center = (numpy.array(self.gbest[0]) - self.lower) / self.span
+        norm = (self.positions - self.lower) / self.span
+        return numpy.sqrt(((norm - center) ** 2).sum(axis=1))
+
+
+# A topology returns the neighborhood adjacency matrix of a swarm, where row i
+# is True for each particle in the neighborhood of particle i. A particle with
+# no neighbors follows the global best.
+topologies = {None: lambda size: numpy.ones((size, size), dtype=bool)}
 
 def topology(f):
-    topologies[f.__name__] = f
+    def adjacency(size):
+        neighborhood = f(size)
+        neighborhood[~neighborhood.any(axis=1)] = True
+        return neighborhood
+    topologies[f.__name__] = adjacency
     return f
 
 @topology
-def ring(particles):
-    for i, particle in enumerate(particles):
-        particle.neighborhood.add(particle)
-        particle.neighborhood.add(particles[i - 1])
-        particle.neighborhood.add(particles[(i + 1) % len(particles)])
+def ring(size):
+    index = numpy.arange(size)
+    neighborhood = numpy.zeros((size, size), dtype=bool)
+    for offset in (-1, 0, 1):
+        neighborhood[index, (index + offset) % size] = True
+    return neighborhood
 
 @topology
-def star(particles):
-    for particle in particles[1:]:
-        particle.neighborhood.add(particle)
-        particle.neighborhood.add(particles[0])
+def star(size):
+    neighborhood = numpy.zeros((size, size), dtype=bool)
+    neighborhood[1:, 0] = True
+    neighborhood[numpy.arange(1, size), numpy.arange(1, size)] = True
+    return neighborhood
 
 
-constraints = {None: lambda particle, bounds: None}
+constraints = {None: lambda positions, lower, upper: None}
 
 def constraint(f):
     constraints[f.__name__] = f
     return f
 
 @constraint
-def nearest(particle, bounds):
-    for d in range(particle.shape[0]):
-        particle[d] = max(particle[d], bounds[d][0])
-        particle[d] = min(particle[d], bounds[d][1])
+def nearest(positions, lower, upper):
+    numpy.clip(positions, lower, upper, out=positions)
 
 @constraint
-def random(particle, bounds):
-    for d in range(particle.shape[0]):
-        if particle[d] < bounds[d][0] or particle[d] > bounds[d][1]:
-            particle[d] = uniform(bounds[d][0], bounds[d][1])
+def random(positions, lower, upper):
+    outside = (positions < lower) | (positions > upper)
+    positions[outside] = numpy.random.uniform(lower, upper,
+        positions.shape)[outside]
 
 
 def particle_swarm_optimize(fitness, dimension, bounds, size, omega, phip, phin,
                             clamp=1.0, it=None, af=float('inf'), cluster=(1.0,
-                            0.0), topology_type=None, constraint_type=None):
-    particles = [Particle(dimension) for i in range(size)]
-    topologies[topology_type](particles)
-    for particle in particles:
-        particle.initialize(bounds, l=clamp)
+                            0.0), topology_type=None, constraint_type=None,
+                            mapper=map):
+    swarm = Swarm(size, bounds, topologies[topology_type](size),
+        l=clamp)
     i = 0
     while not it or i < it:
-        for particle in particles:
-            particle.update_best(fitness(particle))
-        yield particles[0].gbest
-        if particles[0].gbest[1] >= af and \
-            (particles[0].gbest[2] == -float('inf') \
-             or particles[0].gbest[2] >= af):
+        # Positions are passed as plain tuples, so that a parallel map (e.g.
+        # multiprocessing.Pool.map) can evaluate them in worker processes.
+        swarm.update_best(list(mapper(fitness,
+            [tuple(position) for position in swarm.positions.tolist()])))
+        gbest = swarm.gbest
+        yield gbest
+        # Stop once the global best reaches the acceptance fitness.
+        if gbest[1] >= af:
             break
-        if sum([particle.norm_dist_to_gbest(bounds) < cluster[1] \
-            for particle in particles]) >= int(cluster[0] * size):
+        if (swarm.norm_dist_to_gbest() < cluster[1]).sum() \
+            >= int(cluster[0] * size):
             break
-        for particle in particles:
-            particle.update(omega, phip, phin, constraints[constraint_type],
-                            bounds)
+        swarm.update(omega, phip, phin, constraints[constraint_type])
         i += 1
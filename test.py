@@ -9,11 +9,25 @@ Unit tests for the various Adolphus modules.
 @license: GPL-3
 """
 
+import os
+import imp
+import shutil
 import unittest
+import tempfile
+import multiprocessing
+from threading import Event
+from itertools import combinations
 from math import sqrt, pi, sin, cos
 
 import adolphus
-from adolphus.geometry import Angle, Point, DirectionalPoint, Pose, Rotation, Triangle
+from adolphus.geometry import Angle, Point, DirectionalPoint, Pose, Rotation, Quaternion, Triangle, \
+    triangle_frustum_intersection, neighbour_probes
+from adolphus.coverage import PointCache, Task, IncrementalCoverage
+from adolphus.laser import RangeCamera, RangeTask, RangeModel, RangeCoverage
+from adolphus.batch import PointArray, PointGrid, PoseArray, TriangleArray, \
+    map_positions, kocular_strength, pack_points, direction_vectors
+from adolphus.occlusion import TriangleBVH, OcclusionCacheStore, \
+    frustum_triangle_mask, triangle_overlap_mask
 from adolphus.yamlparser import YAMLParser
 print('Adolphus imported from "%s"' % adolphus.__path__[0])
 
@@ -41,6 +55,29 @@ class TestGeometry(unittest.TestCase):
         e = 9e-5
         self.assertEqual(self.p, Point(3 + e, 4 - e, 5 + e))
 
+    def test_point_hash(self):
+        e = 2e-5
+        self.assertEqual(hash(self.p), hash(Point(3 + e, 4 - e, 5 + e)))
+        self.assertEqual(hash(self.dp), hash(DirectionalPoint(-7 + e, 1, 9,
+            1.3 - e, 0.2 + e)))
+        self.assertTrue(len(list(neighbour_probes(self.p))) <= 7)
+        self.assertTrue(len(list(neighbour_probes(self.dp))) <= 31)
+        cache = PointCache([(Point(1.00009, 2, 3), 0.5),
+            (DirectionalPoint(1, 2, 3, 1.30009, 0.2), 0.7)])
+        self.assertEqual(cache[Point(1.00011, 2, 3)], 0.5)
+        self.assertEqual(cache[DirectionalPoint(1, 2, 3, 1.30011, 0.2)], 0.7)
+        self.assertRaises(KeyError, cache.__getitem__, Point(1.00025, 2, 3))
+        self.assertTrue(Point(1.00011, 2, 3) in cache)
+        self.assertFalse(Point(1.00025, 2, 3) in cache)
+        self.assertEqual(cache.get(DirectionalPoint(1, 2, 3, 1.30011, 0.2)),
+            0.7)
+        self.assertEqual(cache.get(Point(1.00025, 2, 3), 0.0), 0.0)
+        other = PointCache([(Point(1.00011, 2, 3), 0.8)])
+        self.assertEqual(len(cache | other), 2)
+        self.assertEqual((cache | other)[Point(1.00009, 2, 3)], 0.8)
+        self.assertEqual(len(cache & other), 2)
+        self.assertEqual((cache & other)[Point(1.00009, 2, 3)], 0.5)
+
     def test_point_add_sub(self):
         self.assertEqual(self.p + self.dp, Point(-4, 5, 14))
         self.assertEqual(self.dp + self.p, DirectionalPoint(-4, 5, 14, 1.3, 0.2))
@@ -83,6 +120,15 @@ class TestGeometry(unittest.TestCase):
         r = DirectionalPoint(-7, -1, -9, pi - 1.3, 2 * pi - 0.2)
         self.assertEqual(r, self.P1.map(self.dp))
 
+    def test_rotation_matrix_cache(self):
+        R = Rotation.from_axis_angle(pi / 3, Point(1, 0, 0))
+        R.rotate(self.p)
+        # The cached matrix cannot go stale through the quaternion.
+        self.assertRaises(AttributeError, setattr, R, 'Q', self.R.Q)
+        R.__init__(self.R.Q)
+        self.assertEqual(R.rotate(self.p), self.R.rotate(self.p))
+        self.assertEqual(Pose(R=R).map(self.p), self.R.rotate(self.p))
+
     def test_pose_map(self):
         m = Point(6, -2, -4)
         self.assertEqual(m, self.P2.map(self.p))
@@ -166,6 +212,216 @@ class TestPosable(unittest.TestCase):
         self.assertTrue(self.model['Block'] in self.model['Plate'].children)
         self.assertEqual(self.model['Block'].get_absolute_pose(), Pose(T=Point(57, 8, 3.2)))
 
+    def test_packed_triangles(self):
+        block = self.model['Block']
+        def check():
+            triangles, packed = block.packed_triangles()
+            self.assertEqual(len(triangles), len(block.triangles))
+            for i, triangle in enumerate(triangles):
+                self.assertEqual(packed.triangle(i), triangle.mapped_triangle())
+        check()
+        self.model['Plate'].set_absolute_pose(Pose(T=Point(25, 0, 0),
+            R=Rotation.from_axis_angle(pi / 3.0, Point(0, 0, 1))))
+        check()
+        triangle = next(iter(block.triangles))
+        triangle.set_relative_pose(Pose(T=Point(0, 0, 5)) + \
+            triangle.relative_pose)
+        check()
+
+
+class TestBatch(unittest.TestCase):
+    """\
+    Tests for the batch module.
+    """
+    def setUp(self):
+        e = 9e-5
+        self.c1 = PointCache([(Point(3, 4, 5), 0.2),
+            (DirectionalPoint(3, 4, 5, 1.3, 0.2), 0.7),
+            (Point(-1, 0, 2), 0.5)])
+        self.c2 = PointCache([(Point(3 + e, 4 - e, 5), 0.6),
+            (DirectionalPoint(3, 4, 5, 1.3 + e, 0.2 - e), 0.1),
+            (Point(8, 8, 8), 0.9)])
+        self.a1 = PointArray.from_cache(self.c1)
+        self.a2 = PointArray.from_cache(self.c2)
+
+    def test_point_array_lookup(self):
+        for point in self.c2:
+            self.assertTrue(point in self.a2)
+        self.assertTrue(Point(-1, 0, 2 + 9e-5) in self.a1)
+        self.assertFalse(Point(-1, 0, 2.0002) in self.a1)
+        self.assertFalse(DirectionalPoint(-1, 0, 2, 0.5, 0.5) in self.a1)
+        self.assertEqual(self.a1[Point(3, 4, 5)], 0.2)
+
+    def test_point_array_union(self):
+        result = self.a1 | self.a2
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result[Point(3, 4, 5)], 0.6)
+        self.assertEqual(result[DirectionalPoint(3, 4, 5, 1.3, 0.2)], 0.7)
+        self.assertEqual(result[Point(8, 8, 8)], 0.9)
+
+    def test_point_array_intersection(self):
+        result = self.a1 & self.a2
+        self.assertEqual(len(result), 4)
+        self.assertEqual(result[Point(3, 4, 5)], 0.2)
+        self.assertEqual(result[DirectionalPoint(3, 4, 5, 1.3, 0.2)], 0.1)
+        self.assertEqual(result[Point(-1, 0, 2)], 0.5)
+
+    def test_point_grid_query(self):
+        positions = [[x, y, z] for x in range(10) for y in range(10)
+            for z in range(10)]
+        grid = PointGrid(positions)
+        indices = grid.query([2.5, -1, 7], [4, 3.5, 12])
+        expected = [i for i, p in enumerate(positions) if 2.5 <= p[0] <= 4
+            and p[1] <= 3.5 and p[2] >= 7]
+        self.assertEqual(list(indices), expected)
+        self.assertEqual(len(grid.query([20, 20, 20], [30, 30, 30])), 0)
+
+    def test_map_positions(self):
+        pose = Pose(T=Point(3, 2, 1), R=Rotation.from_axis_angle(0.7,
+            Point(1, -2, 1)))
+        points = [Point(1, 0, 0), Point(-2, 5, 3), Point(0, 0, 0)]
+        mapped = map_positions(pose, [point.to_list() for point in points])
+        for point, position in zip(points, mapped):
+            self.assertEqual(Point(*position), pose.map(point))
+            self.assertEqual(pose.R.rotate(point), (pose.R.Q * \
+                Quaternion(0, point) * pose.R.Q.inverse()).v)
+
+    def test_pose_array(self):
+        poses = [Pose(T=Point(i, 2 * i, -i), R=Rotation.from_axis_angle(i * 0.4,
+            Point(1, i, 2))) for i in range(1, 5)]
+        other = Pose(T=Point(3, -1, 2), R=Rotation.from_euler('zyx',
+            (0.3, -0.2, 1.1)))
+        array = PoseArray.from_poses(poses)
+        self.assertEqual(list(array), poses)
+        self.assertEqual(list(array + other), [pose + other for pose in poses])
+        self.assertEqual(list(array + PoseArray.from_poses(poses[::-1])),
+            [a + b for a, b in zip(poses, poses[::-1])])
+        self.assertEqual(list(-array), [-pose for pose in poses])
+        self.assertEqual(list(array - other), [pose - other for pose in poses])
+        points = [Point(1, 0, 0), Point(-2, 5, 3)]
+        mapped = array.map([p.to_list() for p in points])
+        for i, pose in enumerate(poses):
+            for j, point in enumerate(points):
+                self.assertEqual(Point(*mapped[i, j]), pose.map(point))
+
+    def test_kocular_strength(self):
+        strengths = [[0.2, 0.0, 0.9, 1.0], [0.5, 0.3, 0.0, 1.0],
+                     [0.7, 0.6, 0.4, 0.0]]
+        for ocular in range(5):
+            expected = [max([min([strengths[c][i] for c in view]) for view \
+                in combinations(range(3), ocular)] or [0.0]) if ocular else \
+                0.0 for i in range(4)]
+            self.assertEqual(list(kocular_strength(strengths, ocular)),
+                expected)
+
+    def test_task_mapped(self):
+        task = Task({'ocular': 2}, self.c1)
+        params = task.params
+        self.assertTrue(task.params is params)
+        self.assertEqual(params['ocular'], 2)
+        task.setparam('res_min', 0.5)
+        self.assertFalse(task.params is params)
+        self.assertEqual(task.params['res_min'], [0.5, 0.5])
+        self.assertEqual(Task.defaults['ocular'], 1)
+        pose = Pose(T=Point(3, 2, 1), R=Rotation.from_axis_angle(0.7,
+            Point(1, -2, 1)))
+        self.assertTrue(task.mapped is task.mapped)
+        task.set_absolute_pose(pose)
+        self.assertTrue(task.mapped_array.values is task.original_array.values)
+        points = [pose.map(point) for point in self.c1]
+        self.assertEqual(list(task.relevance(points)),
+            [self.c1[point] for point in self.c1])
+        self.assertRaises(KeyError, task.relevance, [Point(1e6, 0, 0)])
+        # The mapped point cache is only built on request.
+        self.assertFalse(hasattr(task, '_mapped'))
+        self.assertEqual(len(task.mapped), len(self.c1))
+        for point in self.c1:
+            self.assertEqual(task.mapped[pose.map(point)], self.c1[point])
+
+
+class TestOcclusion(unittest.TestCase):
+    """\
+    Tests for the occlusion module.
+    """
+    def setUp(self):
+        self.triangles = []
+        for i in range(-5, 5):
+            for j in range(-5, 5):
+                c = Point(i * 10, j * 10, (i * j) % 7)
+                self.triangles.append(Triangle(c, c + Point(6, 1, 2),
+                    c + Point(2, 7, -1)))
+        self.segments = [(Point(i * 7 - 3, -60, 10), Point(i * 5, 60, -10)) \
+            for i in range(-8, 8)] + [(Point(i * 9 + 3, 2, -5),
+            Point(i * 9 + 3, 2, 5)) for i in range(-6, 6)]
+
+    def test_triangle_bvh(self):
+        bvh = TriangleBVH(self.triangles)
+        self.assertEqual(len(bvh), len(self.triangles))
+        for origin, end in self.segments:
+            self.assertEqual(bvh.intersects(origin, end), any([triangle.\
+                intersection(origin, end, True) for triangle in self.triangles]))
+        self.assertFalse(TriangleBVH([]).intersects(Point(0, 0, 0),
+            Point(1, 1, 1)))
+
+    def test_triangle_array_intersect(self):
+        triangles = TriangleArray(self.triangles)
+        origins = [origin.to_list() for origin, end in self.segments]
+        ends = [end.to_list() for origin, end in self.segments]
+        for limit in [True, False]:
+            hits, distances, indices = triangles.intersect(origins, ends, limit)
+            for i, (origin, end) in enumerate(self.segments):
+                expected = [j for j, triangle in enumerate(self.triangles) \
+                    if triangle.intersection(origin, end, limit)]
+                self.assertEqual(hits[i], bool(expected))
+                if expected:
+                    self.assertEqual(indices[i], expected[0])
+                    self.assertEqual(origin + (end - origin).unit() * \
+                        distances[i], self.triangles[expected[0]].\
+                        intersection(origin, end, limit))
+
+    def test_triangle_array_translate(self):
+        offset = Point(3, -2, 7)
+        array = TriangleArray(self.triangles)
+        translated = array.translate(offset.to_list())
+        # The translated vertices are only computed on request.
+        self.assertFalse(set(['vertices', '_vertices']) & \
+            set(translated.__dict__))
+        self.assertEqual(len(translated), len(self.triangles))
+        for i, triangle in enumerate(self.triangles):
+            self.assertEqual(translated.triangle(i),
+                triangle.pose_map(Pose(T=offset)))
+        twice = translated.translate(offset.to_list())
+        self.assertTrue(twice.translation[0] is array)
+        self.assertEqual(twice.triangle(0),
+            self.triangles[0].pose_map(Pose(T=offset * 2)))
+
+    def test_frustum_triangle_mask(self):
+        hull = []
+        for z in [5.0, 20.0]:
+            hull += [(-z, -z, z), (-z, z, z), (z, z, z), (z, -z, z)]
+        triangles = [triangle.pose_map(Pose(T=Point(0, 0, 12))) \
+            for triangle in self.triangles]
+        mask = frustum_triangle_mask(hull, TriangleArray(triangles).vertices)
+        self.assertTrue(mask.any() and not mask.all())
+        for i, triangle in enumerate(triangles):
+            self.assertEqual(mask[i], triangle_frustum_intersection(triangle,
+                [Point(*p) for p in hull]))
+        self.assertFalse(frustum_triangle_mask([],
+            TriangleArray(triangles).vertices).any())
+
+    def test_triangle_overlap_mask(self):
+        for given in [Triangle(Point(-60, 2, -20), Point(60, 5, -20),
+            Point(0, -3, 30)), Triangle(Point(-45, -45, 3), Point(45, -40, 2),
+            Point(0, 45, 4))]:
+            # Include a triangle coplanar with the given triangle.
+            triangles = self.triangles + [given.pose_map(Pose(T=(given.\
+                vertices[1] - given.vertices[0]) * 0.1))]
+            mask = triangle_overlap_mask(TriangleArray([given]).vertices,
+                TriangleArray(triangles).vertices)
+            self.assertTrue(mask.any() and not mask.all())
+            for i, triangle in enumerate(triangles):
+                self.assertEqual(mask[i], given.overlap(triangle))
+
 
 class TestModel01(unittest.TestCase):
     """\
@@ -185,12 +441,139 @@ class TestModel01(unittest.TestCase):
         self.model['C'].set_absolute_pose(Pose(R=Rotation.from_axis_angle(pi, Point(1, 0, 0))))
         self.assertFalse(self.model.strength(p1, self.tasks['R1'].params))
 
+    def test_evaluator(self):
+        camera = self.model['C']
+        task = self.tasks['R1']
+        evaluator = camera.evaluator(task.params)
+        self.assertTrue(camera.evaluator(task.params) is evaluator)
+        task.setparam('res_min', [0.5, 1.0])
+        self.assertFalse(camera.evaluator(task.params) is evaluator)
+        params = task.params
+        evaluator = camera.evaluator(params)
+        camera.setparam('zS', 600.0)
+        self.assertFalse(camera.evaluator(params) is evaluator)
+        evaluator = camera.evaluator(params)
+        camera.set_absolute_pose(Pose(T=Point(10, 0, 0)))
+        self.assertFalse(camera.evaluator(params) is evaluator)
+        for z in range(0, 2000, 50):
+            p = Point(30, -20, z)
+            cp = camera.pose.inverse().map(p)
+            self.assertEqual(camera.strength(p, params),
+                camera.cv(cp, params) * camera.cr(cp, params) * \
+                camera.cf(cp, params) * camera.cd(cp, params))
+
     def test_performance(self):
         self.assertTrue(self.model.performance(self.tasks['R1']) > 0)
+        self.assertFalse(hasattr(self.tasks['R1'], '_mapped'))
         self.assertEqual(self.model.performance(self.tasks['R2']), 0.0)
         self.model['C'].setparam('zS', 600.0)
         self.assertEqual(self.model.performance(self.tasks['R1']), 0.0)
 
+    def test_coverage_batch(self):
+        original = PointCache()
+        for i in range(-4, 5):
+            original[Point(i * 40, i * 30, 1000 + i * 60)] = 1.0
+            original[DirectionalPoint(i * 30, -i * 40, 1000 - i * 60,
+                pi - 0.1 * i, 0.5 * i)] = 1.0
+        task = Task({'boundary_padding': 20.0, 'res_min': [0.5, 3.0],
+            'blur_max': [1.0, 5.0], 'angle_max': [0.4, 1.2]}, original)
+        # default parameters (infinite far blur limit)
+        default = Task({}, original)
+        self.model['C'].set_absolute_pose(Pose(T=Point(20, -10, 50),
+            R=Rotation.from_axis_angle(0.1, Point(1, 1, 0))))
+        self.assertTrue(self.model.performance(default) > 0)
+        for task in [task, default, self.tasks['R1'], self.tasks['R2']]:
+            coverage = self.model.coverage(task)
+            batch = self.model.coverage(task, batch=True)
+            for point in coverage:
+                self.assertTrue(abs(coverage[point] - batch[point]) < 1e-9)
+
+    def test_coverage_parallel(self):
+        for task in self.tasks.values():
+            coverage = self.model.coverage(task)
+            parallel = self.model.coverage(task, processes=2)
+            self.assertEqual(set(coverage.keys()), set(parallel.keys()))
+            for point in coverage:
+                self.assertEqual(coverage[point], parallel[point])
+
+    def test_coverage_stream_parallel(self):
+        original = PointCache([(Point(i * 40, i * 30, 1000 + i * 60), 1.0) \
+            for i in range(-8, 9)])
+        task = Task({}, original)
+        coverage = self.model.coverage(task)
+        stream = self.model.coverage_stream(task, processes=2, chunksize=4)
+        streamed = PointCache()
+        workers = None
+        for chunk, done, total in stream:
+            streamed.update(chunk)
+            # The workers are started once for the whole stream.
+            pids = set([p.pid for p in multiprocessing.active_children()])
+            self.assertTrue(workers is None or pids == workers)
+            workers = pids
+        self.assertEqual(len(workers), 2)
+        self.assertFalse(multiprocessing.active_children())
+        self.assertEqual(set(coverage.keys()), set(streamed.keys()))
+        for point in coverage:
+            self.assertEqual(coverage[point], streamed[point])
+
+    def test_range_strength_array(self):
+        camera = RangeCamera('R', self.model['C'].params)
+        points = [DirectionalPoint(0, y, z, rho, pi / 2.0) for y in \
+            range(-100, 101, 50) for z in range(800, 1500, 150) for rho in \
+            [2.0, 2.5, 3.0]]
+        positions, angles = pack_points(points)
+        directions = direction_vectors(angles)
+        # default (infinite far) blur limit, and finite blur and angle limits
+        for params in [{}, {'blur_max': [1.0, 3.0], 'angle_max': [0.8, 1.4]}]:
+            params.update({'boundary_padding': 20.0, 'res_min': [0.5, 3.0],
+                'hres_min': [0.2, 1.0]})
+            params = RangeTask(params, PointCache()).params
+            strengths = camera.strength_array(positions, directions, params)
+            self.assertTrue(((strengths > 0) & (strengths < 1)).any())
+            for point, strength in zip(points, strengths):
+                self.assertAlmostEqual(camera.strength(point, params),
+                    strength)
+
+    def test_coverage_stream(self):
+        task = Task({'boundary_padding': 20.0, 'res_min': [0.5, 3.0]},
+            PointCache([(Point(i * 20, 0, 900 + i * 10), 1.0) \
+            for i in range(-10, 11)]))
+        coverage = self.model.coverage(task)
+        streamed = PointCache()
+        progress = []
+        for chunk, done, total in self.model.coverage_stream(task,
+                chunksize=7):
+            streamed.update(chunk)
+            progress.append((done, total))
+        self.assertEqual(progress[-1], (len(task.mapped), len(task.mapped)))
+        self.assertEqual(streamed, coverage)
+        cancel = Event()
+        stream = self.model.coverage_stream(task, chunksize=7, cancel=cancel)
+        partial = next(stream)[0]
+        cancel.set()
+        self.assertEqual(len(partial), 7)
+        self.assertEqual(list(stream), [])
+        self.assertEqual(self.model.performance(task, coverage=partial),
+            self.model.performance(task, coverage=PointCache([(point,
+            coverage[point]) for point in partial])))
+
+    def test_incremental_coverage(self):
+        incremental = IncrementalCoverage(self.model, self.tasks['R2'])
+        self.assertEqual(incremental.performance(), 0.0)
+        for key, pose, performance in [('P1', Pose(T=Point(300, 0, 0)), 1.0),
+                                       ('C', Pose(T=Point(0, -50, 0)), None),
+                                       ('P1', Pose(), 0.0)]:
+            self.model[key].set_absolute_pose(pose)
+            coverage = incremental.coverage()
+            expected = self.model.coverage(self.tasks['R2'])
+            for point in expected:
+                self.assertTrue(abs(coverage[point] - expected[point]) < 1e-9)
+            if performance is not None:
+                self.assertEqual(incremental.performance(), performance)
+        incremental.close()
+        self.assertFalse(any(['incremental' in key \
+            for key in self.model['C'].posecallbacks]))
+
     def test_occlusion_cache(self):
         key = self.model._update_occlusion_cache(self.tasks['R1'].params)
         self.assertTrue(all([t.mapped_triangle() in self.model._occlusion_cache[key]['C'].values() for t in self.model['P1'].triangles]))
@@ -211,6 +594,53 @@ class TestModel01(unittest.TestCase):
         self.assertFalse(any([t.mapped_triangle() in self.model._occlusion_cache[key]['C'].values() for t in self.model['P1'].triangles]))
         self.assertFalse(any([t.mapped_triangle() in self.model._occlusion_cache[key]['C'].values() for t in self.model['P2'].triangles]))
 
+    def test_occlusion_cache_bounds(self):
+        params = self.tasks['R1'].params
+        cached = lambda key, obj: [t.mapped_triangle() in self.model.\
+            _occlusion_cache[key]['C'].values() for t in self.model[obj].triangles]
+        key = self.model._update_occlusion_cache(params)
+        self.assertTrue(all(cached(key, 'P1')))
+        self.model['P1'].set_absolute_pose(Pose(T=Point(0, 0, -10000)))
+        key = self.model._update_occlusion_cache(params)
+        self.assertFalse(any(cached(key, 'P1')))
+        self.model._occlusion_bvhs(key, 'C')
+        self.model['P1'].set_absolute_pose(Pose(T=Point(0, 0, -20000)))
+        key = self.model._update_occlusion_cache(params)
+        self.assertTrue('P1' in self.model._oc_bvh[key]['C'])
+        self.model['P1'].set_absolute_pose(Pose())
+        key = self.model._update_occlusion_cache(params)
+        self.assertTrue(all(cached(key, 'P1')))
+        self.assertFalse('P1' in self.model._oc_bvh[key]['C'])
+
+    def test_occlusion_store(self):
+        params = self.tasks['R1'].params
+        vertices = lambda cache: sorted([tuple(v.to_list()) \
+            for t in cache.values() for v in t.vertices])
+        key = self.model._update_occlusion_cache(params)
+        reference = vertices(self.model._occlusion_cache[key]['C'])
+        directory = tempfile.mkdtemp()
+        try:
+            for i in range(2):
+                model = YAMLParser('test/test01.yaml').model
+                model.occlusion_store = OcclusionCacheStore(directory)
+                key = model._update_occlusion_cache(params)
+                self.assertEqual(vertices(model._occlusion_cache[key]['C']),
+                    reference)
+                if not i:
+                    entries = sorted(os.listdir(directory))
+            self.assertEqual(sorted(os.listdir(directory)), entries)
+            # the frustum still overlaps occluders, so new entries are stored
+            model['C'].setparam('zS', 1100.0)
+            model._update_occlusion_cache(params)
+            self.assertTrue(len(os.listdir(directory)) > len(entries))
+            entries = sorted(os.listdir(directory))
+            # the frustum overlaps no occluder, so every object is culled
+            model['C'].setparam('zS', 600.0)
+            model._update_occlusion_cache(params)
+            self.assertEqual(sorted(os.listdir(directory)), entries)
+        finally:
+            shutil.rmtree(directory)
+
     def test_robot_occlusion(self):
         self.model['RV1A'].set_config([90.0, 72.0, 60.0, 0.0, 0.0, 0.0, 0.0])
         self.assertEqual(self.model.performance(self.tasks['R1']), 0.0)
@@ -218,5 +648,163 @@ class TestModel01(unittest.TestCase):
         self.assertTrue(self.model.performance(self.tasks['R1']) > 0)
 
 
+class TestRangeCoverage(unittest.TestCase):
+    """\
+    Tests for range coverage sessions.
+    """
+    def setUp(self):
+        self.model, self.tasks = YAMLParser('test/range.yaml').experiment
+        self.task = self.tasks['T']
+        self.session = RangeCoverage(self.model, self.task,
+            RangeModel.LinearTargetTransport(self.model, analytic=True))
+        # record the cameras for which strengths are computed
+        self.computed = []
+        range_camera_array = self.model._range_camera_array
+        def counted(camera, *args):
+            self.computed.append(camera)
+            return range_camera_array(camera, *args)
+        self.model._range_camera_array = counted
+
+    def tearDown(self):
+        self.session.close()
+
+    def check(self):
+        """\
+        Check the session coverage against a full range coverage evaluation,
+        and return it along with the cameras evaluated by the session.
+        """
+        self.computed = []
+        coverage = self.session.coverage()
+        computed = sorted(self.computed)
+        reference = self.model.range_coverage(self.task,
+            RangeModel.LinearTargetTransport(self.model, analytic=True),
+            batch=True)
+        self.assertEqual(set(coverage.keys()), set(reference.keys()))
+        for point in reference:
+            self.assertAlmostEqual(coverage[point], reference[point])
+        return coverage, computed
+
+    def test_transport_translations(self):
+        transport = RangeModel.LinearTargetTransport(self.model, analytic=True)
+        self.model.range_coverage(self.task, transport, batch=True)
+        translated = [stop[2] for stop in transport._transport_cache \
+            if stop[1]]
+        self.assertTrue(translated)
+        # Each stop shares the packed triangles, with no copy of its own.
+        self.assertEqual(len(set([id(triangles.translation[0]) \
+            for triangles in translated])), 1)
+        for triangles in translated:
+            self.assertFalse(set(['vertices', '_vertices']) & \
+                set(triangles.__dict__))
+
+    def test_camera_pose(self):
+        initial, computed = self.check()
+        self.assertTrue(self.model.performance(self.task, coverage=initial))
+        self.assertEqual(computed, ['C0', 'C1'])
+        self.model['C0'].set_absolute_pose(Pose(T=Point(900, 0, 860),
+            R=self.model['C0'].pose.R))
+        coverage, computed = self.check()
+        self.assertEqual(computed, ['C0'])
+        self.assertNotEqual(coverage, initial)
+
+    def test_camera_params(self):
+        initial = self.check()[0]
+        self.model['C1'].setparam('zS', 1000.0)
+        coverage, computed = self.check()
+        self.assertEqual(computed, ['C1'])
+        self.assertNotEqual(coverage, initial)
+
+    def test_memo(self):
+        initial = self.check()[0]
+        zS = self.model['C0'].getparam('zS')
+        self.model['C0'].setparam('zS', 1000.0)
+        self.assertNotEqual(self.check()[0], initial)
+        self.model['C0'].setparam('zS', zS)
+        coverage, computed = self.check()
+        self.assertEqual(computed, [])
+        self.assertEqual(coverage, initial)
+        self.assertEqual(self.check()[1], [])
+
+    def test_scene_object(self):
+        self.check()
+        self.model['B'].set_absolute_pose(Pose(T=Point(0, 0, 300)))
+        coverage, computed = self.check()
+        self.assertEqual(computed, ['C0', 'C1'])
+        self.assertEqual(self.model.performance(self.task, coverage=coverage),
+            0.0)
+        self.model['P'].set_absolute_pose(Pose(T=Point(0, 0, 700)))
+        self.model['B'].set_absolute_pose(Pose(T=Point(1000, 0, 300)))
+        coverage = self.check()[0]
+        self.assertEqual(self.model.performance(self.task, coverage=coverage),
+            0.0)
+
+    def test_laser(self):
+        initial = self.check()[0]
+        R = self.model['L'].pose.R
+        self.model['L'].set_absolute_pose(Pose(T=Point(0, 0, 1000), R=R))
+        coverage = self.check()[0]
+        self.assertEqual(self.model.performance(self.task, coverage=coverage),
+            0.0)
+        self.model['L'].set_absolute_pose(Pose(T=Point(0, 0, 500), R=R))
+        self.assertEqual(self.check()[0], initial)
+        self.model['L'].setparam('fan', 0.2)
+        coverage, computed = self.check()
+        self.assertEqual(computed, ['C0', 'C1'])
+        self.assertNotEqual(coverage, initial)
+
+    def test_task(self):
+        initial = self.check()[0]
+        self.task.setparam('res_min', [0.4, 1.5])
+        coverage, computed = self.check()
+        self.assertEqual(computed, ['C0', 'C1'])
+        self.assertNotEqual(coverage, initial)
+
+    def test_close(self):
+        self.check()
+        key = self.session._callback_key
+        laser = self.model[self.model.active_laser]
+        self.assertTrue(key in laser.paramcallbacks)
+        self.assertTrue(key in self.task.posecallbacks)
+        self.session.close()
+        self.assertFalse(key in laser.paramcallbacks)
+        self.assertFalse(key in self.task.posecallbacks)
+        for name in self.model:
+            self.assertFalse(key in self.model[name].posecallbacks)
+
+
+class TestPSO(unittest.TestCase):
+    """\
+    Tests for the particle swarm optimizer of the laserplan demo.
+    """
+    def setUp(self):
+        self.pso = imp.load_source('pso', os.path.join('demos', 'laserplan',
+            'pso.py'))
+        self.bounds = [(0.0, 1.0), (-2.0, 2.0)]
+
+    def test_update_best(self):
+        swarm = self.pso.Swarm(4, self.bounds, self.pso.topologies['ring'](4))
+        # The first evaluation sets the personal bests, even at -inf.
+        swarm.update_best([-float('inf')] * 4)
+        first = swarm.positions.copy()
+        self.assertTrue((swarm.best == first).all())
+        self.assertEqual(swarm.gbest, (tuple(first[0]), -float('inf')))
+        # Later evaluations only if strictly better.
+        swarm.update(0.7, 1.2, 1.8, self.pso.constraints['nearest'])
+        swarm.update_best([-float('inf'), 0.5, 0.5, -float('inf')])
+        self.assertTrue((swarm.best[[0, 3]] == first[[0, 3]]).all())
+        self.assertTrue((swarm.best[[1, 2]] == swarm.positions[[1, 2]]).all())
+        self.assertEqual(swarm.gbest, (tuple(swarm.positions[1]), 0.5))
+
+    def test_accept(self):
+        results = list(self.pso.particle_swarm_optimize(lambda p: 1.0, 2,
+            self.bounds, 5, 0.7, 1.2, 1.8, it=10, af=1.0))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][1], 1.0)
+        results = list(self.pso.particle_swarm_optimize(lambda p: p[0], 2,
+            self.bounds, 5, 0.7, 1.2, 1.8, it=10, af=2.0,
+            constraint_type='nearest'))
+        self.assertEqual(len(results), 10)
+
+
 if __name__ == '__main__':
     unittest.main()